@@ -0,0 +1,592 @@
+# Kaspersky TDF ByCountry — Kaspersky TIP API client
+# Configuration, pooled HTTPS session and feed download (single response,
+# redirect to a download URL, or pages) for the pipeline and the query service.
+# Failures raise exceptions (ApiError, RetryExhausted, ValueError); nothing
+# here exits the process or prints: progress goes to the "feed_api" logger.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import json
+import logging
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from functools import partial
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# requests and python-dotenv are imported where they are used, so that
+# local-file runs never load them.
+from feed_cache import FeedCache, response_validators
+from feed_core import ensure_output_directory, stream_input_file
+from feed_fetch import BATCH_SIZE, QUEUE_BATCHES, ConcurrentStreams
+from feed_io import FEED_NAME, STREAM_CHUNK_SIZE, iter_json_records, iter_text_chunks, peek_json_kind
+from feed_retry import (
+    RETRYABLE_STATUSES,
+    RetryScheduler,
+    TransientError,
+    parse_retry_after,
+)
+
+DEFAULT_BASE_URL = "https://tip.kaspersky.com/api/feeds/"
+DEFAULT_FEED_ENDPOINT = "ip_reputation"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # small enough that a dropped link loses little data
+MIN_POOL_SIZE = 10  # urllib3's default connections per host
+DEFAULT_PREFETCH_PAGES = 4
+PAGE_RECORD_KEYS = ("data", "items", "records", "results")
+PAGE_CURSOR_KEYS = ("next_cursor", "cursor")
+PAGE_LINK_KEYS = ("next", "next_url")
+
+log = logging.getLogger(__name__)  # printed by the CLIs, see feed_core.show_progress
+
+
+class ApiError(Exception):
+    """
+    The API refused a request (status is its HTTP status) or could not be
+    reached securely. Not retried.
+    """
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------------------------------------------------------------------------
+# Configuration (secrets from .env only — never from CLI args)
+# ---------------------------------------------------------------------------
+
+def load_config():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    token = os.environ.get("KASPERSKY_TIP_TOKEN", "").strip()
+    base_url = os.environ.get("KASPERSKY_TIP_BASE_URL", DEFAULT_BASE_URL).strip()
+    feed_endpoint = os.environ.get("KASPERSKY_TIP_FEED_ENDPOINT", DEFAULT_FEED_ENDPOINT).strip()
+    limit_str = os.environ.get("KASPERSKY_TIP_LIMIT", "0").strip()
+    try:
+        limit = int(limit_str)
+    except ValueError:
+        limit = 0
+    page_size_str = os.environ.get("KASPERSKY_TIP_PAGE_SIZE", "0").strip()
+    try:
+        page_size = int(page_size_str)
+    except ValueError:
+        page_size = 0
+    return {
+        "token": token,
+        "base_url": base_url,
+        "feed_endpoint": feed_endpoint,
+        "limit": limit,
+        "page_size": page_size,
+    }
+
+
+def validate_token_present(token):
+    if not token:
+        raise ValueError(
+            "KASPERSKY_TIP_TOKEN is not set.\n"
+            "  1. Copy .env.example to .env\n"
+            "  2. Set KASPERSKY_TIP_TOKEN to your API token\n"
+            "  3. Obtain a token at: https://tip.kaspersky.com (Account Settings)"
+        )
+
+
+# ---------------------------------------------------------------------------
+# HTTP client (API mode)
+# ---------------------------------------------------------------------------
+
+def build_api_session(token, pool_size=MIN_POOL_SIZE):
+    # One connection pool per host with room for pool_size concurrent requests
+    # (each concurrent feed holds one connection to the API host and one to
+    # its download host), so parallel downloads reuse connections instead of
+    # opening and discarding extra ones.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    pool_size = max(pool_size, MIN_POOL_SIZE)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip",
+    })
+    session.verify = True  # SSL certificate verification always enabled
+    return session
+
+
+def parse_feed_endpoints(value):
+    """
+    Split a comma-separated KASPERSKY_TIP_FEED_ENDPOINT / --feed-endpoint value,
+    dropping blanks and repeats.
+    """
+    endpoints = list(dict.fromkeys(e.strip() for e in value.split(",") if e.strip()))
+    if not endpoints:
+        raise ValueError("No feed endpoint given. Set KASPERSKY_TIP_FEED_ENDPOINT or --feed-endpoint.")
+    return endpoints
+
+
+def build_feed_url(base_url, endpoint, limit):
+    if not base_url.startswith("https://"):
+        raise ValueError("KASPERSKY_TIP_BASE_URL must use HTTPS. Check your .env file.")
+    url = f"{base_url.rstrip('/')}/{endpoint}"
+    if limit and limit > 0:
+        url += f"?limit={limit}"
+    return url
+
+
+def api_error_message(status):
+    messages = {
+        401: (
+            "Authentication failed. Verify KASPERSKY_TIP_TOKEN in your .env file. "
+            "Tokens expire after 1 year — request a new one at https://tip.kaspersky.com."
+        ),
+        403: (
+            "Access denied. Your token may not have permission for this feed. "
+            "Check your Kaspersky TIP subscription."
+        ),
+        404: (
+            "Feed endpoint not found. Verify KASPERSKY_TIP_FEED_ENDPOINT in your .env file. "
+            "Consult the OpenAPI spec at https://tip.kaspersky.com/Help/api/?specId=tip-feeds-api"
+        ),
+        429: "Rate limit exceeded. Wait before retrying.",
+        500: "Kaspersky TIP API internal server error. Try again later.",
+        502: "Kaspersky TIP API is temporarily unavailable (502). Try again in a few minutes.",
+        503: "Kaspersky TIP API is temporarily unavailable (503). Try again in a few minutes.",
+        504: "Kaspersky TIP API gateway timeout (504). Try again in a few minutes.",
+    }
+    return messages.get(status, f"Unexpected HTTP {status} from Kaspersky TIP API.")
+
+
+def handle_api_error(response):
+    raise ApiError(api_error_message(response.status_code), response.status_code)
+
+
+def check_response(response):
+    # 429 and 5xx are transient (retried, honouring Retry-After); any other
+    # HTTP error ends the run.
+    status = response.status_code
+    if status in RETRYABLE_STATUSES:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        response.close()
+        raise TransientError(api_error_message(status), retry_after)
+    if status >= 400:
+        handle_api_error(response)
+
+
+def parse_content_range(value):
+    """
+    Return (first byte, total length) from a Content-Range header such as
+    "bytes 100-199/1000" or "bytes */1000"; unknown parts are None.
+    """
+    if not value or not value.startswith("bytes "):
+        return None, None
+    span, _, total = value[len("bytes "):].partition("/")
+    first = span.partition("-")[0]
+    return (int(first) if first.isdigit() else None), (int(total) if total.isdigit() else None)
+
+
+def _body_length(response):
+    # Length of the (still encoded) body a 200 or 206 response announces
+    if response.status_code == 206:
+        return parse_content_range(response.headers.get("Content-Range"))[1]
+    length = response.headers.get("Content-Length", "")
+    return int(length) if length.isdigit() else None
+
+
+def _range_satisfied(response, offset, expected):
+    # A 416 to "Range: bytes=<offset>-" means nothing is left to send when
+    # offset is the full length (from the 416's Content-Range, or the one
+    # announced earlier): the previous attempt dropped after the last byte.
+    total = parse_content_range(response.headers.get("Content-Range"))[1]
+    return response.status_code == 416 and offset > 0 and offset == (total or expected)
+
+
+def download_to_file(session, url, dest_path, headers=None, metrics=None, retry=None):
+    # Stream the download to <dest_path>.part in fixed-size chunks. If the
+    # connection drops partway or the server answers 429/5xx, retry (see
+    # RetryScheduler) and resume from the bytes already on disk with an HTTP
+    # Range request (guarded by If-Range), then atomically rename the
+    # completed file into place. Bytes are stored exactly as sent, so Range
+    # offsets match the file on disk; a gzip-encoded body is kept compressed as
+    # <dest_path>.gz. Returns (response that sent the body, final path); a 304
+    # leaves the destination untouched and returns (response, None).
+    import requests
+    import urllib3
+
+    retry = retry or RetryScheduler()
+    part_path = dest_path + ".part"
+    ensure_output_directory(part_path)
+    offset = 0
+    retries = 0
+    started = False  # whether part_path holds bytes of this download
+    validator = None
+    expected = None  # full body length, when announced
+    body_response = None
+    while True:
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            if validator:
+                request_headers["If-Range"] = validator
+        retry.before_attempt()
+        try:
+            response = session.get(url, timeout=(10, 300), stream=True, headers=request_headers)
+            if _range_satisfied(response, offset, expected):
+                response.close()
+                retry.succeeded()
+                break
+            check_response(response)
+            if response.status_code == 304:
+                retry.succeeded()
+                return response, None
+            if response.status_code != 206:
+                offset = 0  # server ignored the Range header: start over
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+            encoding = response.headers.get("Content-Encoding", "").lower()
+            expected = _body_length(response)
+            body_response = response
+            started = True
+            with open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.raw.stream(DOWNLOAD_CHUNK_SIZE, decode_content=False):
+                    f.write(chunk)
+                    if metrics:
+                        metrics.add_bytes("download", len(chunk))
+        except requests.exceptions.SSLError:
+            raise
+        except (
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            urllib3.exceptions.HTTPError,
+        ) as e:
+            error = TransientError(f"Download connection failed ({type(e).__name__}).")
+        except TransientError as e:
+            error = e
+        else:
+            retry.succeeded()
+            break
+        retries += 1
+        retry.failed(error, retries, "download")
+        offset = os.path.getsize(part_path) if started and os.path.exists(part_path) else 0
+        if offset:
+            log.info("Resuming the download after %d bytes...", offset)
+    if encoding == "gzip":
+        dest_path += ".gz"
+    os.replace(part_path, dest_path)
+    return body_response, dest_path
+
+
+def _body_decoder(encoding):
+    import zlib
+
+    if encoding in ("", "identity"):
+        return None
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    raise ApiError(f"Unsupported Content-Encoding from Kaspersky TIP API: '{encoding}'.")
+
+
+def _resume_skip(response, received, validator, encoding):
+    # Bytes to drop from the response to a resume request: none for the
+    # requested 206, or all already received ones when the server sends the
+    # whole body again and its validator shows it is the same feed.
+    check_response(response)
+    if response.status_code == 206:
+        if parse_content_range(response.headers.get("Content-Range"))[0] == received:
+            return 0
+    elif response.status_code == 200 and validator:
+        same_feed = (response.headers.get("ETag") or response.headers.get("Last-Modified")) == validator
+        if same_feed and response.headers.get("Content-Encoding", "").lower() == encoding:
+            return received
+    raise ApiError("The feed changed while it was being downloaded. Run the download again.")
+
+
+def iter_response_body(session, url, response, retry=None):
+    """
+    Yield the decoded body of a streamed API response. If the connection
+    drops partway, retry (see RetryScheduler) and resume after the bytes
+    already received with a Range request guarded by If-Range, so the records
+    already handed on are neither lost nor repeated. Bytes are counted as
+    sent (before gzip decoding), which is what Range offsets refer to.
+    """
+    import requests
+    import urllib3
+
+    retry = retry or RetryScheduler()
+    validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+    encoding = response.headers.get("Content-Encoding", "").lower()
+    decoder = _body_decoder(encoding)
+    expected = _body_length(response)
+    received = 0
+    skip = 0
+    retries = 0
+    while True:
+        try:
+            if response is None:
+                retry.before_attempt()
+                headers = {"Range": f"bytes={received}-", "Accept-Encoding": encoding or "identity"}
+                if validator:
+                    headers["If-Range"] = validator
+                response = session.get(url, timeout=(10, 300), stream=True, headers=headers)
+                if _range_satisfied(response, received, expected):
+                    break
+                skip = _resume_skip(response, received, validator, encoding)
+            for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    chunk, skip = chunk[dropped:], skip - dropped
+                received += len(chunk)
+                data = decoder.decompress(chunk) if decoder else chunk
+                if data:
+                    yield data
+        except requests.exceptions.SSLError as e:
+            raise ApiError(f"SSL certificate verification failed: {e}") from e
+        except (
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            urllib3.exceptions.HTTPError,
+        ) as e:
+            error = TransientError(f"Feed download connection failed ({type(e).__name__}).")
+        except TransientError as e:
+            error = e
+        else:
+            break
+        finally:
+            if response is not None:
+                response.close()
+        response = None
+        retries += 1
+        retry.failed(error, retries, "download")
+        log.info("Resuming the download after %d bytes...", received)
+    if retries:
+        retry.succeeded()
+    if decoder:
+        data = decoder.flush()
+        if data:
+            yield data
+
+
+def generate_download_filename():
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"feeds/{FEED_NAME}_download_{timestamp}.json"
+
+
+def resolve_download_redirect(
+    session, download_url, cache=None, api_validators=None, metrics=None, retry=None
+):
+    import requests
+
+    headers = cache.conditional_headers("download") if cache else {}
+    dest_path = cache.download_path if cache else generate_download_filename()
+    try:
+        with metrics.stage("download") if metrics else nullcontext():
+            response, dest_path = download_to_file(
+                session, download_url, dest_path, headers, metrics, retry
+            )
+    except requests.exceptions.SSLError as e:
+        raise ApiError(f"SSL certificate verification failed during download: {e}") from e
+
+    if response.status_code == 304:
+        log.info("Feed file not modified since the last download — using cached copy.")
+        cache.update_meta(api=api_validators)
+        dest_path = cache.body_path
+    elif cache:
+        cache.commit(dest_path, api=api_validators, download=response_validators(response))
+    else:
+        log.info("Feed file saved to: %s", dest_path)
+    return stream_input_file(dest_path)
+
+
+def request_api(session, url, headers=None, stream=False, retry=None, parse_json=False):
+    """
+    GET url, retrying transient failures. Unless stream, the body is read
+    inside the retried attempt, so a body dropped mid-read is fetched again;
+    with parse_json the decoded body is returned instead of the response,
+    and a truncated one is retried too.
+    """
+    import requests
+
+    def attempt():
+        try:
+            response = session.get(url, timeout=(10, 60), stream=stream, headers=headers)
+        except requests.exceptions.SSLError as e:
+            raise ApiError(f"SSL certificate verification failed: {e}") from e
+        except requests.exceptions.Timeout:
+            raise TransientError("Request to Kaspersky TIP API timed out.")
+        except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError) as e:
+            raise TransientError(f"Response from Kaspersky TIP API was cut off ({type(e).__name__}).")
+        except requests.exceptions.ConnectionError as e:
+            raise TransientError(f"Could not reach Kaspersky TIP API: {e}")
+        check_response(response)
+        if not parse_json:
+            return response
+        try:
+            return response.json()
+        except ValueError as e:
+            raise TransientError(f"Response from Kaspersky TIP API is not complete JSON ({e}).")
+
+    return (retry or RetryScheduler()).call(attempt, "API request")
+
+
+def fetch_feed(session, url, cache=None, metrics=None, retry=None):
+    headers = cache.conditional_headers("api") if cache else {}
+    with metrics.stage("api") if metrics else nullcontext():
+        response = request_api(session, url, headers, stream=True, retry=retry)
+
+    if response.status_code == 304:
+        log.info("Feed not modified since the last download — using cached copy.")
+        return cache.iter_records()
+
+    validators = response_validators(response)
+    chunks = iter_response_body(session, url, response, retry=retry)
+    if metrics:
+        chunks = metrics.timed("download", chunks, unit="bytes")
+    kind, chunks = peek_json_kind(chunks)
+
+    if kind == "[":
+        # Option A: API returned records directly
+        if cache and validators:
+            chunks = cache.store(chunks, api=validators, download=None)
+        return iter_json_records(iter_text_chunks(chunks))
+
+    if kind == "{":
+        # Option B: API returned a (small) redirect object with a download URL
+        data = json.loads(b"".join(chunks))
+        for key in ("download_url", "url", "link", "data_url"):
+            if key in data:
+                log.info("Resolving download link from API response...")
+                return resolve_download_redirect(
+                    session, data[key], cache, validators, metrics, retry
+                )
+        raise ValueError(
+            f"Unexpected API response format. Keys in response: {list(data.keys())}"
+        )
+
+    raise ValueError(
+        f"Unexpected API response starting with '{kind}'. Expected a JSON array."
+    )
+
+
+def with_query(url, **params):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update((key, str(value)) for key, value in params.items())
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def parse_feed_page(data):
+    """
+    Split one page into (records, next cursor, next page link). A bare array
+    is an offset page; an object carries its records under one of
+    PAGE_RECORD_KEYS and, unless it is the last page, a cursor or a link.
+    """
+    if isinstance(data, list):
+        return data, None, None
+    if isinstance(data, dict):
+        for key in PAGE_RECORD_KEYS:
+            if isinstance(data.get(key), list):
+                cursor = next((data[k] for k in PAGE_CURSOR_KEYS if data.get(k)), None)
+                link = next((data[k] for k in PAGE_LINK_KEYS if isinstance(data.get(k), str) and data[k]), None)
+                return data[key], cursor, link
+        raise ValueError(f"Unexpected page format. Keys in response: {list(data.keys())}")
+    raise ValueError("Unexpected page format. Expected a JSON array or object.")
+
+
+def iter_feed_pages(session, url, page_size, limit=0, retry=None):
+    """
+    Yield the feed's records page by page: follow the next link or cursor
+    while the server returns one; bare array pages are walked with ?offset=
+    until a short page, and raise ValueError if a page repeats the previous
+    one. `limit` caps the total number of records (0 = whole feed).
+    """
+    page_url = with_query(url, limit=page_size)
+    offset = 0
+    remaining = limit if limit and limit > 0 else None
+    first = None  # first record of the previous offset page
+    while True:
+        data = request_api(session, page_url, retry=retry, parse_json=True)
+        records, cursor, link = parse_feed_page(data)
+        received = len(records)
+        if offset and records and records[0] == first:
+            # Honours limit but not offset: every page would be the first one
+            raise ValueError(
+                f"The feed endpoint ignores ?offset= (page at offset {offset} repeats the previous page). "
+                "Run without --page-size."
+            )
+        if isinstance(data, list) and records:
+            first = records[0]
+        if remaining is not None:
+            records = records[:remaining]
+            remaining -= len(records)
+        yield from records
+        if not received or remaining == 0:
+            return
+        if link:
+            page_url = urljoin(page_url, link)
+            if not page_url.startswith("https://"):
+                raise ValueError(f"Refusing to follow a non-HTTPS next page link: {page_url}")
+        elif cursor:
+            page_url = with_query(url, limit=page_size, cursor=cursor)
+        elif isinstance(data, dict) or received != page_size:
+            # Last page: a cursor page without a cursor, or a short offset page
+            # (a longer one means the endpoint ignores paging)
+            return
+        else:
+            offset += received
+            page_url = with_query(url, limit=page_size, offset=offset)
+
+
+def build_feed_fetcher(config, no_cache=False, prefetch_pages=DEFAULT_PREFETCH_PAGES, retry=None):
+    """
+    Return (fetch, source) for API mode: fetch(metrics=None) returns the
+    records of every configured feed endpoint. A single unpaged endpoint is
+    fetched in the calling thread. Several endpoints, or paged downloads, are
+    fetched in background threads over one pooled session and handed over
+    through a bounded queue: while the filter works on one page the next ones
+    download, up to prefetch_pages ahead per endpoint (per-stage api/download
+    metrics are then not recorded, as the downloads overlap). Every request
+    of a fetch shares the retry scheduler and its budget.
+    """
+    retry = retry or RetryScheduler()
+    page_size = config["page_size"]
+    if page_size < 0:
+        raise ValueError("--page-size must be 0 or more records.")
+    if prefetch_pages < 1:
+        raise ValueError("--prefetch-pages must be at least 1.")
+    endpoints = parse_feed_endpoints(config["feed_endpoint"])
+    limit = 0 if page_size else config["limit"]  # paging applies the limit itself
+    urls = {e: build_feed_url(config["base_url"], e, limit) for e in endpoints}
+    session = build_api_session(config["token"], pool_size=2 * len(endpoints))
+    source = f"API endpoint{'s' if len(endpoints) > 1 else ''}: {', '.join(endpoints)}"
+
+    if page_size:
+        def fetch_endpoint(endpoint, metrics=None):
+            # Pages are not cached: each is a separate request
+            return iter_feed_pages(session, urls[endpoint], page_size, config["limit"], retry)
+
+        source += f" ({page_size} records per page)"
+        batch_size, queue_batches = page_size, prefetch_pages * len(endpoints)
+    else:
+        def fetch_endpoint(endpoint, metrics=None):
+            cache = None if no_cache else FeedCache(urls[endpoint])
+            return fetch_feed(session, urls[endpoint], cache, metrics, retry)
+
+        batch_size, queue_batches = BATCH_SIZE, QUEUE_BATCHES
+
+    def fetch(metrics=None):
+        retry.start_run()
+        if len(endpoints) == 1 and not page_size:
+            return fetch_endpoint(endpoints[0], metrics)
+        return ConcurrentStreams(
+            {endpoint: partial(fetch_endpoint, endpoint) for endpoint in endpoints},
+            batch_size, queue_batches,
+        )
+
+    return fetch, source
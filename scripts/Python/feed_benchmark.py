@@ -0,0 +1,425 @@
+# Kaspersky TDF ByCountry — Benchmark suite
+# Generates synthetic IP Reputation feeds that follow feeds/feeds.info.EN.md,
+# times the parse, filter (per mode) and write stages of the pipeline separately
+# with their peak RSS, times the CLI's startup, and compares saved results to
+# catch regressions.
+#
+#   python scripts/Python/feed_benchmark.py generate --records 1000000 --output feeds/synthetic_1M.json
+#   python scripts/Python/feed_benchmark.py run --input-file feeds/synthetic_1M.json --save benchmarks/base.json
+#   python scripts/Python/feed_benchmark.py compare benchmarks/base.json benchmarks/new.json
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import argparse
+import ipaddress
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from feed_io import open_record_writer
+from feed_metrics import peak_rss_kb
+
+FILTER_MODES = ("geo", "admin", "combined", "victims")
+WRITE_FORMATS = ("json", "ndjson", "csv", "iplist")
+DEFAULT_THRESHOLD = 0.10  # relative slowdown reported as a regression
+MIN_REGRESSION_S = 0.05  # ignore timer noise on very short stages
+DEFAULT_STARTUP_TARGET = 0.3  # seconds for a CLI run on a one-record feed
+STARTUP_RUNS = 5
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kaspersky_tdf.py")
+
+# Synthetic feed shape. Weights roughly follow the country mix of the real feed;
+# about a third of the records have no ip_whois and some have no users_geo.
+COUNTRY_WEIGHTS = {
+    "us": 20, "cn": 10, "ru": 8, "de": 6, "nl": 5, "gb": 5, "fr": 4, "br": 4,
+    "in": 4, "es": 3, "vn": 3, "kr": 3, "jp": 3, "ua": 2, "it": 2, "tw": 2,
+    "hk": 2, "sg": 2, "ca": 2, "tr": 2, "pl": 1, "ro": 1, "ir": 1, "id": 1,
+    "th": 1, "mx": 1, "ar": 1, "za": 1, "au": 1, "se": 1,
+}
+CATEGORIES = (
+    "malware", "phishing", "botnet_cnc", "spam", "tor_exit_node",
+    "malware_hosting", "scanner", "ransomware",
+)
+WHOIS_RATIO = 0.65
+WHOIS_SAME_COUNTRY = 0.85  # share of whois records registered in the ip_geo country
+USERS_GEO_RATIO = 0.85
+IPV6_RATIO = 0.05
+MAX_USERS_GEO = 10
+FEED_EPOCH = datetime(2015, 1, 1)
+FEED_SPAN_MINUTES = 10 * 365 * 24 * 60
+
+
+# ---------------------------------------------------------------------------
+# Synthetic feed generator
+# ---------------------------------------------------------------------------
+
+def _random_ip(rng):
+    if rng.random() < IPV6_RATIO:
+        address = ipaddress.IPv6Address((0x2001 << 112) | rng.getrandbits(112))
+        network = ipaddress.IPv6Network(f"{address}/48", strict=False)
+    else:
+        address = ipaddress.IPv4Address(rng.randint(0x01000000, 0xDFFFFFFF))
+        network = ipaddress.IPv4Network(f"{address}/24", strict=False)
+    return str(address), f"{network[0]} - {network[-1]}"
+
+
+def _feed_time(minutes):
+    return (FEED_EPOCH + timedelta(minutes=minutes)).strftime("%d.%m.%Y %H:%M")
+
+
+def generate_records(count, seed=0):
+    """
+    Yield `count` synthetic records with the field order of the real feed.
+    The same seed always produces the same feed.
+    """
+    rng = random.Random(seed)
+    countries = list(COUNTRY_WEIGHTS)
+    cum_weights = list(accumulate(COUNTRY_WEIGHTS.values()))
+    first_id = rng.randint(10**9, 9 * 10**9)
+
+    for n in range(count):
+        ip, net_range = _random_ip(rng)
+        ip_geo = rng.choices(countries, cum_weights=cum_weights)[0]
+        first_seen = rng.randrange(FEED_SPAN_MINUTES)
+        last_seen = rng.randint(first_seen, FEED_SPAN_MINUTES)
+        entry = {
+            "id": first_id + n,
+            "ip": ip,
+            "threat_score": rng.randint(50, 100),
+            "category": rng.choice(CATEGORIES),
+            "first_seen": _feed_time(first_seen),
+            "last_seen": _feed_time(last_seen),
+            "popularity": rng.randint(0, 5),
+            "ip_geo": ip_geo,
+        }
+        if rng.random() < USERS_GEO_RATIO:
+            users = rng.sample(countries, rng.randint(1, MAX_USERS_GEO))
+            entry["users_geo"] = ", ".join(users)
+        if rng.random() < WHOIS_RATIO:
+            same = rng.random() < WHOIS_SAME_COUNTRY
+            owner = rng.randrange(100000)
+            created = rng.randrange(first_seen + 1) // 1440 * 1440
+            entry["ip_whois"] = {
+                "net_range": net_range,
+                "net_name": f"NET-{owner}",
+                "descr": f"Synthetic network {owner}",
+                "created": _feed_time(created)[:10],
+                "updated": _feed_time(rng.randint(created, FEED_SPAN_MINUTES))[:10],
+                "country": (ip_geo if same else rng.choice(countries)).upper(),
+                "contact_owner_name": f"Synthetic Hosting {owner}",
+                "contact_owner_code": f"ORG-SY{owner}-RIPE",
+            }
+        yield entry
+
+
+def generate_feed(output_file, count, seed=0, output_format="json"):
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open_record_writer(output_file, output_format) as writer:
+        for entry in generate_records(count, seed):
+            writer.write(entry)
+    return writer.count
+
+
+# ---------------------------------------------------------------------------
+# Stages (each one runs in a fresh process so its peak RSS is its own)
+# ---------------------------------------------------------------------------
+
+def _measure(fn, *args):
+    wall, cpu = time.perf_counter(), time.process_time()
+    records = fn(*args)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "records": records,
+        "records_per_s": round(records / wall) if wall else None,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def _count(records):
+    return sum(1 for _ in records)
+
+
+def _stage_parse(input_file, country, option):
+    from feed_core import load_input_file
+
+    return _measure(lambda: _count(load_input_file(input_file)))
+
+
+def _stage_filter(input_file, country, mode):
+    # Filtering is timed over records already in memory, without parse cost
+    from feed_core import filter_country, load_input_file
+
+    records = list(load_input_file(input_file))
+    return _measure(lambda: _count(filter_country(records, country, mode)))
+
+
+def _stage_write(input_file, country, output_format):
+    from feed_core import load_input_file, save_output_file
+
+    records = list(load_input_file(input_file))
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = os.path.join(tmp, "output")
+        return _measure(save_output_file, output_file, records, output_format)
+
+
+def _stage_pipeline(input_file, country, mode):
+    # End to end as the CLIs run it: streamed parse -> filter -> write
+    from feed_core import filter_country, load_input_file, save_output_file
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = os.path.join(tmp, "output.json")
+        return _measure(
+            lambda: save_output_file(
+                output_file, filter_country(load_input_file(input_file), country, mode)
+            )
+        )
+
+
+def benchmark_stages(modes, formats):
+    stages = [("parse", _stage_parse, None)]
+    stages += [(f"filter.{mode}", _stage_filter, mode) for mode in modes]
+    stages += [(f"write.{fmt}", _stage_write, fmt) for fmt in formats]
+    stages += [(f"pipeline.{mode}", _stage_pipeline, mode) for mode in modes]
+    return stages
+
+
+def run_stage(stage_fn, input_file, country, option):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(stage_fn, input_file, country, option).result()
+
+
+def measure_startup(runs=STARTUP_RUNS):
+    """
+    Time complete CLI runs (interpreter start, imports, one-record filter and
+    write) and return the fastest as a stage. Import cost dominates it, so it
+    catches a heavy dependency creeping back into the startup path.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, "one.json")
+        generate_feed(input_file, 1)
+        command = [
+            sys.executable, CLI_SCRIPT, "--input-file", input_file, "--country", "US",
+            "--filter-mode", "geo", "--output-file", os.path.join(tmp, "output.json"),
+        ]
+        timings = []
+        for _ in range(runs):
+            wall = time.perf_counter()
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - wall)
+    return {"wall_s": round(min(timings), 4), "records": 1, "peak_rss_kb": None}
+
+
+def run_benchmark(input_file, country, modes, formats, repeat=1):
+    """
+    Run every stage `repeat` times and keep the fastest run (peak RSS is the
+    highest seen), then time the CLI startup. Returns a JSON-serializable
+    result document.
+    """
+    stages = {}
+    for name, stage_fn, option in benchmark_stages(modes, formats):
+        runs = [run_stage(stage_fn, input_file, country, option) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run["wall_s"])
+        peaks = [run["peak_rss_kb"] for run in runs if run["peak_rss_kb"] is not None]
+        best["peak_rss_kb"] = max(peaks) if peaks else None
+        stages[name] = best
+        print(f"  {name:<18} {best['wall_s']:>9.3f} s  {_format_rss(best['peak_rss_kb'])}")
+    stages["startup"] = measure_startup()
+    print(f"  {'startup':<18} {stages['startup']['wall_s']:>9.3f} s")
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "input_file": input_file,
+        "input_size": os.path.getsize(input_file),
+        "country": country,
+        "repeat": repeat,
+        "stages": stages,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two result documents stage by stage. Returns a list of
+    (stage, baseline wall, current wall, relative change, regressed) tuples.
+    """
+    rows = []
+    for name, base in baseline["stages"].items():
+        stage = current["stages"].get(name)
+        if stage is None:
+            continue
+        change = (stage["wall_s"] - base["wall_s"]) / base["wall_s"] if base["wall_s"] else 0.0
+        regressed = change > threshold and stage["wall_s"] - base["wall_s"] > MIN_REGRESSION_S
+        rows.append((name, base["wall_s"], stage["wall_s"], change, regressed))
+    return rows
+
+
+def _format_rss(peak_kb):
+    return f"{peak_kb / 1024:>8.1f} MiB" if peak_kb is not None else "       n/a"
+
+
+def load_results(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Results file not found: {path}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format in results file {path}: {e}")
+
+
+def save_results(path, results):
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Kaspersky TDF ByCountry — benchmark the parse, filter and write stages."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a synthetic feed.")
+    generate.add_argument("--records", type=int, required=True, help="Number of records.")
+    generate.add_argument(
+        "--output", required=True, help="Output path (.json/.ndjson, optionally .gz/.zst)."
+    )
+    generate.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    generate.add_argument(
+        "--output-format", choices=("json", "ndjson"), default="json",
+        help="Feed layout (default: json).",
+    )
+
+    run = commands.add_parser("run", help="Benchmark every stage on a feed file.")
+    run.add_argument("--input-file", required=True, help="Feed file to benchmark.")
+    run.add_argument("--country", default="US", help="Country to filter by (default: US).")
+    run.add_argument(
+        "--modes", default=",".join(FILTER_MODES),
+        help="Comma-separated filter modes (default: geo,admin,combined,victims).",
+    )
+    run.add_argument(
+        "--formats", default=",".join(WRITE_FORMATS),
+        help="Comma-separated output formats for the write stage (default: all).",
+    )
+    run.add_argument(
+        "--repeat", type=int, default=1, help="Runs per stage; the fastest is kept (default: 1)."
+    )
+    run.add_argument("--save", help="Write the results as JSON to this path.")
+    run.add_argument("--baseline", help="Compare against a saved results file.")
+    run.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Relative slowdown reported as a regression (default: 0.10).",
+    )
+    run.add_argument(
+        "--startup-target", type=float, default=DEFAULT_STARTUP_TARGET,
+        help=(
+            "Fail when a CLI run on a one-record feed takes longer than this many "
+            f"seconds (default: {DEFAULT_STARTUP_TARGET})."
+        ),
+    )
+
+    compare = commands.add_parser("compare", help="Compare two saved results files.")
+    compare.add_argument("baseline", help="Baseline results file.")
+    compare.add_argument("current", help="Current results file.")
+    compare.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Relative slowdown reported as a regression (default: 0.10).",
+    )
+    return parser.parse_args()
+
+
+def parse_choices(value, choices, option):
+    selected = [item.strip().lower() for item in value.split(",") if item.strip()]
+    unknown = [item for item in selected if item not in choices]
+    if unknown or not selected:
+        raise ValueError(f"{option} accepts a comma-separated subset of: {', '.join(choices)}.")
+    return selected
+
+
+def display_comparison(rows, threshold):
+    print("\n--- Comparison ---")
+    for name, base, current, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"  {name:<18} {base:>9.3f} s -> {current:>9.3f} s  {change:>+7.1%}{flag}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"\n  {regressions} regression(s) above {threshold:.0%}.\n")
+    return regressions
+
+
+def main():
+    args = parse_arguments()
+
+    try:
+        if args.command == "generate":
+            if args.records < 1:
+                raise ValueError("--records must be at least 1.")
+            print(f"Generating {args.records} synthetic records...")
+            count = generate_feed(args.output, args.records, args.seed, args.output_format)
+            print(f"  {count} records saved to: {args.output}")
+            return
+
+        if args.command == "compare":
+            rows = compare_results(
+                load_results(args.baseline), load_results(args.current), args.threshold
+            )
+            if display_comparison(rows, args.threshold):
+                sys.exit(1)
+            return
+
+        if not os.path.exists(args.input_file):
+            raise FileNotFoundError(f"Input file not found: {args.input_file}")
+        if args.repeat < 1:
+            raise ValueError("--repeat must be at least 1.")
+        modes = parse_choices(args.modes, FILTER_MODES, "--modes")
+        formats = parse_choices(args.formats, WRITE_FORMATS, "--formats")
+        baseline = load_results(args.baseline) if args.baseline else None
+
+        print(f"Benchmarking {args.input_file} (country {args.country.upper()})...")
+        results = run_benchmark(args.input_file, args.country.upper(), modes, formats, args.repeat)
+        if args.save:
+            save_results(args.save, results)
+            print(f"  Results saved to: {args.save}")
+        startup = results["stages"]["startup"]["wall_s"]
+        slow_start = startup > args.startup_target
+        if slow_start:
+            print(f"\n  Startup {startup:.3f} s is above the {args.startup_target:.3f} s target.")
+        if baseline and display_comparison(
+            compare_results(baseline, results, args.threshold), args.threshold
+        ):
+            sys.exit(1)
+        if slow_start:
+            sys.exit(1)
+
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Kaspersky TDF ByCountry — Conditional download cache
+# Keeps the last downloaded feed body under feeds/.cache/ together with its
+# ETag / Last-Modified validators, so the next run can send a conditional
+# request and reuse the cached body when the server answers 304 Not Modified.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import hashlib
+import json
+import os
+
+from feed_io import STREAM_CHUNK_SIZE, iter_file_records
+
+CACHE_DIR = os.path.join("feeds", ".cache")
+
+
+def response_validators(response):
+    """
+    Extract the cache validators (ETag / Last-Modified) from an HTTP response.
+    """
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    return {k: v for k, v in validators.items() if v} or None
+
+
+class FeedCache:
+    """
+    Cache entry for one feed URL. Validators are kept per stage: "api" for the
+    feed endpoint itself and "download" for the redirected download URL.
+    """
+
+    def __init__(self, url, cache_dir=CACHE_DIR):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]
+        self.url = url
+        # Bodies are stored as <key>.json, or <key>.json.gz when the server
+        # sent them gzip-encoded; meta["body"] records which one is current.
+        self.download_path = os.path.join(cache_dir, f"{key}.json")
+        self.meta_path = os.path.join(cache_dir, f"{key}.meta.json")
+        self.meta = self._load_meta()
+        self.body_path = self.meta.get("body") or self.download_path
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if meta.get("url") != self.url or not os.path.exists(meta.get("body", "")):
+            return {}
+        return meta
+
+    def conditional_headers(self, stage):
+        validators = self.meta.get(stage) or {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def update_meta(self, **stages):
+        self.meta.update(stages, url=self.url)
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=4)
+        os.replace(tmp_path, self.meta_path)
+
+    def commit(self, body_path, **stages):
+        """
+        Record the validators of a body that has just been written to body_path.
+        """
+        if body_path != self.body_path and os.path.exists(self.body_path):
+            os.remove(self.body_path)
+        self.body_path = body_path
+        self.meta = {"body": body_path}
+        self.update_meta(**stages)
+
+    def store(self, byte_chunks, **stages):
+        """
+        Pass byte chunks through while writing them to the cache. The body and
+        the stage validators are committed only once the stream is complete.
+        """
+        os.makedirs(os.path.dirname(self.download_path), exist_ok=True)
+        tmp_path = self.download_path + ".part"
+        complete = False
+        try:
+            with open(tmp_path, "wb", buffering=STREAM_CHUNK_SIZE) as f:
+                for chunk in byte_chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, self.download_path)
+            self.commit(self.download_path, **stages)
+            complete = True
+        finally:
+            if not complete and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def iter_records(self):
+        return iter_file_records(self.body_path)
@@ -0,0 +1,203 @@
+# Kaspersky TDF ByCountry — Columnar feed representation
+# Loads a local feed into compact NumPy columns (interned country and category
+# codes, interned users_geo victim sets, integer IPs, int16 scores, epoch
+# timestamps and the byte span of each record) so that filters become
+# vectorized mask operations. Full records are only decoded again, from their
+# byte spans, for the matches.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import json
+import mmap
+from array import array
+
+from feed_countries import NO_VICTIMS, victim_countries
+from feed_io import compression_for, iter_byte_spans
+from feed_lookup import ip_to_int
+from feed_time import parse_feed_time
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for the columnar engine
+    np = None
+
+MISSING_NUMBER = -2 ** 63  # int64 marker for a missing or non-integer score
+
+
+class Interner:
+    """
+    Map hashable values to small integer codes; code 0 is reserved for the
+    missing value ("" by default).
+    """
+
+    def __init__(self, missing=""):
+        self.values = [missing]
+        self.codes = {missing: 0}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ColumnarFeed:
+    """
+    Column store for one local feed file. Filters are expressed as boolean
+    masks over the columns; iter_records(mask) reads the matches back.
+
+    The victims column holds a code per distinct users_geo set; every set also
+    has a bitmask over the country codes, so a multi-country victim query is a
+    bitwise AND per distinct set plus one isin over the column.
+    """
+
+    def __init__(self, feed_path, columns, countries, categories, victim_sets):
+        self.feed_path = feed_path
+        self.columns = columns
+        self.countries = countries
+        self.categories = categories
+        self.victim_sets = victim_sets
+        self.victim_bits = [
+            sum(1 << countries.code(code) for code in victims) for victims in victim_sets.values
+        ]
+        self.count = len(columns["start"])  # records in the whole feed
+
+    def country_code(self, country):
+        # None when the country never appears in the feed
+        return self.countries.codes.get(country.upper())
+
+    def mask(self, country, mode):
+        from feed_filter import compile_filter  # feed_filter builds on this module
+
+        return compile_filter(country=country, mode=mode).mask(self)
+
+    def iter_records(self, mask):
+        """
+        Yield the records selected by `mask` in feed order.
+        """
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return
+        starts = self.columns["start"][rows]
+        ends = self.columns["end"][rows]
+        with open(self.feed_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start, end in zip(starts.tolist(), ends.tolist()):
+                    yield json.loads(mm[start:end].decode("utf-8"))
+
+
+def mask_countries(feed, field, countries):
+    """
+    Records whose geo or admin column is one of `countries`.
+    """
+    codes = [code for code in map(feed.country_code, countries) if code is not None]
+    return np.isin(feed.columns[field], codes)
+
+
+def mask_victims(feed, countries):
+    """
+    Records whose users_geo set contains any of `countries`.
+    """
+    wanted = 0
+    for code in map(feed.country_code, countries):
+        if code is not None:
+            wanted |= 1 << code
+    sets = [code for code, bits in enumerate(feed.victim_bits) if bits & wanted]
+    return np.isin(feed.columns["victims"], sets)
+
+
+def load_columnar_feed(feed_path):
+    """
+    Parse an uncompressed local feed once into a ColumnarFeed.
+    """
+    if np is None:
+        raise ValueError(
+            "The columnar engine requires the optional 'numpy' package (pip install numpy)."
+        )
+    if compression_for(feed_path):
+        raise ValueError("The columnar engine needs random access; use an uncompressed feed file.")
+
+    countries = Interner()
+    categories = Interner()
+    victim_sets = Interner(NO_VICTIMS)
+    starts, ends = array("Q"), array("Q")
+    geo, admin, category = array("H"), array("H"), array("H")
+    victims = array("I")
+    ip_hi, ip_lo = array("Q"), array("Q")
+    threat_score, popularity = array("q"), array("q")
+    first_seen, last_seen = array("q"), array("q")
+
+    try:
+        for start, end, entry in iter_byte_spans(feed_path):
+            whois = entry.get("ip_whois") or {}
+            starts.append(start)
+            ends.append(end)
+            geo.append(countries.code(entry.get("ip_geo", "").upper()))
+            admin.append(countries.code(whois.get("country", "").upper()))
+            category.append(categories.code(_restore_utf8(entry.get("category") or "")))
+            victims.append(victim_sets.code(victim_countries(entry.get("users_geo"))))
+            ip = ip_to_int(entry.get("ip", ""))
+            ip_hi.append(ip >> 64 if ip is not None else 0)
+            ip_lo.append(ip & 0xFFFFFFFFFFFFFFFF if ip is not None else 0)
+            threat_score.append(_number(entry.get("threat_score")))
+            popularity.append(_number(entry.get("popularity")))
+            first_seen.append(parse_feed_time(entry.get("first_seen")))
+            last_seen.append(parse_feed_time(entry.get("last_seen")))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format in input file: {e}")
+
+    columns = {
+        "start": np.frombuffer(starts, dtype=np.uint64),
+        "end": np.frombuffer(ends, dtype=np.uint64),
+        "geo": np.frombuffer(geo, dtype=np.uint16),
+        "admin": np.frombuffer(admin, dtype=np.uint16),
+        "category": np.frombuffer(category, dtype=np.uint16),
+        "victims": np.frombuffer(victims, dtype=np.uint32),
+        "ip_hi": np.frombuffer(ip_hi, dtype=np.uint64),
+        "ip_lo": np.frombuffer(ip_lo, dtype=np.uint64),
+        "threat_score": _narrow(threat_score),
+        "popularity": _narrow(popularity),
+        "first_seen": np.frombuffer(first_seen, dtype=np.int64),
+        "last_seen": np.frombuffer(last_seen, dtype=np.int64),
+    }
+    return ColumnarFeed(feed_path, columns, countries, categories, victim_sets)
+
+
+def _restore_utf8(value):
+    # iter_byte_spans decodes as latin-1 to keep byte offsets; raw UTF-8 text
+    # round-trips back, while \u escapes already produced the right characters
+    try:
+        return value.encode("latin-1").decode("utf-8")
+    except UnicodeError:
+        return value
+
+
+def missing_number(column):
+    """
+    The value that marks a missing score in a threat_score/popularity column:
+    the smallest value of its dtype.
+    """
+    return np.iinfo(column.dtype).min
+
+
+def _number(value):
+    # Same test as the streaming predicate (any int, bool included); values
+    # beyond int64, which no real feed has, are clamped
+    if isinstance(value, int):
+        return min(max(value, MISSING_NUMBER + 1), 2 ** 63 - 1)
+    return MISSING_NUMBER
+
+
+def _narrow(values):
+    # Scores and popularity fit in int16 in practice; keep int64 otherwise so
+    # every value compares exactly as it does in the streaming engine
+    column = np.frombuffer(values, dtype=np.int64)
+    present = column[column != MISSING_NUMBER]
+    small = np.iinfo(np.int16)
+    if len(present) and (present.min() <= small.min or present.max() > small.max):
+        return column
+    return np.where(column == MISSING_NUMBER, small.min, column).astype(np.int16)
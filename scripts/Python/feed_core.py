@@ -0,0 +1,268 @@
+# Kaspersky TDF ByCountry — Shared country-filter core
+# The load → filter → write engine behind every Python entry point
+# (kaspersky_tdf.py, kaspersky_tdf_es.py, filter_country*.py and
+# filtrado_pais*.py): records are parsed incrementally, matched by the
+# compiled country filter (or read through the country index / worker
+# processes) and streamed to the output writer. The scripts only differ in
+# their messages, which come from MESSAGES["en"] or MESSAGES["es"].
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import json
+import logging
+import os
+import sys
+
+# feed_parallel (process pool) is imported only when workers are requested
+from feed_countries import is_country_code
+from feed_filter import compile_filter, filter_records
+from feed_index import load_country_index
+from feed_io import RecordCounter, ensure_not_empty, iter_file_records, open_record_writer
+
+MESSAGES = {
+    "en": {
+        "input_not_found": "Input file not found: {path}",
+        "invalid_json": "Invalid JSON format in input file: {error}",
+        "read_denied": "Permission denied reading: {path}. Details: {error}",
+        "empty_input": "Input file is empty or contains no records.",
+        "mkdir_denied": "Permission denied creating directory: {path}. Details: {error}",
+        "write_denied": "Permission denied writing to: {path}. Details: {error}",
+        "invalid_country": (
+            "Invalid country code: '{code}'. "
+            "Must be a two-letter ISO 3166-1 alpha-2 code (e.g., ES, US, DE)."
+        ),
+        "unknown_country": "Country code '{code}' is not a valid ISO 3166-1 alpha-2 code.",
+        "workers": "--workers must be at least 1.",
+        "progress": {},
+    },
+    "es": {
+        "input_not_found": "Archivo de entrada no encontrado: {path}",
+        "invalid_json": "Formato JSON inválido en el archivo de entrada: {error}",
+        "read_denied": "Permiso denegado al leer: {path}. Detalles: {error}",
+        "empty_input": "El archivo de entrada está vacío o no contiene registros.",
+        "mkdir_denied": "Permiso denegado al crear el directorio: {path}. Detalles: {error}",
+        "write_denied": "Permiso denegado al escribir en: {path}. Detalles: {error}",
+        "invalid_country": (
+            "Código de país inválido: '{code}'. "
+            "Debe ser un código de dos letras ISO 3166-1 alpha-2 (ej. ES, US, DE)."
+        ),
+        "unknown_country": "El código '{code}' no es un código ISO 3166-1 alpha-2 válido.",
+        "workers": "--workers debe ser al menos 1.",
+        # Keyed by the English message (and its fixed arguments) that
+        # feed_api, feed_retry and feed_server log.
+        "progress": {
+            "Resuming the download after %d bytes...": "Reanudando la descarga tras %d bytes...",
+            "Feed file not modified since the last download — using cached copy.": (
+                "El archivo del feed no ha cambiado desde la última descarga — se usa la copia en caché."
+            ),
+            "Feed not modified since the last download — using cached copy.": (
+                "El feed no ha cambiado desde la última descarga — se usa la copia en caché."
+            ),
+            "Feed file saved to: %s": "Archivo del feed guardado en: %s",
+            "Resolving download link from API response...": (
+                "Resolviendo el enlace de descarga de la respuesta de la API..."
+            ),
+            "%s Retrying %s in %.1fs (retry %d/%d)...": "%s Reintentando %s en %.1fs (reintento %d/%d)...",
+            "download": "la descarga",
+            "API request": "la petición a la API",
+            "Rate limit exceeded. Wait before retrying.": (
+                "Límite de peticiones superado. Espere antes de volver a intentarlo."
+            ),
+            "Kaspersky TIP API internal server error. Try again later.": (
+                "Error interno del servidor de Kaspersky TIP API. Inténtelo más tarde."
+            ),
+            "Kaspersky TIP API is temporarily unavailable (502). Try again in a few minutes.": (
+                "Kaspersky TIP API temporalmente no disponible (502). Inténtelo en unos minutos."
+            ),
+            "Kaspersky TIP API is temporarily unavailable (503). Try again in a few minutes.": (
+                "Kaspersky TIP API temporalmente no disponible (503). Inténtelo en unos minutos."
+            ),
+            "Kaspersky TIP API gateway timeout (504). Try again in a few minutes.": (
+                "Tiempo de espera en la puerta de enlace de Kaspersky TIP API (504). Inténtelo en unos minutos."
+            ),
+            "Request to Kaspersky TIP API timed out.": "La petición a Kaspersky TIP API superó el tiempo de espera.",
+            "Refresh failed, still serving the previous snapshot: %s": (
+                "La actualización falló, se sigue sirviendo la copia anterior: %s"
+            ),
+            "Feed refreshed: %d records.": "Feed actualizado: %d registros.",
+        },
+    },
+}
+ENGLISH = MESSAGES["en"]
+PROGRESS_LOGGERS = ("feed_api", "feed_retry", "feed_server")
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+def validate_country_code(country_code, messages=ENGLISH):
+    if len(country_code) != 2 or not country_code.isalpha():
+        raise ValueError(messages["invalid_country"].format(code=country_code))
+    if not is_country_code(country_code):
+        raise ValueError(messages["unknown_country"].format(code=country_code))
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def stream_input_file(input_file, messages=ENGLISH):
+    try:
+        yield from iter_file_records(input_file)
+    except json.JSONDecodeError as e:
+        raise ValueError(messages["invalid_json"].format(error=e))
+    except PermissionError as e:
+        raise PermissionError(messages["read_denied"].format(path=input_file, error=e))
+
+
+def load_input_file(input_file, messages=ENGLISH):
+    """
+    Lazy iterator over the records of a local feed (.json/.ndjson, optionally
+    .gz/.zst); raises before returning if the file is missing or empty.
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(messages["input_not_found"].format(path=input_file))
+    return ensure_not_empty(stream_input_file(input_file, messages), messages["empty_input"])
+
+
+# ---------------------------------------------------------------------------
+# Filtering
+# ---------------------------------------------------------------------------
+
+def filter_country(records, country, mode="combined"):
+    """
+    Stream the records of `country` under a filter mode (geo, admin,
+    combined, victims, ...; see feed_filter.FILTER_MODES).
+    """
+    return compile_filter(country=country, mode=mode).filter(records)
+
+
+def select_engine(input_file, country, mode="combined", workers=1, messages=ENGLISH,
+                  record_filter=None, use_index=True, allow_empty=False):
+    """
+    Return (matching records, engine) for a local feed when an engine can
+    skip the non-matching records — the country index when a fresh one
+    exists, worker processes when workers > 1 — or None when one streamed
+    pass is the way to go. engine.count is the number of records in the
+    feed once the records are consumed. The workers apply record_filter
+    (default: country and mode); the index knows only country and mode.
+    """
+    if workers < 1:
+        raise ValueError(messages["workers"])
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(messages["input_not_found"].format(path=input_file))
+    index = load_country_index(input_file) if use_index else None
+    if index:
+        return index.iter_records(country, mode), index
+    if workers > 1:
+        from feed_parallel import ParallelFilter
+
+        record_filter = record_filter or compile_filter(country=country, mode=mode)
+        parallel = ParallelFilter(
+            input_file, workers, filter_records, record_filter.tree,
+            empty_message=None if allow_empty else messages["empty_input"],
+        )
+        return parallel, parallel
+    return None
+
+
+def select_country(input_file, country, mode="combined", workers=1, messages=ENGLISH,
+                   allow_empty=False):
+    """
+    Return (matching records, counter) for a local feed, using the fastest
+    engine available (see select_engine), otherwise one streamed pass.
+    counter.count is the number of records in the feed once the records
+    are consumed. An empty feed raises ValueError unless allow_empty.
+    """
+    selected = select_engine(input_file, country, mode, workers, messages, allow_empty=allow_empty)
+    if selected:
+        return selected
+    if allow_empty:
+        feed = RecordCounter(stream_input_file(input_file, messages))
+    else:
+        feed = RecordCounter(load_input_file(input_file, messages))
+    return filter_country(feed, country, mode), feed
+
+
+# ---------------------------------------------------------------------------
+# Progress
+# ---------------------------------------------------------------------------
+
+class ProgressFormatter(logging.Formatter):
+    """
+    Render the library's progress messages as indented CLI lines, in the
+    language of messages["progress"].
+    """
+
+    def __init__(self, messages=ENGLISH):
+        super().__init__()
+        self.translations = messages["progress"]
+
+    def format(self, record):
+        text = self.translations.get(record.msg, record.msg)
+        if record.args:
+            text %= tuple(self.translations.get(arg, arg) if isinstance(arg, str) else arg
+                          for arg in record.args)
+        return f"  {text}"
+
+
+def show_progress(messages=ENGLISH):
+    """
+    Print the progress that feed_api, feed_retry and feed_server log (retries,
+    resumed downloads, cache hits, refreshes) to stdout. Only the CLIs call
+    this; embedded, the library stays silent unless logging is configured.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(ProgressFormatter(messages))
+    for name in PROGRESS_LOGGERS:
+        logger = logging.getLogger(name)
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def ensure_output_directory(output_file, messages=ENGLISH):
+    output_dir = os.path.dirname(output_file)
+    if output_dir and not os.path.exists(output_dir):
+        try:
+            os.makedirs(output_dir)
+        except PermissionError as e:
+            raise PermissionError(messages["mkdir_denied"].format(path=output_dir, error=e))
+
+
+def open_output_writer(output_file, output_format="json", messages=ENGLISH):
+    try:
+        return open_record_writer(output_file, output_format)
+    except PermissionError as e:
+        raise PermissionError(messages["write_denied"].format(path=output_file, error=e))
+
+
+def save_output_file(output_file, data, output_format="json", messages=ENGLISH):
+    """
+    Stream records to output_file and return how many were written.
+    """
+    with open_output_writer(output_file, output_format, messages) as writer:
+        for record in data:
+            writer.write(record)
+    return writer.count
+
+
+def filter_file(input_file, output_file, country, mode="combined", output_format="json",
+                workers=1, messages=ENGLISH, allow_empty=False):
+    """
+    Filter a local feed by country into output_file in one streaming pass.
+    Returns (records in the feed, records written). With allow_empty, an
+    empty feed gives an empty output instead of a ValueError.
+    """
+    records, counter = select_country(input_file, country, mode, workers, messages, allow_empty)
+    ensure_output_directory(output_file, messages)
+    matched = save_output_file(output_file, records, output_format, messages)
+    return counter.count, matched
@@ -0,0 +1,176 @@
+# Kaspersky TDF ByCountry — Differential output
+# Keeps a compact state snapshot of the last output (IP -> 64-bit hash of the
+# record) and splits the next run into added, modified and removed record
+# sets, so consumers such as firewalls apply the daily delta instead of
+# reloading the full list.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import hashlib
+import json
+import os
+import sys
+from array import array
+
+from feed_io import COMPRESSION_SUFFIXES, OUTPUT_EXTENSIONS, open_record_writer
+from feed_lookup import IpIndex, int_to_ip, ip_to_int
+
+STATE_DIR = os.path.join("feeds", ".state")
+STATE_SUFFIX = ".state"
+STATE_VERSION = 1
+DIFF_SETS = ("added", "modified", "removed")
+_LOW64 = (1 << 64) - 1
+
+# State layout (like the country index sidecar): one JSON header line, then
+# three unsigned 64-bit arrays of `count` items each: high and low halves of
+# the sorted ip_to_int keys, and the record hashes.
+
+
+def record_hash(entry):
+    """
+    64-bit BLAKE2b of the record's canonical JSON (key order does not matter).
+    """
+    text = json.dumps(entry, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def load_state(path):
+    """
+    Return the previous snapshot as an IpIndex of key -> hash, or None when
+    there is no state yet (the first run reports every record as added).
+    """
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != STATE_VERSION:
+                raise ValueError(f"unsupported version {header.get('version')}")
+            columns = []
+            for _ in range(3):
+                column = array("Q")
+                column.fromfile(f, header["count"])
+                if header["byteorder"] != sys.byteorder:
+                    column.byteswap()
+                columns.append(column)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, KeyError, ValueError) as e:
+        raise ValueError(f"Unreadable diff state {path} ({e}); delete it to start a new baseline.")
+    high, low, hashes = columns
+    return IpIndex(((hi << 64) | lo, value) for hi, lo, value in zip(high, low, hashes))
+
+
+def save_state(path, hashes, label=""):
+    """
+    Atomically write {key: hash} as the new snapshot.
+    """
+    state_dir = os.path.dirname(path)
+    if state_dir:
+        os.makedirs(state_dir, exist_ok=True)
+    keys = sorted(hashes)
+    header = {
+        "version": STATE_VERSION,
+        "byteorder": sys.byteorder,
+        "label": label,
+        "count": len(keys),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(json.dumps(header, separators=(",", ":")).encode("ascii") + b"\n")
+        array("Q", [key >> 64 for key in keys]).tofile(f)
+        array("Q", [key & _LOW64 for key in keys]).tofile(f)
+        array("Q", [hashes[key] for key in keys]).tofile(f)
+    os.replace(tmp_path, path)
+
+
+def default_state_path(label):
+    return os.path.join(STATE_DIR, label + STATE_SUFFIX)
+
+
+def diff_output_paths(output_file):
+    """
+    {set name: path}: "<stem>_added<ext>", "<stem>_modified<ext>", ... where
+    <ext> is the full output extension (e.g. .cidr.txt.gz).
+    """
+    extensions = [
+        extension + suffix
+        for extension in OUTPUT_EXTENSIONS.values()
+        for suffix in [""] + list(COMPRESSION_SUFFIXES)
+    ]
+    for extension in sorted(extensions, key=len, reverse=True):
+        if output_file.endswith(extension):
+            stem = output_file[: -len(extension)]
+            break
+    else:
+        stem, extension = os.path.splitext(output_file)
+    return {name: f"{stem}_{name}{extension}" for name in DIFF_SETS}
+
+
+class FeedDiff:
+    """
+    Classify a record stream against the previous snapshot. Records are keyed
+    by IP; a repeated IP keeps its first record, and records without a valid
+    IP cannot be tracked and are skipped.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous
+        self.hashes = {}  # the new snapshot
+        self.counts = dict.fromkeys(DIFF_SETS + ("unchanged", "skipped"), 0)
+
+    def classify(self, entry):
+        """
+        Return "added", "modified", "unchanged" or "skipped".
+        """
+        key = ip_to_int(entry.get("ip", ""))
+        if key is None or key in self.hashes:
+            change = "skipped"
+        else:
+            digest = self.hashes[key] = record_hash(entry)
+            old = self.previous.find(key) if self.previous else []
+            if not old:
+                change = "added"
+            elif old[0] != digest:
+                change = "modified"
+            else:
+                change = "unchanged"
+        self.counts[change] += 1
+        return change
+
+    def removed(self):
+        """
+        Keys of the previous snapshot that are absent from the new one.
+        """
+        if self.previous is None:
+            return
+        for key, _ in self.previous.find_range(0, (1 << 128) - 1):
+            if key not in self.hashes:
+                self.counts["removed"] += 1
+                yield key
+
+
+def write_diff(records, output_file, state_path, output_format="json", label=""):
+    """
+    Stream `records` into the added / modified / removed files next to
+    output_file (removed records carry only their "ip") and replace the state
+    snapshot once every file is complete. Returns (paths, counts).
+    """
+    paths = diff_output_paths(output_file)
+    diff = FeedDiff(load_state(state_path))
+    writers = {}
+    try:
+        for name in DIFF_SETS:
+            writers[name] = open_record_writer(paths[name], output_format)
+        for entry in records:
+            change = diff.classify(entry)
+            if change in writers:
+                writers[change].write(entry)
+        for key in diff.removed():
+            writers["removed"].write({"ip": int_to_ip(key)})
+    finally:
+        for writer in writers.values():
+            writer.close()
+    save_state(state_path, diff.hashes, label)
+    return paths, diff.counts
@@ -0,0 +1,95 @@
+# Kaspersky TDF ByCountry — Concurrent feed streams
+# Runs record streams (one per TIP feed endpoint) in background threads and
+# interleaves their records into a single stream through a bounded queue, so
+# a multi-feed run takes as long as the slowest feed rather than the sum of
+# all of them, a paged download fetches the next pages while the current one
+# is filtered, and memory stays bounded by the queue size.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import queue
+import threading
+
+BATCH_SIZE = 1000  # records handed over per queue item
+QUEUE_BATCHES = 16  # batches buffered across all streams
+_PUT_TIMEOUT = 0.5  # seconds between checks for a cancelled consumer
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class ConcurrentStreams:
+    """
+    Iterate the records of several sources at once. `sources` maps a label to
+    a callable returning an iterable of records; every source is opened and
+    consumed in its own thread. Records keep their order within a source, but
+    sources are interleaved batch by batch. The first error raised by a
+    source (including SystemExit) is re-raised in the consuming thread.
+
+    .counts holds the records received per label, .count the total.
+    """
+
+    def __init__(self, sources, batch_size=BATCH_SIZE, queue_batches=QUEUE_BATCHES):
+        self.sources = dict(sources)
+        self.batch_size = batch_size
+        self.counts = dict.fromkeys(self.sources, 0)
+        self._queue = queue.Queue(maxsize=queue_batches)
+        self._cancelled = threading.Event()
+
+    @property
+    def count(self):
+        return sum(self.counts.values())
+
+    def _put(self, item):
+        # Block while the queue is full, but give up once the consumer is gone
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, label, source):
+        try:
+            batch = []
+            for entry in source():
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    if not self._put((label, batch)):
+                        return
+                    batch = []
+            if batch and not self._put((label, batch)):
+                return
+            self._put((label, _DONE))
+        except BaseException as e:  # handed to the consumer, which re-raises it
+            self._put((label, _Failure(e)))
+
+    def __iter__(self):
+        threads = [
+            threading.Thread(
+                target=self._run, args=(label, source), name=f"feed-{label}", daemon=True
+            )
+            for label, source in self.sources.items()
+        ]
+        for thread in threads:
+            thread.start()
+        running = len(threads)
+        try:
+            while running:
+                label, item = self._queue.get()
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, _Failure):
+                    raise item.error
+                else:
+                    self.counts[label] += len(item)
+                    yield from item
+        finally:
+            self._cancelled.set()
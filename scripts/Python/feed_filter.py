@@ -0,0 +1,369 @@
+# Kaspersky TDF ByCountry — Filter expressions
+# Parses --where expressions such as
+#
+#   threat_score >= 80 and category in (botnet_cnc, phishing) and last_seen within 30d
+#
+# once, into a predicate over record dicts (streaming, index and parallel
+# engines) or into a boolean mask over the NumPy columns (columnar engine), so
+# every condition is applied in the same single pass as the country filter.
+# Country modes are expressions of the same language: geo == ES, admin == ES,
+# country == ES (combined) and victims == ES (the threat targets users in ES,
+# per users_geo), or-ed together for the +victims modes.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import operator
+import re
+import time
+from functools import reduce
+
+from feed_countries import victim_countries
+from feed_time import MISSING_TIME, format_epoch, parse_duration, parse_feed_time, parse_time_value
+
+NUMBER_FIELDS = ("threat_score", "popularity")
+TIME_FIELDS = ("first_seen", "last_seen")
+# country: ip_geo or whois country; victims: any users_geo country
+COUNTRY_FIELDS = ("geo", "admin", "country", "victims")
+SET_FIELDS = COUNTRY_FIELDS + ("category",)
+FILTER_FIELDS = NUMBER_FIELDS + TIME_FIELDS + SET_FIELDS
+# Filter mode -> country sections it matches
+FILTER_MODES = {
+    "geo": ("geo",),
+    "admin": ("admin",),
+    "combined": ("geo", "admin"),
+    "victims": ("victims",),
+    "geo+victims": ("geo", "victims"),
+    "admin+victims": ("admin", "victims"),
+    "combined+victims": ("geo", "admin", "victims"),
+}
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+TIME_WINDOW_FIELD = "last_seen"  # --since / --until drop stale indicators
+
+_TOKEN = re.compile(r"""\s*(?:(<=|>=|==|!=|<|>|=)|([(),])|"([^"]*)"|'([^']*)'|([^\s(),<>=!"']+))""")
+_KEYWORDS = ("and", "or", "not", "in", "within")
+# and-clauses are evaluated cheapest first; timestamps need parsing
+_COST = {field: 1 for field in FILTER_FIELDS}
+_COST.update({field: 2 for field in TIME_FIELDS})
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid filter expression near: '{text[position:]}'")
+        op, punct, double, single, word = match.groups()
+        if op:
+            tokens.append(("op", "==" if op == "=" else op))
+        elif punct:
+            tokens.append((punct, punct))
+        elif word is not None and word.lower() in _KEYWORDS:
+            tokens.append((word.lower(), word))
+        else:
+            tokens.append(("value", double if double is not None else single if single is not None else word))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent over: expr := term ("or" term)*, term := factor ("and"
+    factor)*, factor := "not" factor | "(" expr ")" | comparison.
+    Produces nested tuples: ("and", ...), ("or", ...), ("not", node),
+    ("cmp", field, op, number), ("in", field, frozenset) and ("all",).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self, kind=None):
+        if self.position >= len(self.tokens):
+            raise ValueError(f"Unexpected end of filter expression: '{self.text}'")
+        token = self.tokens[self.position]
+        if kind and token[0] != kind:
+            raise ValueError(f"Expected {kind} but found '{token[1]}' in: '{self.text}'")
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        node = self.expression()
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.position][1]}' in: '{self.text}'")
+        return node
+
+    def expression(self):
+        nodes = [self.term()]
+        while self.peek() == "or":
+            self.take()
+            nodes.append(self.term())
+        return nodes[0] if len(nodes) == 1 else ("or",) + tuple(nodes)
+
+    def term(self):
+        nodes = [self.factor()]
+        while self.peek() == "and":
+            self.take()
+            nodes.append(self.factor())
+        return nodes[0] if len(nodes) == 1 else ("and",) + tuple(nodes)
+
+    def factor(self):
+        if self.peek() == "not":
+            self.take()
+            return ("not", self.factor())
+        if self.peek() == "(":
+            self.take()
+            node = self.expression()
+            self.take(")")
+            return node
+        return self.comparison()
+
+    def comparison(self):
+        field = self.take("value").lower()
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field: '{field}'. Use one of: {', '.join(FILTER_FIELDS)}.")
+        kind = self.peek()
+        if kind == "within":
+            self.take()
+            return within_clause(field, self.take("value"))
+        negate = kind == "not"
+        if negate:
+            self.take()
+            kind = self.peek()
+        if kind == "in":
+            self.take()
+            self.take("(")
+            values = [self.take("value")]
+            while self.peek() == ",":
+                self.take()
+                values.append(self.take("value"))
+            self.take(")")
+            node = in_clause(field, values)
+        elif not negate and kind == "op":
+            node = compare_clause(field, self.take(), self.take("value"))
+        else:
+            raise ValueError(f"Expected a comparison after '{field}' in: '{self.text}'")
+        return ("not", node) if negate else node
+
+
+def within_clause(field, duration, now=None):
+    if field not in TIME_FIELDS:
+        raise ValueError(f"'within' applies to {' and '.join(TIME_FIELDS)}, not '{field}'.")
+    now = time.time() if now is None else now
+    return ("cmp", field, ">=", int(now) - parse_duration(duration))
+
+
+def compare_clause(field, op, value):
+    if field in SET_FIELDS:
+        if op not in ("==", "!="):
+            raise ValueError(f"'{field}' supports ==, !=, in and not in.")
+        node = in_clause(field, [value])
+        return ("not", node) if op == "!=" else node
+    if field in TIME_FIELDS:
+        return ("cmp", field, op, parse_time_value(value))
+    try:
+        return ("cmp", field, op, int(value))
+    except ValueError:
+        raise ValueError(f"'{field}' must be compared with an integer, not '{value}'.")
+
+
+def in_clause(field, values):
+    if field not in SET_FIELDS:
+        raise ValueError(f"'in' applies to {', '.join(SET_FIELDS)}, not '{field}'.")
+    if field == "category":
+        return ("in", field, frozenset(value.lower() for value in values))
+    countries = frozenset(value.upper() for value in values)
+    for code in countries:
+        if len(code) != 2 or not code.isalpha():
+            raise ValueError(f"Invalid country code in filter: '{code}'.")
+    return ("in", field, countries)
+
+
+def mode_sections(mode):
+    """
+    Country sections (geo, admin, victims) matched by a filter mode.
+    """
+    sections = FILTER_MODES.get(mode)
+    if sections is None:
+        raise ValueError(f"Unknown filter mode: '{mode}'. Use one of: {', '.join(FILTER_MODES)}.")
+    return sections
+
+
+def country_clause(country, mode):
+    sections = mode_sections(mode)
+    if "geo" in sections and "admin" in sections:  # one test for both fields
+        sections = ("country",) + tuple(s for s in sections if s not in ("geo", "admin"))
+    values = frozenset((country.upper(),))
+    clauses = tuple(("in", section, values) for section in sections)
+    return clauses[0] if len(clauses) == 1 else ("or",) + clauses
+
+
+def parse_filter(text):
+    """
+    Parse a filter expression into its clause tree (see _Parser).
+    """
+    return _Parser(text).parse()
+
+
+# ---------------------------------------------------------------------------
+# Record predicates
+# ---------------------------------------------------------------------------
+
+def _predicate(node):
+    kind = node[0]
+    if kind == "all":
+        return lambda entry: True
+    if kind == "not":
+        inner = _predicate(node[1])
+        return lambda entry: not inner(entry)
+    if kind in ("and", "or"):
+        clauses = sorted(node[1:], key=_cost) if kind == "and" else node[1:]
+        predicates = [_predicate(clause) for clause in clauses]
+        if kind == "and":
+            return reduce(lambda a, b: lambda entry: a(entry) and b(entry), predicates)
+        return reduce(lambda a, b: lambda entry: a(entry) or b(entry), predicates)
+    if kind == "in":
+        return _set_predicate(node[1], node[2])
+    return _compare_predicate(node[1], COMPARISONS[node[2]], node[3])
+
+
+def _set_predicate(field, values):
+    # Missing strings compare as ""
+    if field == "category":
+        return lambda entry: (entry.get("category") or "").lower() in values
+    if field == "geo":
+        return lambda entry: entry.get("ip_geo", "").upper() in values
+    if field == "admin":
+        return lambda entry: (entry.get("ip_whois") or {}).get("country", "").upper() in values
+    if field == "victims":
+        return lambda entry: not values.isdisjoint(victim_countries(entry.get("users_geo")))
+    return lambda entry: (
+        entry.get("ip_geo", "").upper() in values
+        or (entry.get("ip_whois") or {}).get("country", "").upper() in values
+    )
+
+
+def _compare_predicate(field, compare, target):
+    # A missing number or timestamp never satisfies a comparison
+    if field in TIME_FIELDS:
+        def matches(entry):
+            seconds = parse_feed_time(entry.get(field))
+            return seconds != MISSING_TIME and compare(seconds, target)
+        return matches
+
+    def matches(entry):
+        value = entry.get(field)
+        return isinstance(value, int) and compare(value, target)
+    return matches
+
+
+def _cost(node):
+    if node[0] in ("cmp", "in"):
+        return _COST[node[1]]
+    return max((_cost(child) for child in node[1:] if isinstance(child, tuple)), default=1)
+
+
+# ---------------------------------------------------------------------------
+# Columnar masks (numpy is imported with feed_columnar, only when used)
+# ---------------------------------------------------------------------------
+
+def _mask(node, feed):
+    from feed_columnar import missing_number, np
+
+    kind = node[0]
+    if kind == "all":
+        return np.ones(feed.count, dtype=bool)
+    if kind == "not":
+        return ~_mask(node[1], feed)
+    if kind == "and":
+        return np.logical_and.reduce([_mask(clause, feed) for clause in node[1:]])
+    if kind == "or":
+        return np.logical_or.reduce([_mask(clause, feed) for clause in node[1:]])
+    if kind == "in":
+        return _set_mask(feed, node[1], node[2])
+    column = feed.columns[node[1]]
+    missing = MISSING_TIME if node[1] in TIME_FIELDS else missing_number(column)
+    return (column != missing) & COMPARISONS[node[2]](column, np.int64(node[3]))
+
+
+def _set_mask(feed, field, values):
+    from feed_columnar import mask_countries, mask_victims, np
+
+    if field == "category":
+        codes = [code for value, code in feed.categories.codes.items() if value.lower() in values]
+        return np.isin(feed.columns["category"], codes)
+    if field == "victims":
+        return mask_victims(feed, values)
+    if field == "country":
+        return mask_countries(feed, "geo", values) | mask_countries(feed, "admin", values)
+    return mask_countries(feed, field, values)
+
+
+class RecordFilter:
+    """
+    A compiled filter: `matches(entry)` tests one record, `filter(records)`
+    streams the matches and `mask(feed)` evaluates it over a ColumnarFeed.
+    """
+
+    def __init__(self, tree, description=""):
+        self.tree = tree
+        self.description = description
+        self.matches = _predicate(tree)
+
+    def filter(self, records):
+        matches = self.matches
+        return (entry for entry in records if matches(entry))
+
+    def mask(self, feed):
+        from feed_columnar import np
+
+        if np is None:
+            raise ValueError("Columnar masks require the optional 'numpy' package (pip install numpy).")
+        return _mask(self.tree, feed)
+
+
+def filter_records(records, tree):
+    """
+    Stream the records matching a clause tree (picklable, for worker processes).
+    """
+    return RecordFilter(tree).filter(records)
+
+
+def compile_filter(where=None, country=None, mode="combined", since=None, until=None):
+    """
+    Compile a country filter (country + mode), a --where expression and a
+    --since / --until window on last_seen (epoch seconds, inclusive) into one
+    RecordFilter; with none of them, every record matches.
+    """
+    clauses = []
+    described = []
+    if country:
+        clauses.append(country_clause(country, mode))
+    if where:
+        clauses.append(parse_filter(where))
+        described.append(where)
+    if since is not None:
+        clauses.append(("cmp", TIME_WINDOW_FIELD, ">=", since))
+        described.append(f"{TIME_WINDOW_FIELD} >= {format_epoch(since)}")
+    if until is not None:
+        clauses.append(("cmp", TIME_WINDOW_FIELD, "<=", until))
+        described.append(f"{TIME_WINDOW_FIELD} <= {format_epoch(until)}")
+    if not clauses:
+        return RecordFilter(("all",))
+    tree = clauses[0] if len(clauses) == 1 else ("and",) + tuple(clauses)
+    return RecordFilter(tree, " and ".join(described))
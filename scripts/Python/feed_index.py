@@ -0,0 +1,174 @@
+# Kaspersky TDF ByCountry — Country index sidecar
+# Builds a sidecar file next to a local feed that maps every geo (ip_geo),
+# admin (ip_whois.country) and victims (users_geo) country code to the byte
+# ranges of its records, so
+# repeated country queries read only the matching records instead of
+# reparsing the whole feed.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import sys
+from array import array
+
+from feed_countries import victim_countries
+from feed_filter import mode_sections
+from feed_io import STREAM_CHUNK_SIZE, compression_for, iter_byte_spans
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 2  # 2: victims section
+SAMPLE_SIZE = 1024 * 1024  # bytes hashed from the head and the tail of the feed
+
+# Sidecar layout: one JSON header line, followed by the raw span arrays. Each
+# section entry in the header is [byte offset after the header, span count];
+# a span is a pair of unsigned 64-bit integers (record start, record end).
+
+
+def index_path_for(feed_path):
+    return feed_path + INDEX_SUFFIX
+
+
+def feed_fingerprint(feed_path):
+    """
+    Identify a feed file by size, mtime and a SHA-256 of its first and last MiB.
+    """
+    stat = os.stat(feed_path)
+    digest = hashlib.sha256()
+    with open(feed_path, "rb") as f:
+        digest.update(f.read(SAMPLE_SIZE))
+        if stat.st_size > SAMPLE_SIZE:
+            f.seek(max(SAMPLE_SIZE, stat.st_size - SAMPLE_SIZE))
+            digest.update(f.read(SAMPLE_SIZE))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+def build_country_index(feed_path):
+    """
+    Scan the feed once and write its country index sidecar. Returns the index path.
+    """
+    if compression_for(feed_path):
+        raise ValueError("The country index needs random access; use an uncompressed feed file.")
+    sections = {"geo": {}, "admin": {}, "victims": {}}
+    total = 0
+    fingerprint = feed_fingerprint(feed_path)
+
+    try:
+        for start, end, entry in iter_byte_spans(feed_path):
+            total += 1
+            if not isinstance(entry, dict):
+                continue
+            geo = entry.get("ip_geo", "").upper()
+            adm = (entry.get("ip_whois") or {}).get("country", "").upper()
+            codes = [("geo", geo), ("admin", adm)]
+            codes += [("victims", code) for code in victim_countries(entry.get("users_geo"))]
+            for section, code in codes:
+                if code:
+                    spans = sections[section].get(code)
+                    if spans is None:
+                        spans = sections[section][code] = array("Q")
+                    spans.append(start)
+                    spans.append(end)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format in input file: {e}")
+
+    header = {
+        "version": INDEX_VERSION,
+        "byteorder": sys.byteorder,
+        "fingerprint": fingerprint,
+        "total": total,
+        "sections": {},
+    }
+    position = 0
+    for section, codes in sections.items():
+        header["sections"][section] = {}
+        for code in sorted(codes):
+            header["sections"][section][code] = [position, len(codes[code]) // 2]
+            position += codes[code].itemsize * len(codes[code])
+
+    index_path = index_path_for(feed_path)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb", buffering=STREAM_CHUNK_SIZE) as f:
+        f.write(json.dumps(header, separators=(",", ":")).encode("ascii") + b"\n")
+        for section, codes in sections.items():
+            for code in sorted(codes):
+                codes[code].tofile(f)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+class CountryIndex:
+    """
+    Read-only view over a feed and its sidecar index.
+    """
+
+    def __init__(self, feed_path, header, data_offset):
+        self.feed_path = feed_path
+        self.count = header["total"]  # records in the whole feed
+        self._header = header
+        self._data_offset = data_offset
+        self._swap = header["byteorder"] != sys.byteorder
+
+    def countries(self, section):
+        return sorted(self._header["sections"][section])
+
+    def spans(self, country, section):
+        entry = self._header["sections"][section].get(country.upper())
+        spans = array("Q")
+        if entry:
+            position, count = entry
+            with open(index_path_for(self.feed_path), "rb") as f:
+                f.seek(self._data_offset + position)
+                spans.fromfile(f, count * 2)
+            if self._swap:
+                spans.byteswap()
+        return list(zip(spans[0::2], spans[1::2]))
+
+    def matching_spans(self, country, mode):
+        sections = mode_sections(mode)
+        if len(sections) == 1:
+            return self.spans(country, sections[0])
+        merged = []
+        for span in heapq.merge(*(self.spans(country, section) for section in sections)):
+            if not merged or merged[-1] != span:
+                merged.append(span)
+        return merged
+
+    def iter_records(self, country, mode):
+        """
+        Yield the matching records in feed order, reading only their byte ranges.
+        """
+        spans = self.matching_spans(country, mode)
+        if not spans:
+            return
+        with open(self.feed_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start, end in spans:
+                    yield json.loads(mm[start:end].decode("utf-8"))
+
+
+def load_country_index(feed_path):
+    """
+    Return a CountryIndex for the feed, or None if the sidecar is missing,
+    unreadable or stale (the feed's size, mtime or sampled hash changed).
+    """
+    index_path = index_path_for(feed_path)
+    if compression_for(feed_path) or not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, "rb") as f:
+            line = f.readline()
+            header = json.loads(line)
+    except (OSError, ValueError):
+        return None
+    if header.get("version") != INDEX_VERSION:
+        return None
+    if header.get("fingerprint") != feed_fingerprint(feed_path):
+        return None
+    return CountryIndex(feed_path, header, len(line))
@@ -0,0 +1,433 @@
+# Kaspersky TDF ByCountry — Streaming feed I/O
+# Incremental reader and writer for IP Reputation feed records, shared by the
+# Python scripts so that a full feed never has to sit in memory at once.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import codecs
+import csv
+import gzip
+import io
+import json
+import os
+import re
+from functools import partial
+from itertools import chain
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst feeds
+    zstandard = None
+
+FEED_NAME = "IP_Reputation"  # prefix of every generated feed file name
+DEFAULT_LISTEN = "127.0.0.1:8750"  # serve mode (feed_server.py), here so the CLI need not import it
+DEFAULT_REFRESH_INTERVAL = 3600  # seconds
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MiB per read / network chunk
+_UTF8_BOM = b"\xef\xbb\xbf"
+GZIP_LEVEL = 6  # level 9 (the gzip default) is much slower for little gain on JSON
+ZSTD_LEVEL = 3
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+OUTPUT_EXTENSIONS = {
+    "json": ".json", "ndjson": ".ndjson", "csv": ".csv", "iplist": ".txt", "cidr": ".cidr.txt",
+}
+CSV_FIELDS = [
+    "id", "ip", "threat_score", "category", "first_seen", "last_seen",
+    "popularity", "ip_geo", "users_geo",
+]
+CSV_WHOIS_FIELDS = [
+    "net_range", "net_name", "descr", "created", "updated", "country",
+    "asn", "contact_owner_name", "contact_owner_code",
+]
+
+MAX_RECORD_SIZE = 1024 * 1024  # far above any real record; caps the parser's look-ahead
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")  # what may still follow a number cut by a chunk
+
+
+# ---------------------------------------------------------------------------
+# Compression
+# ---------------------------------------------------------------------------
+
+def compression_for(path):
+    """
+    Return "gzip", "zstd" or None depending on the file extension.
+    """
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+
+def open_feed_file(path, mode="rb"):
+    """
+    Open a feed file in binary mode, transparently (de)compressing .gz and .zst.
+    """
+    compression = compression_for(path)
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError(
+                f"'{path}' is zstd-compressed; install the optional 'zstandard' package "
+                "(pip install zstandard) to read or write .zst files."
+            )
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if "w" in mode else None
+        return zstandard.open(path, mode, cctx=cctx)
+    return open(path, mode, buffering=STREAM_CHUNK_SIZE)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def read_chunks(fileobj, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield fixed-size byte chunks from a binary file object until EOF.
+    """
+    return iter(partial(fileobj.read, chunk_size), b"")
+
+
+def iter_text_chunks(byte_chunks, encoding="utf-8-sig"):
+    """
+    Decode an iterable of byte chunks into text chunks, handling characters
+    split across chunk boundaries.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_spans(text_chunks, offset=0, in_array=None, array_slice=False,
+                    max_record_size=MAX_RECORD_SIZE):
+    """
+    Incrementally parse a JSON array (or whitespace-separated JSON values, as in
+    NDJSON) and yield (start, end, record) for every top-level record.
+
+    start/end are absolute character positions in the stream, counted from
+    `offset`. When `in_array` is None the container type is detected from the
+    first non-whitespace character. Array elements must be separated by
+    exactly one comma. With `array_slice` the stream is a run of array
+    elements without the brackets (a byte range cut by feed_parallel), which
+    may end with the comma that preceded the next range.
+
+    A record that still does not parse once `max_record_size` characters are
+    buffered past its start raises JSONDecodeError, so a malformed feed fails
+    at the bad record instead of pulling the rest of the stream into memory.
+    """
+    chunks = iter(text_chunks)
+    buf = ""
+    base = offset  # absolute position of buf[0]
+    pos = 0
+    eof = False
+    if array_slice:
+        in_array = False
+    comma_separated = bool(in_array or array_slice)
+    after_value = False  # a value was read; the next one must follow a comma
+    after_comma = False
+
+    while True:
+        # Advance to the next significant character, reading more as needed.
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            base += pos
+            buf, pos = "", 0
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                buf = chunk
+
+        if pos >= len(buf):
+            if in_array:
+                raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+            return
+
+        char = buf[pos]
+        if in_array is None:
+            in_array = comma_separated = char == "["
+            if in_array:
+                pos += 1
+            continue
+
+        if char == "]":
+            if not in_array:
+                raise json.JSONDecodeError("Unexpected ']'", buf, pos)
+            if after_comma:
+                raise json.JSONDecodeError("Trailing comma before ']'", buf, pos)
+            _ensure_whitespace_only(chain([buf[pos + 1:]], chunks))
+            return
+
+        if char == ",":
+            if not (comma_separated and after_value):
+                raise json.JSONDecodeError("Unexpected ','", buf, pos)
+            pos += 1
+            after_value, after_comma = False, True
+            continue
+
+        if after_value and comma_separated:
+            raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+
+        try:
+            record, end = _DECODER.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof or len(buf) - pos > max_record_size:
+                raise
+            end = None
+        # A number cut by the end of the buffer may go on in the next chunk
+        # (456 read as 45 + 6, 3.5e2 as 3.5 + e2): read more before accepting it.
+        if end is None or (not eof and _NUMBER_TAIL.match(buf, end)):
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                base += pos
+                buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        yield base + pos, base + end, record
+        pos = end
+        after_value, after_comma = True, False
+
+
+def _ensure_whitespace_only(text_chunks):
+    # Consume what follows a closing ']' (so upstream tees complete) and reject
+    # anything but whitespace, as json.load would.
+    for chunk in text_chunks:
+        extra = chunk.lstrip(_WHITESPACE)
+        if extra:
+            raise json.JSONDecodeError("Extra data", chunk, len(chunk) - len(extra))
+
+
+def iter_json_records(text_chunks):
+    """
+    Yield records one at a time from a JSON array or NDJSON text stream.
+    """
+    for _, _, record in iter_json_spans(text_chunks):
+        yield record
+
+
+def iter_file_records(path):
+    """
+    Yield records one at a time from a JSON array or NDJSON file on disk
+    (plain, .gz or .zst).
+    """
+    with open_feed_file(path, "rb") as f:
+        yield from iter_json_records(iter_text_chunks(read_chunks(f)))
+
+
+def iter_byte_spans(path):
+    """
+    Yield (start, end, record) for every record of an uncompressed feed file,
+    where start/end are byte offsets into the file. Record values are meant
+    for ASCII fields (country codes, scores); read the byte range back and
+    decode it as UTF-8 when the full record is needed.
+    """
+    # latin-1 maps every byte to exactly one character, so character positions
+    # reported by the parser are byte offsets into the file. JSON structure and
+    # country codes are pure ASCII, so they decode unchanged.
+    with open(path, "rb") as f:
+        offset = len(_UTF8_BOM) if f.read(len(_UTF8_BOM)) == _UTF8_BOM else 0
+        f.seek(offset)
+        chunks = iter_text_chunks(read_chunks(f), encoding="latin-1")
+        yield from iter_json_spans(chunks, offset=offset)
+
+
+def peek_json_kind(chunks):
+    """
+    Return the first non-whitespace character of a text or byte stream ('[' for
+    an array, '{' for an object) together with an iterator over the full stream.
+    """
+    chunks = iter(chunks)
+    consumed = []
+    for chunk in chunks:
+        consumed.append(chunk)
+        stripped = chunk.lstrip()
+        if stripped:
+            kind = stripped[:1]
+            if isinstance(kind, bytes):
+                kind = kind.decode("latin-1")
+            return kind, chain(consumed, chunks)
+    return "", iter(consumed)
+
+
+def ensure_not_empty(records, message):
+    """
+    Raise ValueError(message) if `records` yields nothing; otherwise return an
+    iterator over all of its records.
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        raise ValueError(message)
+    return chain([first], records)
+
+
+class RecordCounter:
+    """
+    Wrap a record iterable and count the records that flow through it.
+    """
+
+    def __init__(self, records):
+        self._records = records
+        self.count = 0
+
+    def __iter__(self):
+        for record in self._records:
+            self.count += 1
+            yield record
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+class RecordWriter:
+    """
+    Base class for streaming writers: records are emitted as they arrive and
+    nothing is accumulated. Subclasses implement write().
+    """
+
+    def __init__(self, fileobj):
+        self._fp = fileobj
+        self.count = 0
+
+    def finish(self):
+        # Write any trailer (e.g. the closing bracket) without closing the handle
+        pass
+
+    def close(self):
+        self.finish()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonArrayWriter(RecordWriter):
+    """
+    Write records one at a time as a JSON array, laid out exactly like
+    json.dump(records, f, indent=4, ensure_ascii=False).
+    """
+
+    def __init__(self, fileobj, indent=4):
+        super().__init__(fileobj)
+        self._indent = indent
+        self._pad = " " * indent
+
+    def write(self, record):
+        text = json.dumps(record, indent=self._indent, ensure_ascii=False)
+        prefix = "[\n" if self.count == 0 else ",\n"
+        self._fp.write(prefix + self._pad + text.replace("\n", "\n" + self._pad))
+        self.count += 1
+
+    def finish(self):
+        self._fp.write("[]" if self.count == 0 else "\n]")
+
+
+class NdjsonWriter(RecordWriter):
+    """
+    Write one compact JSON record per line.
+    """
+
+    def write(self, record):
+        self._fp.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+
+class CsvWriter(RecordWriter):
+    """
+    Write records as CSV rows; ip_whois fields are flattened to whois_* columns.
+    """
+
+    def __init__(self, fileobj):
+        super().__init__(fileobj)
+        self._csv = csv.writer(fileobj)
+        self._csv.writerow(CSV_FIELDS + ["whois_" + name for name in CSV_WHOIS_FIELDS])
+
+    def write(self, record):
+        whois = record.get("ip_whois") or {}
+        self._csv.writerow(
+            [record.get(name, "") for name in CSV_FIELDS]
+            + [whois.get(name, "") for name in CSV_WHOIS_FIELDS]
+        )
+        self.count += 1
+
+
+class IpListWriter(RecordWriter):
+    """
+    Write the bare `ip` of every record, one per line (firewall / SIEM lists).
+    """
+
+    def write(self, record):
+        self._fp.write(f"{record.get('ip', '')}\n")
+        self.count += 1
+
+
+class CidrWriter(RecordWriter):
+    """
+    Write the IPs of all records collapsed into the minimal set of CIDR
+    prefixes, one per line. Addresses are collected and written on finish().
+    """
+
+    def __init__(self, fileobj):
+        super().__init__(fileobj)
+        self._ips = set()
+
+    def write(self, record):
+        self._ips.add(record.get("ip", ""))
+        self.count += 1
+
+    def finish(self):
+        # Imported here: feed_ranges builds on this module
+        from feed_lookup import ip_to_int
+        from feed_ranges import collapse_cidrs
+
+        keys = (ip_to_int(ip) for ip in self._ips)
+        for cidr in collapse_cidrs(key for key in keys if key is not None):
+            self._fp.write(f"{cidr}\n")
+
+
+RECORD_WRITERS = {
+    "json": JsonArrayWriter,
+    "ndjson": NdjsonWriter,
+    "csv": CsvWriter,
+    "iplist": IpListWriter,
+    "cidr": CidrWriter,
+}
+
+
+def open_record_writer(path, output_format="json"):
+    """
+    Open `path` for writing through a large buffered handle (compressed when
+    it ends in .gz or .zst) and return a streaming writer for `output_format`.
+    """
+    writer_class = RECORD_WRITERS.get(output_format)
+    if writer_class is None:
+        raise ValueError(
+            f"Unknown output format: '{output_format}'. Use {', '.join(RECORD_WRITERS)}."
+        )
+    newline = "" if output_format == "csv" else None  # csv module writes its own line endings
+    handle = io.TextIOWrapper(open_feed_file(path, "wb"), encoding="utf-8", newline=newline)
+    return writer_class(handle)
+
+
+def tee_records(records, writer):
+    """
+    Pass records through unchanged while also writing each one to `writer`.
+    """
+    for record in records:
+        writer.write(record)
+        yield record
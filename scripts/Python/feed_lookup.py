@@ -0,0 +1,142 @@
+# Kaspersky TDF ByCountry — IP lookup engine
+# Converts IPv4/IPv6 addresses to integers and keeps them in sorted arrays, so
+# large lists of IPs can be checked against the feed with binary search (or
+# NumPy's vectorized searchsorted, when installed) instead of a linear scan
+# per address. Used by --lookup-file (through feed_ranges.py) and by the
+# /ip and /lookup queries of serve mode.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import ipaddress
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+IPV4_MAPPED = 0xFFFF << 32  # IPv4 addresses are stored as ::ffff:a.b.c.d
+_KEY64_LIMIT = 1 << 64  # mapped IPv4 keys fit in an unsigned 64-bit array
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    # numpy is optional (it speeds up batch lookups) and slow to import, so it
+    # is loaded on the first batch lookup rather than with this module
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def ip_to_int(value):
+    """
+    Convert an IPv4/IPv6 string into a 128-bit integer (IPv4 mapped into
+    ::ffff:0:0/96). Returns None for missing or malformed addresses.
+    """
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if address.version == 4:
+        return IPV4_MAPPED | int(address)
+    return int(address)
+
+
+def int_to_ip(key):
+    """
+    Inverse of ip_to_int (mapped keys come back as dotted IPv4).
+    """
+    address = ipaddress.IPv6Address(key)
+    return str(address.ipv4_mapped or address)
+
+
+class IpIndex:
+    """
+    Sorted integer index from IP keys to integer values (e.g. record positions).
+    Mapped IPv4 keys live in an unsigned 64-bit array; IPv6 keys, which need
+    128 bits, in a sorted list. Duplicate keys keep all their values.
+    """
+
+    def __init__(self, pairs):
+        v4, v6 = [], []
+        for key, value in pairs:
+            if key is not None:
+                (v4 if key < _KEY64_LIMIT else v6).append((key, value))
+        v4.sort()
+        v6.sort()
+        self._v4_keys = array("Q", [key for key, _ in v4])
+        self._v4_values = array("Q", [value for _, value in v4])
+        self._v6_keys = [key for key, _ in v6]
+        self._v6_values = array("Q", [value for _, value in v6])
+        self.count = len(v4) + len(v6)
+
+    def _section(self, key):
+        if key < _KEY64_LIMIT:
+            return self._v4_keys, self._v4_values
+        return self._v6_keys, self._v6_values
+
+    def find(self, key):
+        """
+        Return the values stored for `key` (empty list if absent).
+        """
+        keys, values = self._section(key)
+        i = bisect_left(keys, key)
+        found = []
+        while i < len(keys) and keys[i] == key:
+            found.append(values[i])
+            i += 1
+        return found
+
+    def __contains__(self, key):
+        keys, _ = self._section(key)
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+
+    def find_many(self, queries):
+        """
+        Yield (key, values) for every query key present in the index.
+        `queries` must be sorted and distinct (see parse_query_lines).
+        """
+        v4 = [key for key in queries if key < _KEY64_LIMIT]
+        v6 = [key for key in queries if key >= _KEY64_LIMIT]
+        if v4 and _numpy() is not None:
+            yield from self._find_many_numpy(v4)
+        else:
+            yield from self._find_many_sorted(v4, self._v4_keys, self._v4_values)
+        yield from self._find_many_sorted(v6, self._v6_keys, self._v6_values)
+
+    @staticmethod
+    def _find_many_sorted(queries, keys, values):
+        # Queries are sorted, so every search starts where the previous ended
+        i = 0
+        for key in queries:
+            i = bisect_left(keys, key, i)
+            if i == len(keys):
+                return
+            if keys[i] == key:
+                j = i
+                while j < len(keys) and keys[j] == key:
+                    j += 1
+                yield key, values[i:j].tolist()
+                i = j
+
+    def find_range(self, start, end):
+        """
+        Yield (key, value) for every indexed key in [start, end], in key order.
+        """
+        # Every key of the 64-bit section is below every key of the IPv6 section
+        for keys, values in ((self._v4_keys, self._v4_values), (self._v6_keys, self._v6_values)):
+            i, j = bisect_left(keys, start), bisect_right(keys, end)
+            yield from zip(keys[i:j], values[i:j])
+
+    def _find_many_numpy(self, queries):
+        np = _numpy()
+        keys = np.frombuffer(self._v4_keys, dtype=np.uint64)
+        values = np.frombuffer(self._v4_values, dtype=np.uint64)
+        wanted = np.array(queries, dtype=np.uint64)
+        left = np.searchsorted(keys, wanted, side="left")
+        right = np.searchsorted(keys, wanted, side="right")
+        for i in np.flatnonzero(right > left).tolist():
+            yield queries[i], values[left[i]:right[i]].tolist()
@@ -0,0 +1,291 @@
+# Kaspersky TDF ByCountry — Feed merge and deduplication
+# Merges several feed files (e.g. --save-raw snapshots of different days or
+# endpoints) into one, keeping a single record per IP chosen by a resolution
+# policy. Records are deduplicated in a hash map; when it holds more than
+# --max-records records it is spilled to disk as a sorted run, and the runs
+# are k-way merged at the end, so memory stays bounded. Records without an IP
+# are spilled alongside, in input order.
+#
+#   python scripts/Python/feed_merge.py feeds/IP_Reputation_raw_*.json.gz --resolve max_threat_score
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from itertools import groupby
+
+from feed_io import (
+    COMPRESSION_EXTENSIONS,
+    FEED_NAME,
+    OUTPUT_EXTENSIONS,
+    STREAM_CHUNK_SIZE,
+    iter_file_records,
+    open_record_writer,
+)
+from feed_lookup import ip_to_int
+from feed_time import parse_feed_time
+
+DEFAULT_MAX_RECORDS = 500_000  # records held in memory before spilling a run
+RESOLUTIONS = ("max_threat_score", "latest_last_seen", "first", "last")
+_KEY_WIDTH = 32  # hex digits of a 128-bit ip_to_int key; sorts like the integer
+
+
+def _score(entry):
+    value = entry.get("threat_score")
+    return value if isinstance(value, int) else -1
+
+
+def resolution_rank(resolution):
+    """
+    Return rank(entry, order) for a policy: of the records sharing an IP the
+    one with the highest rank is kept. `order` is the record's position in
+    the merged input stream, so remaining ties go to the later record.
+    """
+    if resolution == "max_threat_score":
+        return lambda entry, order: (_score(entry), parse_feed_time(entry.get("last_seen")), order)
+    if resolution == "latest_last_seen":
+        return lambda entry, order: (parse_feed_time(entry.get("last_seen")), _score(entry), order)
+    if resolution == "first":
+        return lambda entry, order: (-order,)
+    if resolution == "last":
+        return lambda entry, order: (order,)
+    raise ValueError(f"Unknown resolution: '{resolution}'. Use {', '.join(RESOLUTIONS)}.")
+
+
+class FeedMerger:
+    """
+    Deduplicate a record stream by IP. add() every record, then iterate
+    results() for the survivors in IP order, followed by the records without
+    a valid IP (which cannot be deduplicated and are kept as they are).
+    `unkeyed` counts the latter.
+    """
+
+    def __init__(self, resolution="max_threat_score", max_records=DEFAULT_MAX_RECORDS, temp_dir=None):
+        if max_records < 1:
+            raise ValueError("--max-records must be at least 1.")
+        self.rank = resolution_rank(resolution)
+        self.max_records = max_records
+        self.temp_dir = temp_dir
+        self.read = 0
+        self.unkeyed = 0
+        self._best = {}  # key -> (rank, record)
+        self._unkeyed = []  # records without an IP, in input order
+        self._runs = []  # paths of spilled sorted runs
+        self._unkeyed_path = None  # spilled records without an IP
+        self._workdir = None
+
+    def add(self, entry):
+        rank = self.rank(entry, self.read)
+        self.read += 1
+        key = ip_to_int(entry.get("ip", ""))
+        if key is None:
+            if self._held() >= self.max_records:
+                self._spill()
+            self._unkeyed.append(entry)
+            self.unkeyed += 1
+            return
+        best = self._best.get(key)
+        if best is None or rank > best[0]:
+            if best is None and self._held() >= self.max_records:
+                self._spill()
+            self._best[key] = (rank, entry)
+
+    def _held(self):
+        return len(self._best) + len(self._unkeyed)
+
+    @property
+    def spills(self):
+        return len(self._runs)
+
+    def _spill(self):
+        # One sorted run: "<key hex>\t[rank, record]" per line; records
+        # without an IP are appended to a single file, one per line
+        if self._workdir is None:
+            self._workdir = tempfile.TemporaryDirectory(prefix="feed_merge_", dir=self.temp_dir)
+        if self._best:
+            path = os.path.join(self._workdir.name, f"run{len(self._runs):04d}.ndjson")
+            with open(path, "w", encoding="utf-8", buffering=STREAM_CHUNK_SIZE) as f:
+                for key in sorted(self._best):
+                    rank, entry = self._best[key]
+                    f.write(f"{key:0{_KEY_WIDTH}x}\t{json.dumps([rank, entry], ensure_ascii=False)}\n")
+            self._runs.append(path)
+            self._best.clear()
+        if self._unkeyed:
+            self._unkeyed_path = os.path.join(self._workdir.name, "unkeyed.ndjson")
+            with open(self._unkeyed_path, "a", encoding="utf-8", buffering=STREAM_CHUNK_SIZE) as f:
+                for entry in self._unkeyed:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._unkeyed.clear()
+
+    def _iter_run(self, path):
+        with open(path, "r", encoding="utf-8", buffering=STREAM_CHUNK_SIZE) as f:
+            for line in f:
+                rank, entry = json.loads(line[_KEY_WIDTH + 1:])
+                yield line[:_KEY_WIDTH], tuple(rank), entry
+
+    def _iter_unkeyed(self):
+        if self._unkeyed_path:
+            with open(self._unkeyed_path, "r", encoding="utf-8", buffering=STREAM_CHUNK_SIZE) as f:
+                for line in f:
+                    yield json.loads(line)
+        yield from self._unkeyed
+
+    def _iter_memory(self):
+        for key in sorted(self._best):
+            rank, entry = self._best[key]
+            yield f"{key:0{_KEY_WIDTH}x}", rank, entry
+
+    def results(self):
+        """
+        Yield one record per IP (in IP order), then the records without an IP.
+        """
+        try:
+            if not self._runs:
+                for _, _, entry in self._iter_memory():
+                    yield entry
+            else:
+                runs = [self._iter_run(path) for path in self._runs] + [self._iter_memory()]
+                merged = heapq.merge(*runs, key=lambda item: item[0])
+                for _, group in groupby(merged, key=lambda item: item[0]):
+                    yield max(group, key=lambda item: item[1])[2]
+            yield from self._iter_unkeyed()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._workdir is not None:
+            self._workdir.cleanup()
+            self._workdir = None
+
+
+def merge_feeds(input_files, output_file, output_format="json", resolution="max_threat_score",
+                max_records=DEFAULT_MAX_RECORDS, temp_dir=None):
+    """
+    Merge the input files into output_file. Returns the FeedMerger and the
+    number of records written.
+    """
+    merger = FeedMerger(resolution, max_records, temp_dir)
+    try:
+        for input_file in input_files:
+            try:
+                for entry in iter_file_records(input_file):
+                    merger.add(entry)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON format in input file {input_file}: {e}")
+        with open_record_writer(output_file, output_format) as writer:
+            for entry in merger.results():
+                writer.write(entry)
+    finally:
+        merger.close()
+    return merger, writer.count
+
+
+def generate_merged_filename(compress=None, output_format="json"):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = OUTPUT_EXTENSIONS[output_format] + COMPRESSION_EXTENSIONS.get(compress, "")
+    return f"feeds/{FEED_NAME}_merged_{timestamp}{extension}"
+
+
+def display_disclaimer():
+    print(
+        "\n*** DISCLAIMER ***\n"
+        "This script is provided as a Proof of Concept (PoC) for educational and "
+        "demonstration purposes only.\n"
+        "It is not an official tool from Kaspersky, nor does it come with any "
+        "guarantees or warranties of functionality or support.\n"
+        "Use at your own risk, and always validate the results in your environment.\n"
+    )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Kaspersky TDF ByCountry — merge feed files, keeping one record per IP."
+        )
+    )
+    parser.add_argument(
+        "input_files", nargs="+",
+        help="Feed files to merge (.json/.ndjson, optionally .gz/.zst).",
+    )
+    parser.add_argument(
+        "--resolve", choices=RESOLUTIONS, default="max_threat_score",
+        help=(
+            "Which record to keep for a repeated IP: max_threat_score (ties: latest "
+            "last_seen), latest_last_seen (ties: highest threat_score), first or last "
+            "(default: max_threat_score)."
+        ),
+    )
+    parser.add_argument(
+        "--output-file", default=None,
+        help="Output path. Default: feeds/IP_Reputation_merged_TIMESTAMP.<format>.",
+    )
+    parser.add_argument(
+        "--output-format", choices=sorted(OUTPUT_EXTENSIONS), default="json",
+        help="Output format (default: json).",
+    )
+    parser.add_argument(
+        "--compress", choices=sorted(COMPRESSION_EXTENSIONS), default=None,
+        help="Compress the auto-generated output file.",
+    )
+    parser.add_argument(
+        "--max-records", type=int, default=DEFAULT_MAX_RECORDS,
+        help=(
+            "Records kept in memory before a sorted run is spilled to disk "
+            f"(default: {DEFAULT_MAX_RECORDS})."
+        ),
+    )
+    parser.add_argument(
+        "--temp-dir", default=None,
+        help="Directory for spilled runs (default: the system temporary directory).",
+    )
+    return parser.parse_args()
+
+
+def main():
+    display_disclaimer()
+    args = parse_arguments()
+
+    try:
+        for input_file in args.input_files:
+            if not os.path.exists(input_file):
+                raise FileNotFoundError(f"Input file not found: {input_file}")
+        output_file = args.output_file or generate_merged_filename(args.compress, args.output_format)
+        output_dir = os.path.dirname(output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        print(f"Merging {len(args.input_files)} files (resolution: {args.resolve})...")
+        merger, written = merge_feeds(
+            args.input_files, output_file, args.output_format, args.resolve,
+            args.max_records, args.temp_dir,
+        )
+
+        print("\n--- Summary ---")
+        print(f"  Input files   : {len(args.input_files)}")
+        print(f"  Records read  : {merger.read}")
+        print(f"  Records saved : {written}")
+        print(f"  Duplicates    : {merger.read - written}")
+        if merger.unkeyed:
+            print(f"  Without IP    : {merger.unkeyed} (kept as they are)")
+        if merger.spills:
+            print(f"  Spilled runs  : {merger.spills}")
+        print(f"  Output saved  : {output_file}\n")
+
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
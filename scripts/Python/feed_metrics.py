@@ -0,0 +1,247 @@
+# Kaspersky TDF ByCountry — Pipeline instrumentation
+# Measures wall time, CPU time, records, bytes and peak RSS for every stage of
+# a run (API request, download, parse, filter, write) and exports them as JSON
+# or in the Prometheus textfile-collector format.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows: peak RSS is reported as null
+    resource = None
+
+METRICS_FORMATS = ("json", "prometheus")
+PROMETHEUS_PREFIX = "kaspersky_tdf"
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process so far, in KiB (None on Windows).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.records = 0
+        self.bytes = 0
+        self.peak_rss_kb = None
+        self.cpu_parent = None  # set for stages whose CPU time is estimated
+
+    @property
+    def records_per_s(self):
+        return self.records / self.wall_s if self.records and self.wall_s else None
+
+    def as_dict(self):
+        return {
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "records": self.records,
+            "bytes": self.bytes,
+            "records_per_s": round(self.records_per_s) if self.records_per_s else None,
+            "peak_rss_kb": self.peak_rss_kb,
+        }
+
+
+class PipelineMetrics:
+    """
+    Per-stage timings for one run. The streamed stages are nested generators
+    (write pulls from filter, which pulls from parse, which pulls downloaded
+    chunks), so every stage is charged only its own time: time spent inside a
+    nested stage is subtracted from the stage that called it.
+
+    Wall time is measured for every record. CPU time is only sampled around
+    whole stages and byte chunks, where the clock cost is negligible; the CPU
+    time of per-record stages is apportioned from their enclosing stage in
+    proportion to wall time.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.time()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._stack = []  # frames: [stage, child wall, child cpu, measures cpu]
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageMetrics(name)
+        return stage
+
+    def _push(self, stage, cpu):
+        if not cpu and stage.cpu_parent is None:
+            parent = next((f[0] for f in reversed(self._stack) if f[3]), None)
+            stage.cpu_parent = parent.name if parent else ""
+        self._stack.append([stage, 0.0, 0.0, cpu])
+
+    def _pop(self, wall, cpu_time=None):
+        stage, child_wall, child_cpu, _ = self._stack.pop()
+        stage.wall_s += wall - child_wall
+        if cpu_time is not None:
+            stage.cpu_s += cpu_time - child_cpu
+        if self._stack:
+            self._stack[-1][1] += wall
+            if cpu_time is not None:
+                cpu_frame = next((f for f in reversed(self._stack) if f[3]), None)
+                if cpu_frame:
+                    cpu_frame[2] += cpu_time
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block of code as one stage (wall and CPU time).
+        """
+        stage = self._stage(name)
+        self._push(stage, cpu=True)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            self._pop(time.perf_counter() - wall, time.process_time() - cpu)
+            stage.peak_rss_kb = peak_rss_kb()
+
+    def timed(self, name, iterable, unit="records"):
+        """
+        Wrap an iterator, charging the time spent producing each item to `name`.
+        unit="bytes" counts the size of byte chunks (and samples CPU time);
+        unit="records" counts items.
+        """
+        stage = self._stage(name)
+        if unit == "bytes":
+            return self._timed_chunks(stage, iter(iterable))
+        return self._timed_records(stage, iter(iterable))
+
+    def _timed_chunks(self, stage, iterator):
+        while True:
+            self._push(stage, cpu=True)
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                self._pop(time.perf_counter() - wall, time.process_time() - cpu)
+            stage.bytes += len(chunk)
+            yield chunk
+        stage.peak_rss_kb = peak_rss_kb()
+
+    def _timed_records(self, stage, iterator):
+        # Hot path (once per record): _push/_pop inlined, one reused frame
+        self._push(stage, cpu=False)
+        frame = self._stack.pop()
+        stack = self._stack
+        clock = time.perf_counter
+        records = 0
+        wall = 0.0
+        try:
+            while True:
+                frame[1] = 0.0
+                stack.append(frame)
+                start = clock()
+                try:
+                    record = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed = clock() - start
+                    stack.pop()
+                    wall += elapsed - frame[1]
+                    if stack:
+                        stack[-1][1] += elapsed
+                records += 1
+                yield record
+        finally:
+            stage.wall_s += wall
+            stage.records += records
+            stage.peak_rss_kb = peak_rss_kb()
+
+    def add_bytes(self, name, count):
+        self._stage(name).bytes += count
+
+    def finish(self):
+        """
+        Apportion estimated CPU time and return the metrics as a dict.
+        """
+        for parent in [s for s in self.stages.values() if s.cpu_parent is None]:
+            group = [s for s in self.stages.values() if s.cpu_parent == parent.name]
+            wall = parent.wall_s + sum(s.wall_s for s in group)
+            if group and wall:
+                pool = parent.cpu_s
+                for stage in group + [parent]:
+                    stage.cpu_s = pool * stage.wall_s / wall
+        return {
+            "started": round(self.started, 3),
+            "wall_s": round(time.perf_counter() - self._start_wall, 4),
+            "cpu_s": round(time.process_time() - self._start_cpu, 4),
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+        }
+
+
+def format_prometheus(metrics, labels=None):
+    """
+    Render finished metrics in the Prometheus text exposition format.
+    """
+    def series(name, value, extra=None):
+        merged = dict(labels or {}, **(extra or {}))
+        label_text = ",".join(f'{k}="{v}"' for k, v in sorted(merged.items()))
+        return f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {value}"
+
+    lines = []
+    run_series = (
+        ("last_run_timestamp_seconds", "gauge", "Start time of the last run.", metrics["started"]),
+        ("run_wall_seconds", "gauge", "Wall time of the last run.", metrics["wall_s"]),
+        ("run_cpu_seconds", "gauge", "CPU time of the last run.", metrics["cpu_s"]),
+        ("peak_rss_bytes", "gauge", "Peak resident set size.", (metrics["peak_rss_kb"] or 0) * 1024),
+    )
+    for name, kind, help_text, value in run_series:
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}",
+                  f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}",
+                  series(name, value)]
+    for key, name, help_text in (
+        ("wall_s", "stage_wall_seconds", "Wall time spent in each pipeline stage."),
+        ("cpu_s", "stage_cpu_seconds", "CPU time spent in each pipeline stage."),
+        ("records", "stage_records", "Records handled by each pipeline stage."),
+        ("bytes", "stage_bytes", "Bytes transferred or written by each pipeline stage."),
+    ):
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}",
+                  f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge"]
+        for stage, values in metrics["stages"].items():
+            lines.append(series(name, values[key], {"stage": stage}))
+    for name, value in sorted((metrics.get("counts") or {}).items()):
+        lines += [f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge", series(name, value)]
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path, metrics, metrics_format="json", labels=None):
+    """
+    Write finished metrics atomically (the textfile collector may read at any time).
+    """
+    if metrics_format not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format: '{metrics_format}'. Use json or prometheus.")
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if metrics_format == "prometheus":
+            f.write(format_prometheus(metrics, labels))
+        else:
+            json.dump(dict(metrics, labels=labels or {}), f, indent=4)
+    os.replace(tmp_path, path)
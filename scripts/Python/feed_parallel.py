@@ -0,0 +1,169 @@
+# Kaspersky TDF ByCountry — Parallel filtering engine
+# Splits a large local feed (JSON array or NDJSON) into byte ranges that start
+# on record boundaries, filters every range in a separate process and yields
+# the matches back in original feed order.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from feed_io import (
+    RecordCounter,
+    compression_for,
+    iter_json_spans,
+    iter_text_chunks,
+    read_chunks,
+)
+
+RANGES_PER_WORKER = 4  # more ranges than workers keeps every core busy until the end
+SCAN_WINDOW = 1024 * 1024
+MAX_RECORD_SIZE = 64 * 1024  # a single feed record is far smaller than this
+_DECODER = json.JSONDecoder()
+_RECORD_START = re.compile(r",\s*\{")
+_WHITESPACE = b" \t\r\n"
+EMPTY_INPUT = "Input file is empty or contains no records."
+
+
+def _detect_layout(f, size):
+    # Returns (in_array, first byte of the first record, end of the last record)
+    head = f.read(SCAN_WINDOW).lstrip(b"\xef\xbb\xbf" + _WHITESPACE)
+    if head[:1] != b"[":
+        return False, 0, size
+    f.seek(0)
+    start = f.read(SCAN_WINDOW).index(b"[") + 1
+    f.seek(max(0, size - SCAN_WINDOW))
+    tail = f.read()
+    end = size - len(tail) + tail.rindex(b"]")
+    return True, start, end
+
+
+def _next_array_record(f, position, limit):
+    # Find the first top-level array element starting at or after `position`:
+    # a '{' preceded by ',' whose object is followed by ',' (or by the closing
+    # ']' at `limit`). Nested objects such as ip_whois follow a ':' and never
+    # match; a candidate that does not decode is inside a string and skipped.
+    window_start = max(0, position - 1)
+    while window_start < limit:
+        f.seek(window_start)
+        window = f.read(min(SCAN_WINDOW, limit - window_start)).decode("latin-1")
+        at_limit = window_start + len(window) >= limit
+        resume = None
+        for match in _RECORD_START.finditer(window):
+            brace = match.end() - 1
+            near_edge = not at_limit and len(window) - brace < MAX_RECORD_SIZE
+            try:
+                _, end = _DECODER.raw_decode(window, brace)
+            except ValueError:
+                if near_edge:
+                    resume = match.start()  # record cut by the window: re-read from here
+                    break
+                continue
+            following = window[end:].lstrip()
+            if following[:1] == "," or (not following and at_limit):
+                return window_start + brace
+            if not following:
+                resume = match.start()
+                break
+        if resume is None:
+            if at_limit:
+                return limit
+            resume = len(window) - 64  # overlap so a ",  {" split by the window is seen
+        window_start += max(1, resume)
+    return limit
+
+
+def split_record_ranges(path, parts):
+    """
+    Split a plain JSON array or NDJSON file into at most `parts` byte ranges
+    that each start on a record boundary. Returns (in_array, [(start, end), ...]).
+    """
+    if compression_for(path):
+        raise ValueError("--workers needs an uncompressed JSON or NDJSON input file.")
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        in_array, first, last = _detect_layout(f, size)
+        boundaries = [first]
+        for i in range(1, parts):
+            candidate = max(first + (last - first) * i // parts, boundaries[-1])
+            if in_array:
+                boundary = _next_array_record(f, candidate, last)
+            else:
+                f.seek(candidate)
+                f.readline()
+                boundary = min(f.tell(), last)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        boundaries.append(last)
+    return in_array, [(s, e) for s, e in zip(boundaries, boundaries[1:]) if e > s]
+
+
+def _read_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        for chunk in read_chunks(f):
+            if len(chunk) >= remaining:
+                yield chunk[:remaining]
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _filter_range(path, start, end, in_array, filter_fn, filter_args):
+    # Worker entry point: parse one byte range and return (records seen, matches).
+    # Array ranges are parsed as a slice of comma-separated elements, so no
+    # enclosing brackets are needed.
+    chunks = iter_text_chunks(_read_range(path, start, end))
+    spans = iter_json_spans(chunks, in_array=False, array_slice=in_array)
+    records = RecordCounter(record for _, _, record in spans)
+    matched = list(filter_fn(records, *filter_args))
+    return records.count, matched
+
+
+def _has_record(path, ranges, in_array):
+    # True if the ranges hold at least one record; only reads up to the first.
+    if not ranges:
+        return False
+    chunks = iter_text_chunks(_read_range(path, ranges[0][0], ranges[-1][1]))
+    return next(iter_json_spans(chunks, in_array=False, array_slice=in_array), None) is not None
+
+
+class ParallelFilter:
+    """
+    Iterate over the records of `path` accepted by filter_fn(records, *filter_args),
+    filtering byte ranges in a process pool. After iteration, `count` holds the
+    total number of records in the feed.
+
+    Like the streaming reader, raises ValueError(empty_message) up front when
+    the feed holds no records (unless empty_message is None).
+    """
+
+    def __init__(self, path, workers, filter_fn, *filter_args, empty_message=EMPTY_INPUT):
+        self.path = path
+        self.workers = workers
+        self.filter_fn = filter_fn
+        self.filter_args = filter_args
+        self.count = 0
+        self.in_array, self.ranges = split_record_ranges(path, workers * RANGES_PER_WORKER)
+        if empty_message is not None and not _has_record(path, self.ranges, self.in_array):
+            raise ValueError(empty_message)
+
+    def __iter__(self):
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(
+                    _filter_range, self.path, start, end, self.in_array,
+                    self.filter_fn, self.filter_args,
+                )
+                for start, end in self.ranges
+            ]
+            for future in futures:
+                count, matched = future.result()
+                self.count += count
+                yield from matched
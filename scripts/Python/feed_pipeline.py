@@ -0,0 +1,216 @@
+# Kaspersky TDF ByCountry — Reusable feed pipeline
+# Library entry point for embedding the pipeline in another Python process
+# (an ingest service, a notebook) instead of running the CLI per query. A
+# FeedPipeline owns the feed source (local file or the TIP API session) and an
+# in-memory snapshot with per-country and per-IP indexes, and keeps both warm
+# across calls:
+#
+#   pipeline = FeedPipeline(input_file="feeds/IP_Reputation_raw.json")
+#   for record in pipeline.filter("ES", "combined", where="threat_score >= 80"):
+#       ...
+#   pipeline.lookup("203.0.113.42")
+#   pipeline.load()  # pick up a newer feed
+#
+# Errors are raised, never turned into an exit: ValueError (bad arguments or
+# configuration, unparseable feed), FileNotFoundError, PermissionError,
+# feed_api.ApiError and feed_retry.RetryExhausted.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import heapq
+import os
+import time
+
+from feed_api import (
+    DEFAULT_PREFETCH_PAGES,
+    build_feed_fetcher,
+    load_config,
+    validate_token_present,
+)
+from feed_core import load_input_file, validate_country_code
+from feed_countries import victim_countries
+from feed_filter import FILTER_MODES, compile_filter, mode_sections
+from feed_lookup import IpIndex, ip_to_int
+from feed_ranges import RangeIndex, parse_ip_range
+from feed_retry import RetryScheduler
+from feed_time import parse_time_bound
+
+
+class FeedSnapshot:
+    """
+    Immutable in-memory copy of the feed. Country, IP and whois range indexes
+    hold record positions, so every query returns records in feed order.
+    """
+
+    def __init__(self, records, source):
+        self.records = []
+        self.geo = {}
+        self.admin = {}
+        self.victims = {}  # users_geo country -> positions
+        ip_keys = []
+        net_ranges = []
+        for entry in records:
+            position = len(self.records)
+            self.records.append(entry)
+            geo = entry.get("ip_geo", "").upper()
+            adm = (entry.get("ip_whois") or {}).get("country", "").upper()
+            if geo:
+                self.geo.setdefault(geo, []).append(position)
+            if adm:
+                self.admin.setdefault(adm, []).append(position)
+            for code in victim_countries(entry.get("users_geo")):
+                self.victims.setdefault(code, []).append(position)
+            ip_keys.append((ip_to_int(entry.get("ip", "")), position))
+            interval = parse_ip_range((entry.get("ip_whois") or {}).get("net_range"))
+            if interval is not None:
+                net_ranges.append((interval[0], interval[1], position))
+        self.ips = IpIndex(ip_keys)
+        self.net_ranges = RangeIndex(net_ranges)
+        self.source = source
+        self.loaded_at = time.time()
+
+    @property
+    def count(self):
+        return len(self.records)
+
+    def positions(self, country, mode):
+        country = country.upper()
+        lists = [getattr(self, section).get(country, []) for section in mode_sections(mode)]
+        if len(lists) == 1:
+            return lists[0]
+        merged = []
+        for position in heapq.merge(*lists):
+            if not merged or merged[-1] != position:
+                merged.append(position)
+        return merged
+
+    def select(self, country, mode):
+        return (self.records[position] for position in self.positions(country, mode))
+
+    def lookup_ip(self, ip):
+        key = ip_to_int(ip)
+        return [self.records[position] for position in self.ips.find(key)] if key is not None else []
+
+    def within(self, start, end):
+        """
+        Records whose IP lies in [start, end], in feed order.
+        """
+        return [self.records[position] for position in sorted(p for _, p in self.ips.find_range(start, end))]
+
+    def covering(self, key):
+        """
+        Records whose ip_whois.net_range contains `key`, in feed order.
+        """
+        return [self.records[position] for position in sorted(self.net_ranges.covering(key))]
+
+
+class FeedPipeline:
+    """
+    A feed source plus its loaded snapshot. With input_file the feed is read
+    from disk; otherwise it is downloaded with `config` (load_config() when
+    omitted) over one pooled session that every call reuses. The snapshot is
+    loaded on first use and replaced only by load().
+    """
+
+    def __init__(self, input_file=None, config=None, no_cache=False,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES, retry=None):
+        self.input_file = input_file
+        self.config = None
+        self.retry = None
+        self.snapshot = None
+        self._version = None  # (size, mtime) of the local file last read
+        if input_file:
+            self.source = f"Local file: {input_file}"
+            self._fetch = None
+        else:
+            self.config = config if config is not None else load_config()
+            validate_token_present(self.config["token"])
+            self.retry = retry or RetryScheduler()
+            self._fetch, self.source = build_feed_fetcher(
+                self.config, no_cache, prefetch_pages, self.retry
+            )
+
+    def stream(self, metrics=None):
+        """
+        One pass over the records of the feed, without keeping them: the way
+        to filter a feed too large for a snapshot.
+        """
+        if self.input_file:
+            return load_input_file(self.input_file)
+        return self._fetch(metrics)
+
+    def read(self):
+        """
+        Records for a new snapshot, or None when the local file has not
+        changed since the last read. The API feed goes through the download
+        cache, so an unchanged feed costs a 304 instead of a download.
+        """
+        if not self.input_file:
+            return self._fetch()
+        if not os.path.exists(self.input_file):
+            raise FileNotFoundError(f"Input file not found: {self.input_file}")
+        stat = os.stat(self.input_file)
+        version = (stat.st_size, stat.st_mtime_ns)
+        if version == self._version:
+            return None
+        records = list(load_input_file(self.input_file))
+        self._version = version
+        return records
+
+    def load(self):
+        """
+        Load the feed into a new snapshot (kept as is when unchanged) and
+        return the current snapshot.
+        """
+        records = self.read()
+        if records is not None:
+            self.snapshot = FeedSnapshot(records, self.source)
+        return self.snapshot
+
+    def current(self):
+        return self.snapshot or self.load()
+
+    def filter(self, country, mode="combined", where=None, since=None, until=None):
+        """
+        Iterate the records of `country` under `mode`, in feed order, narrowed
+        by a filter expression (see feed_filter.py) and a last_seen window.
+        since/until take epoch seconds or the CLI's formats ("30d",
+        "2024-12-31"). Arguments are checked before the iterator is returned.
+        """
+        validate_country_code(country)
+        if mode not in FILTER_MODES:
+            raise ValueError(f"Unknown filter mode: '{mode}'. Use {', '.join(FILTER_MODES)}.")
+        since, until = (
+            parse_time_bound(bound) if isinstance(bound, str) else bound for bound in (since, until)
+        )
+        record_filter = compile_filter(where, since=since, until=until)
+        return record_filter.filter(self.current().select(country, mode))
+
+    def lookup(self, ip):
+        """
+        Records listing `ip`; raises ValueError for an invalid address.
+        """
+        if ip_to_int(ip) is None:
+            raise ValueError(f"Invalid IP address: '{ip}'.")
+        return self.current().lookup_ip(ip)
+
+    def covering(self, ip):
+        """
+        Records whose ip_whois.net_range contains `ip`.
+        """
+        key = ip_to_int(ip)
+        if key is None:
+            raise ValueError(f"Invalid IP address: '{ip}'.")
+        return self.current().covering(key)
+
+    def within(self, prefix):
+        """
+        Records whose IP lies inside a prefix or range ("203.0.113.0/24").
+        """
+        interval = parse_ip_range(prefix)
+        if interval is None:
+            raise ValueError(f"Invalid prefix or range: '{prefix}'.")
+        return self.current().within(*interval)
@@ -0,0 +1,185 @@
+# Kaspersky TDF ByCountry — IP range index
+# Parses ip_whois.net_range ("1.2.3.4 - 1.2.3.7"), CIDR prefixes and single
+# addresses into integer intervals and indexes them in nesting levels of sorted
+# start/end arrays, so "which ranges cover this IP" and "which ranges overlap
+# this prefix" take two binary searches per level plus the matches.
+# Also collapses address sets into the minimal list of CIDRs, and matches
+# record streams against lists of addresses, prefixes and ranges.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import ipaddress
+from bisect import bisect_left, bisect_right
+
+from feed_io import open_feed_file
+from feed_lookup import IPV4_MAPPED, IpIndex, ip_to_int
+
+
+def parse_ip_range(value):
+    """
+    Parse "first - last", a CIDR prefix ("10.0.0.0/8") or a single address
+    into an inclusive (start, end) pair of ip_to_int keys. Returns None for
+    missing or malformed values (or a range mixing IPv4 and IPv6).
+    """
+    if not isinstance(value, str):
+        return None
+    if "-" in value:
+        first, _, last = value.partition("-")
+        start, end = ip_to_int(first.strip()), ip_to_int(last.strip())
+        if start is None or end is None or start > end:
+            return None
+        if (start >> 32 == 0xFFFF) != (end >> 32 == 0xFFFF):
+            return None
+        return start, end
+    if "/" in value:
+        try:
+            network = ipaddress.ip_network(value.strip(), strict=False)
+        except ValueError:
+            return None
+        start, end = int(network.network_address), int(network.broadcast_address)
+        if network.version == 4:
+            return IPV4_MAPPED | start, IPV4_MAPPED | end
+        return start, end
+    key = ip_to_int(value.strip())
+    return (key, key) if key is not None else None
+
+
+class RangeIndex:
+    """
+    Static interval index. Intervals are split into levels in which no
+    interval contains another, so starts and ends are both sorted within a
+    level and the intervals overlapping a query form one contiguous run,
+    found with two binary searches. A query costs O(L log n + k) for L
+    levels (the deepest nesting of ranges: a handful for whois allocations
+    and their sub-assignments) and k matches.
+    """
+
+    def __init__(self, intervals):
+        # intervals: iterable of (start, end, value); invalid (None) ranges are skipped
+        entries = sorted(
+            (interval for interval in intervals if interval[0] is not None),
+            key=lambda interval: (interval[0], interval[1]),
+        )
+        self._values = [value for _, _, value in entries]
+        # Levels ordered by the end of their last interval (`tops`). Outer
+        # ranges come first (by start, then longest first) and each interval
+        # joins the level whose last end is the largest one not above its
+        # own end, which keeps every level's ends sorted with the fewest levels.
+        tops = []
+        self._levels = []
+        order = sorted(range(len(entries)), key=lambda i: (entries[i][0], -entries[i][1]))
+        for position in order:
+            start, end, _ = entries[position]
+            i = bisect_right(tops, end) - 1
+            if i < 0:
+                i = 0
+                tops.insert(0, end)
+                self._levels.insert(0, ([], [], []))
+            tops[i] = end
+            starts, ends, positions = self._levels[i]
+            starts.append(start)
+            ends.append(end)
+            positions.append(position)
+        self.count = len(entries)
+
+    def _runs(self, start, end):
+        # Per level, the slice of intervals overlapping [start, end]:
+        # ends >= start form a suffix and starts <= end a prefix
+        for starts, ends, positions in self._levels:
+            first = bisect_left(ends, start)
+            last = bisect_right(starts, end)
+            if first < last:
+                yield positions[first:last]
+
+    def overlapping(self, start, end):
+        """
+        Values of the intervals that overlap [start, end], in start order.
+        """
+        positions = sorted(position for run in self._runs(start, end) for position in run)
+        return [self._values[position] for position in positions]
+
+    def covering(self, key):
+        """
+        Values of the intervals that contain the address `key`.
+        """
+        return self.overlapping(key, key)
+
+    def overlaps(self, start, end):
+        return next(self._runs(start, end), None) is not None
+
+    def __contains__(self, key):
+        return self.overlaps(key, key)
+
+
+def collapse_cidrs(keys):
+    """
+    Collapse ip_to_int keys into the minimal list of CIDR prefixes
+    (IPv4 prefixes first), e.g. for firewall upload.
+    """
+    v4, v6 = [], []
+    for key in keys:
+        if key >> 32 == 0xFFFF:
+            v4.append(ipaddress.IPv4Network(key & 0xFFFFFFFF))
+        else:
+            v6.append(ipaddress.IPv6Network(key))
+    return [str(network) for group in (v4, v6) for network in ipaddress.collapse_addresses(group)]
+
+
+def parse_query_lines(lines):
+    """
+    Parse one query per line: an IP address, a CIDR prefix or a "first - last"
+    range; blank lines and # comments are skipped. Returns (sorted distinct
+    address keys, sorted (start, end) ranges, number of invalid lines).
+    """
+    keys = set()
+    ranges = set()
+    invalid = 0
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        interval = parse_ip_range(line if "-" in line else line.split()[0])
+        if interval is None:
+            invalid += 1
+        elif interval[0] == interval[1]:
+            keys.add(interval[0])
+        else:
+            ranges.add(interval)
+    return sorted(keys), sorted(ranges), invalid
+
+
+def read_query_list(path):
+    """
+    Read a query list file (plain, .gz or .zst); see parse_query_lines.
+    """
+    with open_feed_file(path, "rb") as f:
+        return parse_query_lines(raw.decode("utf-8-sig", errors="replace") for raw in f)
+
+
+def iter_listed_records(records, keys, ranges=(), field="ip"):
+    """
+    Single pass over a record stream, yielding in feed order the records that
+    match the queries. field="ip": the record's IP is one of `keys` or inside
+    one of `ranges`. field="net_range": the record's ip_whois.net_range
+    overlaps (covers) any queried address or range.
+    """
+    if field == "ip":
+        exact = IpIndex((key, 0) for key in keys)
+        prefixes = RangeIndex((start, end, None) for start, end in ranges)
+        for entry in records:
+            key = ip_to_int(entry.get("ip", ""))
+            if key is not None and (key in exact or key in prefixes):
+                yield entry
+    elif field == "net_range":
+        queries = RangeIndex(
+            [(key, key, None) for key in keys] + [(start, end, None) for start, end in ranges]
+        )
+        for entry in records:
+            interval = parse_ip_range((entry.get("ip_whois") or {}).get("net_range"))
+            if interval is not None and queries.overlaps(*interval):
+                yield entry
+    else:
+        raise ValueError(f"Unknown lookup field: '{field}'. Use ip or net_range.")
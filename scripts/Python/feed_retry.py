@@ -0,0 +1,176 @@
+# Kaspersky TDF ByCountry — Retry scheduling
+# Retries transient API failures (429, 5xx, timeouts, dropped connections)
+# with jittered exponential backoff, honouring the server's Retry-After. A
+# retry budget caps the retries of a whole run, and a circuit breaker stops
+# calling an API that keeps failing instead of hammering it.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 5  # per request
+DEFAULT_RETRY_BUDGET = 20  # per run, shared by every request of the run
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+MAX_RETRY_AFTER = 900.0  # give up rather than wait longer than this
+BREAKER_THRESHOLD = 8  # consecutive failures that open the circuit
+BREAKER_COOLDOWN = 300.0  # seconds before an open circuit lets a trial request through
+
+log = logging.getLogger(__name__)  # printed by the CLIs, see feed_core.show_progress
+
+
+class TransientError(Exception):
+    """
+    A failure worth retrying. retry_after is the delay requested by the
+    server in seconds, if any.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RetryExhausted(Exception):
+    """
+    A transient failure that could not be retried any further.
+    """
+
+
+class CircuitOpenError(RetryExhausted):
+    pass
+
+
+def parse_retry_after(value, now=None):
+    """
+    Seconds to wait from a Retry-After header (delay-seconds or HTTP-date),
+    or None when absent or unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime  # slow to import, rarely needed
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class RetryScheduler:
+    """
+    Retry policy shared by every request of a run (and by the threads of a
+    concurrent download). Use call() for a single request, or before_attempt(),
+    succeeded() and failed() around a hand-written retry loop.
+    """
+
+    def __init__(
+        self,
+        max_retries=DEFAULT_MAX_RETRIES,
+        budget=DEFAULT_RETRY_BUDGET,
+        base_delay=BASE_DELAY,
+        max_delay=MAX_DELAY,
+        breaker_threshold=BREAKER_THRESHOLD,
+        breaker_cooldown=BREAKER_COOLDOWN,
+        sleep=time.sleep,
+    ):
+        if max_retries < 0 or budget < 0:
+            raise ValueError("--max-retries and --retry-budget must be 0 or more.")
+        self.max_retries = max_retries
+        self.budget = budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.sleep = sleep
+        self.retries = 0  # retries spent in the current run
+        self._failures = 0  # consecutive failures
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def start_run(self):
+        """
+        Refill the retry budget (serve mode starts a run on every refresh).
+        """
+        with self._lock:
+            self.retries = 0
+
+    def backoff(self, retry, retry_after=None):
+        """
+        Delay before the given retry (1-based): "full jitter" exponential
+        backoff, or the server's Retry-After plus up to one base delay.
+        """
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def before_attempt(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.breaker_cooldown - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Kaspersky TIP API failed {self._failures} times in a row; not calling "
+                    f"it again for {remaining:.0f}s."
+                )
+            self._opened_at = None  # half-open: let this attempt through
+
+    def succeeded(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def failed(self, error, retry, label="request"):
+        """
+        Record a TransientError on the given retry of a request (1 = first
+        retry), then sleep before it or raise RetryExhausted.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.breaker_threshold:
+                self._opened_at = time.monotonic()
+                reason = f"{self._failures} consecutive failures, stopping"
+            elif retry > self.max_retries:
+                reason = f"gave up after {self.max_retries} retries"
+            elif self.retries >= self.budget:
+                reason = f"retry budget of {self.budget} exhausted"
+            elif error.retry_after is not None and error.retry_after > MAX_RETRY_AFTER:
+                reason = f"server asked to wait {error.retry_after:.0f}s"
+            else:
+                reason = None
+                self.retries += 1
+        if reason:
+            raise RetryExhausted(f"{error} ({label}: {reason}.)") from error
+        delay = self.backoff(retry, error.retry_after)
+        log.info("%s Retrying %s in %.1fs (retry %d/%d)...", str(error), label, delay, retry, self.max_retries)
+        self.sleep(delay)
+
+    def call(self, request, label="request"):
+        """
+        Return request(), retrying it while it raises TransientError.
+        """
+        retry = 0
+        while True:
+            self.before_attempt()
+            try:
+                result = request()
+            except TransientError as e:
+                retry += 1
+                self.failed(e, retry, label)
+                continue
+            self.succeeded()
+            return result
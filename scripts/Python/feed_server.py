@@ -0,0 +1,338 @@
+# Kaspersky TDF ByCountry — Feed query service
+# Keeps the feed loaded in memory with per-country and per-IP indexes, refreshes
+# it in the background and answers queries over local HTTP (TCP or a Unix socket):
+#
+#   GET  /records?country=ES&mode=combined|victims|...[&format=json|ndjson|csv|iplist]
+#                [&where=EXPR][&since=30d][&until=2024-12-31]
+#   GET  /ip?ip=203.0.113.42          -> {"ip": ..., "listed": true, "records": [...]}
+#   GET  /covering?ip=203.0.113.42    -> records whose ip_whois.net_range contains the IP
+#   GET  /within?prefix=203.0.113.0/24 -> records whose IP is inside a prefix or range
+#   POST /lookup[?records=0]          -> batch check of the IPs/prefixes in the body (one per line)
+#   GET  /status                      -> snapshot size, age and refresh state
+#   POST /refresh                     -> reload the feed now
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from feed_countries import is_country_code
+from feed_filter import FILTER_MODES, compile_filter
+from feed_io import DEFAULT_LISTEN, DEFAULT_REFRESH_INTERVAL, RECORD_WRITERS
+from feed_lookup import int_to_ip, ip_to_int
+from feed_pipeline import FeedSnapshot
+from feed_ranges import parse_ip_range, parse_query_lines
+from feed_time import parse_time_bound
+
+log = logging.getLogger(__name__)  # printed by the CLIs, see feed_core.show_progress
+MAX_LOOKUP_BODY = 16 * 1024 * 1024  # bytes; POST /lookup bodies above this get a 413
+CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "iplist": "text/plain; charset=utf-8",
+    "cidr": "text/plain; charset=utf-8",
+}
+
+
+class FeedService:
+    """
+    Owns the current snapshot and refreshes it. `loader()` returns an iterable
+    of records, or None when the feed has not changed since the last load.
+    """
+
+    def __init__(self, loader, source, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.loader = loader
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.snapshot = None
+        self.last_refresh = None
+        self.last_error = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Load the feed and swap in a new snapshot. On failure the previous
+        snapshot keeps serving and the error is reported by /status.
+        """
+        with self._lock:  # one refresh at a time; queries are never blocked
+            try:
+                records = self.loader()
+                if records is not None:
+                    self.snapshot = FeedSnapshot(records, self.source)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                if self.snapshot is None:
+                    raise
+            finally:
+                self.last_refresh = time.time()
+                self.refreshes += 1
+        return self.snapshot
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+            if self.last_error:
+                log.info("Refresh failed, still serving the previous snapshot: %s", self.last_error)
+            else:
+                log.info("Feed refreshed: %d records.", self.snapshot.count)
+
+    def start(self):
+        if self.refresh_interval and self.refresh_interval > 0:
+            self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        snapshot = self.snapshot
+        return {
+            "source": self.source,
+            "records": snapshot.count if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "age_s": round(time.time() - snapshot.loaded_at, 1) if snapshot else None,
+            "countries_geo": len(snapshot.geo) if snapshot else 0,
+            "countries_admin": len(snapshot.admin) if snapshot else 0,
+            "countries_victims": len(snapshot.victims) if snapshot else 0,
+            "refresh_interval_s": self.refresh_interval,
+            "last_refresh": self.last_refresh,
+            "refreshes": self.refreshes,
+            "last_error": self.last_error,
+        }
+
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    server_version = "KasperskyTDF/1.0"
+
+    @property
+    def service(self):
+        return self.server.feed_service
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        routes = {
+            "/records": self.handle_records,
+            "/ip": self.handle_ip,
+            "/covering": self.handle_covering,
+            "/within": self.handle_within,
+            "/status": self.handle_status,
+        }
+        handler = routes.get(url.path.rstrip("/") or "/")
+        if handler is None:
+            self.send_json(404, {"error": f"Unknown path: {url.path}"})
+            return
+        handler(params)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        if path == "/refresh":
+            self.service.refresh()
+            self.send_json(200, self.service.status())
+        elif path == "/lookup":
+            self.handle_lookup(params)
+        else:
+            self.send_json(404, {"error": f"Unknown path: {url.path}"})
+
+    def handle_status(self, params):
+        self.send_json(200, self.service.status())
+
+    def handle_records(self, params):
+        country = params.get("country", "").upper()
+        mode = params.get("mode", "combined").lower()
+        output_format = params.get("format", "json").lower()
+        if len(country) != 2 or not country.isalpha():
+            self.send_json(400, {"error": "country must be a two-letter ISO 3166-1 alpha-2 code."})
+            return
+        if not is_country_code(country):
+            self.send_json(400, {"error": f"Country code '{country}' is not a valid ISO 3166-1 alpha-2 code."})
+            return
+        if mode not in FILTER_MODES:
+            self.send_json(400, {"error": f"mode must be one of: {', '.join(FILTER_MODES)}."})
+            return
+        if output_format not in RECORD_WRITERS:
+            self.send_json(400, {"error": f"format must be one of: {', '.join(RECORD_WRITERS)}."})
+            return
+        try:
+            since, until = (
+                parse_time_bound(params[key]) if params.get(key) else None for key in ("since", "until")
+            )
+            record_filter = compile_filter(params.get("where"), since=since, until=until)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        snapshot = self.service.snapshot  # a refresh may swap it; keep this one
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[output_format])
+        self.send_header("X-Feed-Loaded-At", str(int(snapshot.loaded_at)))
+        self.end_headers()
+        newline = "" if output_format == "csv" else None
+        handle = io.TextIOWrapper(self.wfile, encoding="utf-8", newline=newline)
+        writer = RECORD_WRITERS[output_format](handle)
+        for record in record_filter.filter(snapshot.select(country, mode)):
+            writer.write(record)
+        writer.finish()
+        handle.flush()
+        handle.detach()  # the server still owns (and closes) the socket stream
+
+    def handle_ip(self, params):
+        ip = params.get("ip", "").strip()
+        key = ip_to_int(ip)
+        if key is None:
+            self.send_json(400, {"error": f"Invalid IP address: '{ip}'."})
+            return
+        records = self.service.snapshot.lookup_ip(ip)
+        self.send_json(200, {"ip": int_to_ip(key), "listed": bool(records), "records": records})
+
+    def handle_covering(self, params):
+        ip = params.get("ip", "").strip()
+        key = ip_to_int(ip)
+        if key is None:
+            self.send_json(400, {"error": f"Invalid IP address: '{ip}'."})
+            return
+        records = self.service.snapshot.covering(key)
+        self.send_json(200, {"ip": int_to_ip(key), "covered": bool(records), "records": records})
+
+    def handle_within(self, params):
+        prefix = params.get("prefix", "").strip()
+        interval = parse_ip_range(prefix)
+        if interval is None:
+            self.send_json(400, {"error": f"Invalid prefix or range: '{prefix}'."})
+            return
+        records = self.service.snapshot.within(*interval)
+        self.send_json(200, {"prefix": prefix, "count": len(records), "records": records})
+
+    def handle_lookup(self, params):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # the body cannot be skipped
+            self.send_json(400, {"error": "Content-Length must be a non-negative integer."})
+            return
+        if length > MAX_LOOKUP_BODY:
+            self.close_connection = True
+            self.send_json(413, {"error": f"The lookup body must not exceed {MAX_LOOKUP_BODY} bytes."})
+            return
+        body = self.rfile.read(length).decode("utf-8-sig", errors="replace")
+        keys, ranges, invalid = parse_query_lines(body.splitlines())
+        snapshot = self.service.snapshot
+        found = dict(snapshot.ips.find_many(keys))  # key -> record positions
+        in_ranges = {}
+        for start, end in ranges:
+            for key, position in snapshot.ips.find_range(start, end):
+                in_ranges.setdefault(position, key)
+        result = {
+            "queried": len(keys),
+            "ranges": len(ranges),
+            "invalid": invalid,
+            "listed": [int_to_ip(key) for key in found],
+        }
+        if ranges:
+            result["listed_in_ranges"] = sorted({int_to_ip(key) for key in in_ranges.values()})
+        if params.get("records", "1") != "0":
+            positions = {position for positions in found.values() for position in positions}
+            positions.update(in_ranges)
+            result["records"] = [snapshot.records[position] for position in sorted(positions)]
+        self.send_json(200, result)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body, indent=4, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPES["json"])
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def server_bind(self):
+            if os.path.exists(self.server_address):
+                os.remove(self.server_address)  # stale socket from a previous run
+            super().server_bind()
+
+else:  # Windows
+    UnixHTTPServer = None
+
+
+class IPv6HTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+
+
+def parse_listen_address(value):
+    """
+    Split HOST:PORT into (host, port); IPv6 hosts go in brackets ([::1]:8750).
+    """
+    host, _, port = value.rpartition(":")
+    bracketed = host.startswith("[") and host.endswith("]")
+    if bracketed:
+        host = host[1:-1]
+    if not host or not port.isdigit() or (":" in host) != bracketed:
+        raise ValueError(
+            f"Invalid --listen address: '{value}'. Use HOST:PORT or [IPv6]:PORT (e.g., {DEFAULT_LISTEN})."
+        )
+    return host, int(port)
+
+
+def create_server(service, listen=DEFAULT_LISTEN, socket_path=None):
+    """
+    Bind the query server on a Unix socket (socket_path) or on HOST:PORT.
+    """
+    if socket_path:
+        if UnixHTTPServer is None:
+            raise ValueError("Unix sockets are not supported on this platform; use --listen.")
+        server = UnixHTTPServer(socket_path, FeedRequestHandler)
+    else:
+        host, port = parse_listen_address(listen)
+        server_class = IPv6HTTPServer if ":" in host else ThreadingHTTPServer
+        server = server_class((host, port), FeedRequestHandler)
+    server.feed_service = service
+    return server
+
+
+def serve_forever(service, listen=DEFAULT_LISTEN, socket_path=None):
+    """
+    Load the feed, start the background refresh and serve until interrupted.
+    """
+    service.refresh()
+    service.start()
+    server = create_server(service, listen, socket_path)
+    where = f"unix:{socket_path}" if socket_path else f"http://{listen}"
+    print(f"Serving {service.snapshot.count} records on {where} (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        service.stop()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,123 @@
+# Kaspersky TDF ByCountry — Feed timestamps
+# Fast parser for the feed's fixed "DD.MM.YYYY HH:MM" (UTC) first_seen /
+# last_seen format: fields are sliced at fixed offsets and converted with
+# integer calendar arithmetic instead of datetime.strptime, and both whole
+# timestamps and dates are cached because many records share them. Also
+# parses the user-facing bounds of --since / --until and --where.
+#
+# DISCLAIMER: This script is provided as a Proof of Concept (PoC) for educational
+# and demonstration purposes only. It is not an official tool from Kaspersky, nor
+# does it come with any guarantees or warranties of functionality or support.
+# Use at your own risk, and always validate the results in your environment.
+
+import re
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+FEED_TIME_FORMAT = "%d.%m.%Y %H:%M"
+MISSING_TIME = -1
+TIME_CACHE_SIZE = 1 << 17
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+TIME_VALUE_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%d.%m.%Y", "%d.%m.%Y %H:%M")
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_DURATION = re.compile(r"(\d+)([smhdw])")
+_dates = {}  # "DD.MM.YYYY" -> days since 1970-01-01, or None if invalid
+
+
+def days_from_civil(year, month, day):
+    """
+    Days since 1970-01-01 for a proleptic Gregorian date (H. Hinnant's algorithm).
+    """
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _parse_date(text):
+    if text in _dates:
+        return _dates[text]
+    days = None
+    if text.isascii() and text[:2].isdigit() and text[3:5].isdigit() and text[6:].isdigit():
+        day, month, year = int(text[:2]), int(text[3:5]), int(text[6:])
+        leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        if year and 1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month - 1] + leap:
+            days = days_from_civil(year, month, day)
+    _dates[text] = days
+    return days
+
+
+def _strptime_epoch(value, time_format=FEED_TIME_FORMAT):
+    return int(datetime.strptime(value, time_format).replace(tzinfo=timezone.utc).timestamp())
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def _parse_feed_time(value):
+    if len(value) != 16 or value[2] != "." or value[5] != "." or value[10] != " " or value[13] != ":":
+        try:  # not zero-padded (or not a timestamp at all): the slow path decides
+            return _strptime_epoch(value)
+        except ValueError:
+            return MISSING_TIME
+    days = _parse_date(value[:10])
+    clock = value[11:13] + value[14:16]
+    if days is None or not (clock.isascii() and clock.isdigit()):
+        return MISSING_TIME
+    hour, minute = int(clock[:2]), int(clock[2:])
+    if hour > 23 or minute > 59:
+        return MISSING_TIME
+    return days * 86400 + hour * 3600 + minute * 60
+
+
+def parse_feed_time(value):
+    """
+    "DD.MM.YYYY HH:MM" (UTC) -> epoch seconds; MISSING_TIME when the value is
+    missing or malformed. Equivalent to strptime with FEED_TIME_FORMAT.
+    """
+    if not isinstance(value, str):
+        return MISSING_TIME
+    return _parse_feed_time(value)
+
+
+def parse_time_value(value):
+    """
+    Parse a user-supplied timestamp (2024-01-31, 2024-01-31T12:00, 31.01.2024
+    or 31.01.2024 12:00, all UTC) into epoch seconds.
+    """
+    for time_format in TIME_VALUE_FORMATS:
+        try:
+            return _strptime_epoch(value, time_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: '{value}'. Use YYYY-MM-DD[THH:MM] or DD.MM.YYYY[ HH:MM].")
+
+
+def parse_duration(value):
+    match = _DURATION.fullmatch(value.strip().lower())
+    if match is None:
+        raise ValueError(f"Invalid duration: '{value}'. Use a number followed by s, m, h, d or w (e.g., 30d).")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_time_bound(value, now=None):
+    """
+    Parse a --since / --until bound: an absolute timestamp (see
+    parse_time_value) or a duration before now ("30d", "12h").
+    """
+    if _DURATION.fullmatch(value.strip().lower()):
+        now = time.time() if now is None else now
+        return int(now) - parse_duration(value)
+    try:
+        return parse_time_value(value.strip())
+    except ValueError:
+        raise ValueError(
+            f"Invalid time: '{value}'. Use YYYY-MM-DD[THH:MM], DD.MM.YYYY[ HH:MM] "
+            "or a duration such as 30d or 12h."
+        )
+
+
+def format_epoch(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
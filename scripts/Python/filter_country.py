@@ -4,63 +4,45 @@
 # It is not an official tool from Kaspersky, nor does it come with any guarantees or warranties of functionality or support.
 # Use at your own risk, and always validate the results in your environment.
 
-import json
 import datetime
 import os
 import sys
-import pycountry
+
+from feed_core import filter_file
+from feed_countries import country_name
 
 timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 country = 'ES'  # Country code in ISO 3166-2 format (ES, PT, BR, etc...)
 
 def get_country_name(iso_code):
     """
-    Returns the name of the country given its ISO alpha-2 code using pycountry.
+    Returns the name of the country given its ISO alpha-2 code.
     """
-    try:
-        country = pycountry.countries.get(alpha_2=iso_code.upper())
-        return country.name if country else "Unknown"
-    except Exception:
-        return "Unknown"
+    return country_name(iso_code) or "Unknown"
 
 def filter_by_country(input_file, output_file):
     """
     Filters records in a JSON file where the 'ip_whois' field has 'country' equal to the specified country code.
+    The file is streamed through the shared core (feed_core.py), so it is never loaded whole.
     """
     try:
-        # Create the feeds folder if it doesn't exist
-        os.makedirs(os.path.dirname(input_file), exist_ok=True)
-
-        # Open and load the JSON file
-        with open(input_file, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            if not isinstance(data, list):
-                raise ValueError("The JSON file must contain a list of records.")
-
-        # Filter the data
-        filtered_records = [
-            record for record in data
-            if record.get("ip_whois", {}).get("country", "").upper() == country.upper()
-        ]
+        # Filter the data and save the matching records (an empty feed gives "[]")
+        total, matched = filter_file(input_file, output_file, country, "admin", allow_empty=True)
 
         # Report the results
-        print(f"Total records processed: {len(data)}")
-        print(f"Ignored records: {len(data) - len(filtered_records)}")
-        if filtered_records:
-            print(f"{len(filtered_records)} records found with country = '{country}' ({get_country_name(country)}).")
+        print(f"Total records processed: {total}")
+        print(f"Ignored records: {total - matched}")
+        if matched:
+            print(f"{matched} records found with country = '{country}' ({get_country_name(country)}).")
         else:
             print(f"No records found with country = '{country}' ({get_country_name(country)}).")
-
-        # Save the filtered records
-        with open(output_file, 'w', encoding='utf-8') as output:
-            json.dump(filtered_records, output, indent=4, ensure_ascii=False)
         print(f"Filtered records saved to: {output_file}")
 
     except FileNotFoundError as e:
         print(f"Error: The file '{input_file}' was not found.")
         sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Error: The file is not a valid JSON. Details: {e}")
+    except (PermissionError, ValueError) as e:
+        print(f"Error: {e}")
         sys.exit(1)
     except Exception as e:
         print(f"Unexpected error: {e}")
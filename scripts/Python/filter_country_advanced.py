@@ -5,10 +5,13 @@
 # Use at your own risk, and always validate the results in your environment.
 
 import argparse
-import json
 import os
+import sys
 from datetime import datetime
-import pycountry
+
+from feed_core import filter_file, validate_country_code
+from feed_filter import FILTER_MODES
+from feed_io import OUTPUT_EXTENSIONS
 
 def display_disclaimer():
     """
@@ -36,115 +39,44 @@ def parse_arguments():
     parser.add_argument(
         "--filter-mode",
         type=str,
-        choices=["geo", "admin", "combined"],
+        choices=list(FILTER_MODES),
         default="combined",
-        help="Filtering mode: 'geo', 'admin', or 'combined' (default: combined).",
+        help="Filtering mode: 'geo', 'admin', 'combined', 'victims' or a '+victims' combination (default: combined).",
     )
     parser.add_argument(
         "--input-file",
         type=str,
         default="./feeds/IP_Reputation_Data_Feed.json",
-        help="Path to the input JSON file (default: ./feeds/IP_Reputation_Data_Feed.json).",
+        help="Path to the input JSON file, optionally .json.gz or .json.zst (default: ./feeds/IP_Reputation_Data_Feed.json).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for large uncompressed JSON/NDJSON inputs (default: 1).",
+    )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        choices=sorted(OUTPUT_EXTENSIONS),
+        default="json",
+        help="Output format: 'json', 'ndjson', 'csv', 'iplist' or 'cidr' (default: json).",
     )
     parser.add_argument(
         "--output-file",
         type=str,
         default=None,
-        help="Path to the output JSON file. If not specified, a file name will be generated automatically.",
+        help="Path to the output JSON file (.json.gz / .json.zst are compressed). If not specified, a file name will be generated automatically.",
     )
     return parser.parse_args()
 
-def validate_country_code(country_code):
-    """
-    Validate the country code.
-    """
-    if len(country_code) != 2 or not country_code.isalpha():
-        raise ValueError(f"Invalid country code: {country_code}. It must be a two-letter ISO 3166-1 alpha-2 code.")
-
-    # Check if the country code exists in pycountry
-    if not pycountry.countries.get(alpha_2=country_code.upper()):
-        raise ValueError(f"Country code '{country_code}' is not a valid ISO 3166-1 alpha-2 code.")
-
-def normalize_country_code(country_code):
-    """
-    Normalize the country code to uppercase.
-    """
-    return country_code.upper()
-
-def load_input_file(input_file):
-    """
-    Load the JSON data from the input file.
-    """
-    if not os.path.exists(input_file):
-        raise FileNotFoundError(f"Input file not found: {input_file}")
-
-    try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON format in the input file: {e}")
-    except PermissionError as e:
-        raise PermissionError(f"Permission denied when accessing the file: {input_file}. Details: {e}")
-
-    if not data:
-        raise ValueError("The input file is empty or contains no records.")
-
-    return data
-
-def ensure_output_directory(output_file):
-    """
-    Ensure the output directory exists, create it if necessary.
-    """
-    output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
-        try:
-            os.makedirs(output_dir)
-        except PermissionError as e:
-            raise PermissionError(f"Permission denied when creating the output directory: {output_dir}. Details: {e}")
-
-def generate_output_filename(input_file, mode):
+def generate_output_filename(input_file, mode, output_format="json"):
     """
     Generate an output file name based on the input file name, filtering mode, and timestamp.
     """
     base_name = os.path.splitext(os.path.basename(input_file))[0]
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"feeds/{base_name}_{mode}_{timestamp}.json"
-
-def filter_geo(data, country):
-    """
-    Filter data by geographical location (ip_geo).
-    """
-    normalized_country = country.lower()
-    return [entry for entry in data if entry.get("ip_geo", "").lower() == normalized_country]
-
-def filter_admin(data, country):
-    """
-    Filter data by administrative location (ip_whois.country).
-    """
-    normalized_country = country.upper()
-    return [entry for entry in data if entry.get("ip_whois", {}).get("country", "").upper() == normalized_country]
-
-def filter_combined(data, country):
-    """
-    Filter data by either geographical or administrative location.
-    """
-    normalized_geo_country = country.lower()
-    normalized_admin_country = country.upper()
-    return [
-        entry
-        for entry in data
-        if entry.get("ip_geo", "").lower() == normalized_geo_country or entry.get("ip_whois", {}).get("country", "").upper() == normalized_admin_country
-    ]
-
-def save_output_file(output_file, filtered_data):
-    """
-    Save the filtered data to the output file.
-    """
-    try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(filtered_data, f, indent=4, ensure_ascii=False)
-    except PermissionError as e:
-        raise PermissionError(f"Permission denied when writing to the file: {output_file}. Details: {e}")
+    return f"feeds/{base_name}_{mode}_{timestamp}{OUTPUT_EXTENSIONS[output_format]}"
 
 def main():
     display_disclaimer()
@@ -154,31 +86,20 @@ def main():
     try:
         # Validate and normalize country code
         validate_country_code(args.country)
-        country = normalize_country_code(args.country)
-
-        # Load input data
-        data = load_input_file(args.input_file)
+        country = args.country.upper()
 
         # Determine output file name if not specified
-        output_file = args.output_file or generate_output_filename(args.input_file, args.filter_mode)
-
-        # Ensure output directory exists
-        ensure_output_directory(output_file)
-
-        # Apply filtering logic
-        if args.filter_mode == "geo":
-            filtered_data = filter_geo(data, country)
-        elif args.filter_mode == "admin":
-            filtered_data = filter_admin(data, country)
-        else:  # combined
-            filtered_data = filter_combined(data, country)
+        output_file = args.output_file or generate_output_filename(args.input_file, args.filter_mode, args.output_format)
 
-        # Save the filtered data
-        save_output_file(output_file, filtered_data)
+        # Stream, filter and save through the shared core (country index, worker
+        # processes or a single streamed pass, whichever applies)
+        total, matched = filter_file(
+            args.input_file, output_file, country, args.filter_mode, args.output_format, args.workers
+        )
 
         # Print summary
-        print(f"Total records processed: {len(data)}")
-        print(f"Records matching criteria: {len(filtered_data)}")
+        print(f"Total records processed: {total}")
+        print(f"Records matching criteria: {matched}")
         print(f"Filtered data saved to: {output_file}")
 
     except FileNotFoundError as e:
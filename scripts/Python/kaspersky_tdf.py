@@ -7,389 +7,703 @@
 # Use at your own risk, and always validate the results in your environment.
 
 import argparse
-import json
+import hashlib
 import os
 import sys
 from datetime import datetime
 
-import pycountry
-import requests
-from dotenv import load_dotenv
-
-FEED_NAME = "IP_Reputation"
-DEFAULT_BASE_URL = "https://tip.kaspersky.com/api/feeds/"
-DEFAULT_FEED_ENDPOINT = "ip_reputation"
-
-
-# ---------------------------------------------------------------------------
-# Disclaimer
-# ---------------------------------------------------------------------------
-
-def display_disclaimer():
-    print(
+# The feed source, the API client and the in-memory snapshot live in
+# feed_pipeline.py and feed_api.py (importable without this CLI), and the
+# load/select/write helpers in feed_core.py, shared with the other five scripts.
+# kaspersky_tdf_es.py runs this same CLI with its Spanish TEXT. The columnar,
+# parallel and serve engines are imported when selected, so that local runs
+# start without loading them.
+from feed_api import DEFAULT_PREFETCH_PAGES, ApiError, load_config, parse_feed_endpoints
+from feed_core import (
+    ENGLISH,
+    ensure_output_directory,
+    open_output_writer,
+    save_output_file,
+    select_engine,
+    show_progress,
+    validate_country_code,
+)
+from feed_countries import country_name, victim_countries
+from feed_diff import DIFF_SETS, default_state_path, write_diff
+from feed_filter import FILTER_FIELDS, FILTER_MODES, compile_filter, mode_sections
+from feed_index import CountryIndex, build_country_index
+from feed_lookup import ip_to_int
+from feed_metrics import METRICS_FORMATS, PipelineMetrics, write_metrics_file
+from feed_pipeline import FeedPipeline
+from feed_ranges import iter_listed_records, read_query_list
+from feed_retry import DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BUDGET, RetryExhausted, RetryScheduler
+from feed_time import parse_time_bound
+from feed_io import (
+    COMPRESSION_EXTENSIONS,
+    DEFAULT_LISTEN,
+    DEFAULT_REFRESH_INTERVAL,
+    FEED_NAME,
+    OUTPUT_EXTENSIONS,
+    RecordCounter,
+    tee_records,
+)
+
+# Every message of the CLI. Help texts may use {fields}, {prefetch_pages},
+# {max_retries}, {retry_budget}, {listen} and {refresh_interval}.
+TEXT = {
+    "core": ENGLISH,  # feed_core's own messages (load/write errors, progress lines)
+    "disclaimer": (
         "\n*** DISCLAIMER ***\n"
         "This script is provided as a Proof of Concept (PoC) for educational and "
         "demonstration purposes only.\n"
         "It is not an official tool from Kaspersky, nor does it come with any "
         "guarantees or warranties of functionality or support.\n"
         "Use at your own risk, and always validate the results in your environment.\n"
-    )
-
-
-# ---------------------------------------------------------------------------
-# CLI arguments
-# ---------------------------------------------------------------------------
-
-def parse_arguments():
-    parser = argparse.ArgumentParser(
-        description=(
-            "Kaspersky TDF ByCountry — full pipeline: "
-            "download IP Reputation feed via API, filter by country, save output."
-        )
-    )
-    parser.add_argument(
-        "--country",
-        type=str,
-        default="",
-        help="ISO 3166-1 alpha-2 country code (e.g., ES). Prompted interactively if omitted.",
-    )
-    parser.add_argument(
-        "--filter-mode",
-        type=str,
-        choices=["geo", "admin", "combined"],
-        default="",
-        help="Filtering mode: geo, admin, or combined (default: combined).",
-    )
-    parser.add_argument(
-        "--output-file",
-        type=str,
-        default=None,
-        help="Output file path. Auto-generated with timestamp if omitted.",
-    )
-    parser.add_argument(
-        "--save-raw",
-        action="store_true",
-        help="Also save the unfiltered feed response to feeds/IP_Reputation_raw_TIMESTAMP.json.",
-    )
-    parser.add_argument(
-        "--input-file",
-        type=str,
-        default=None,
-        help=(
-            "LOCAL MODE: read from this local JSON file instead of calling the API. "
-            "When set, no API token is required."
+    ),
+    "description": (
+        "Kaspersky TDF ByCountry — full pipeline: "
+        "download IP Reputation feed via API, filter by country, save output."
+    ),
+    "help": {
+        "--country": "ISO 3166-1 alpha-2 country code (e.g., ES). Prompted interactively if omitted.",
+        "--countries": (
+            "Comma-separated list of country codes (e.g., ES,PT,FR). Parses the feed once "
+            "and writes one output file per country."
         ),
-    )
-    parser.add_argument(
-        "--limit",
-        type=int,
-        default=None,
-        help="Override KASPERSKY_TIP_LIMIT for this run (0 = no limit).",
-    )
-    parser.add_argument(
-        "--feed-endpoint",
-        type=str,
-        default=None,
-        help="Override KASPERSKY_TIP_FEED_ENDPOINT for this run.",
-    )
-    return parser.parse_args()
+        "--all-countries": "Like --countries, but writes one output file for every country found in the feed.",
+        "--filter-mode": (
+            "Filtering mode: geo (IP location), admin (whois country), combined (either), "
+            "victims (users_geo: threats seen against users in the country) or a "
+            "+victims combination (default: combined)."
+        ),
+        "--where": (
+            "Extra filter expression applied in the same pass, e.g. "
+            "\"threat_score >= 80 and category in (botnet_cnc, phishing) and last_seen within 30d\". "
+            "Fields: {fields}; operators: == != < <= > >= in, not in, "
+            "within (s/m/h/d/w); combine with and, or, not and parentheses."
+        ),
+        "--since": (
+            "Keep only records whose last_seen is at or after this UTC time "
+            "(YYYY-MM-DD[THH:MM] or DD.MM.YYYY[ HH:MM]) or within this duration (e.g., 30d, 12h)."
+        ),
+        "--until": "Keep only records whose last_seen is at or before this UTC time (same formats as --since).",
+        "--output-file": (
+            "Output file path. Auto-generated with timestamp if omitted. "
+            "A .json.gz or .json.zst extension writes compressed output."
+        ),
+        "--output-format": (
+            "Output format: json (indented array), ndjson (one record per line), csv, "
+            "iplist (bare IPs, one per line), or cidr (matching IPs collapsed into the "
+            "minimal list of CIDR prefixes). Default: json."
+        ),
+        "--diff": (
+            "Write only what changed since the previous --diff run with the same country, "
+            "mode and filters: <output>_added, <output>_modified and <output>_removed "
+            "(removed records carry only their ip). The first run reports everything as added."
+        ),
+        "--state-file": (
+            "DIFF MODE: snapshot of the previous output (IP -> record hash). Default: "
+            "feeds/.state/IP_Reputation_<country>_<mode>[_<filter hash>].state."
+        ),
+        "--compress": "Compress auto-generated output and raw files (.json.gz / .json.zst).",
+        "--save-raw": "Also save the unfiltered feed response to feeds/IP_Reputation_raw_TIMESTAMP.json.",
+        "--input-file": (
+            "LOCAL MODE: read from this local JSON file (.json, .json.gz or .json.zst) "
+            "instead of calling the API. When set, no API token is required."
+        ),
+        "--no-cache": (
+            "Always download the full feed. By default the last download is cached under "
+            "feeds/.cache/ and reused when the server reports it has not changed."
+        ),
+        "--build-index": (
+            "LOCAL MODE: (re)build the country index sidecar (<input-file>.idx) so later "
+            "queries on the same file read only the matching records."
+        ),
+        "--no-index": "LOCAL MODE: ignore the country index sidecar and scan the whole file.",
+        "--lookup-file": (
+            "Check the IPs, CIDR prefixes or 'first - last' ranges in this file (one per "
+            "line) against the feed and save the matching records instead of filtering "
+            "by country."
+        ),
+        "--lookup-field": (
+            "Match --lookup-file against each record's ip (default) or against its "
+            "ip_whois.net_range (records whose whois range covers a queried address)."
+        ),
+        "--workers": (
+            "LOCAL MODE: filter a large uncompressed JSON/NDJSON file with N worker "
+            "processes (default: 1)."
+        ),
+        "--columnar": (
+            "LOCAL MODE: load the uncompressed file into NumPy columns and filter with "
+            "vectorized masks (requires numpy)."
+        ),
+        "--limit": "Override KASPERSKY_TIP_LIMIT for this run (0 = no limit).",
+        "--page-size": (
+            "Override KASPERSKY_TIP_PAGE_SIZE for this run: download the feed in pages of "
+            "N records (offset or cursor paging) instead of one response; 0 = one request."
+        ),
+        "--prefetch-pages": "PAGING: pages downloaded ahead of the filter per endpoint (default: {prefetch_pages}).",
+        "--max-retries": (
+            "Retries of a request after a 429, 5xx, timeout or dropped connection, with "
+            "jittered exponential backoff or the server's Retry-After; interrupted "
+            "downloads resume where they stopped (default: {max_retries})."
+        ),
+        "--retry-budget": "Total retries allowed across all requests of a run (default: {retry_budget}).",
+        "--feed-endpoint": (
+            "Override KASPERSKY_TIP_FEED_ENDPOINT for this run. A comma-separated list "
+            "(e.g., ip_reputation,dangerous_ips) downloads the feeds concurrently and "
+            "filters their records as one stream."
+        ),
+        "--serve": (
+            "Keep the feed loaded and answer country / IP queries over local HTTP "
+            "(see --listen, --socket and --refresh-interval)."
+        ),
+        "--listen": "SERVE MODE: HOST:PORT or [IPv6]:PORT to listen on (default: {listen}).",
+        "--socket": "SERVE MODE: listen on this Unix socket path instead of TCP.",
+        "--refresh-interval": (
+            "SERVE MODE: seconds between background feed refreshes, 0 to disable "
+            "(default: {refresh_interval})."
+        ),
+        "--metrics-file": "Write per-stage timings, throughput and peak RSS to this file.",
+        "--metrics-format": "Format of --metrics-file: json or prometheus (textfile collector) (default: json).",
+    },
+    # Interactive prompts
+    "prompt_country": "Enter country code (ISO 3166-1 alpha-2, e.g., ES): ",
+    "prompt_mode": "Select filter mode [{modes}] (press Enter for combined): ",
+    "invalid_mode": "  Invalid mode. Choose from: {modes}.",
+    # Option errors
+    "https_required": "KASPERSKY_TIP_BASE_URL must use HTTPS. Check your .env file.",
+    "token_missing": (
+        "KASPERSKY_TIP_TOKEN is not set.\n"
+        "  1. Copy .env.example to .env\n"
+        "  2. Set KASPERSKY_TIP_TOKEN to your API token\n"
+        "  3. Obtain a token at: https://tip.kaspersky.com (Account Settings)"
+    ),
+    "countries_required": "--countries requires at least one country code (e.g., ES,PT).",
+    "since_after_until": "--since must be earlier than --until.",
+    "lookup_with_fan_out": "--lookup-file cannot be combined with --countries/--all-countries.",
+    "output_with_fan_out": (
+        "--output-file cannot be combined with --countries/--all-countries; "
+        "one file per country is generated instead."
+    ),
+    "workers_scope": "--workers applies to single-country filtering of an --input-file.",
+    "columnar_scope": "--columnar applies to single-country filtering of an --input-file.",
+    "diff_scope": "--diff applies to single-country filtering.",
+    "refresh_interval": "--refresh-interval must be 0 or more seconds.",
+    "lookup_not_found": "Lookup file not found: {}",
+    "lookup_empty": "No valid IP addresses or ranges found in: {}",
+    # Progress
+    "loading_local": "Loading local file: {}",
+    "downloading": "Downloading feed from Kaspersky TIP API...",
+    "building_index": "  Building country index...",
+    "index_saved": "  Index saved to: {}",
+    "loading_columnar": "  Loading columnar representation...",
+    "using_index": "  Using country index: {}.idx",
+    "using_workers": "  Filtering with {} worker processes...",
+    "looking_up": "Looking up {ips} IP addresses and {ranges} ranges from {path} (matching {field})...",
+    "all_countries": "all countries",
+    "routing": "Routing records by country ({countries}) using mode '{mode}'...",
+    "filtering": "Filtering by country '{country}' using mode '{mode}'{where}...",
+    "filtering_where": " where {}",
+    "downloaded": "  Downloaded {} records.",
+    "recovered": "  Recovered from {} failed requests by retrying.",
+    "raw_saved": "  Raw feed saved to: {}",
+    "loading_feed": "Loading feed ({})...",
+    "source_local": "Local file: {}",
+    "source_api": "API endpoint: {}",
+    "source_apis": "API endpoints: {}",
+    "metrics_saved": "Metrics saved to: {}",
+    # Summaries
+    "summary": "\n--- Summary ---",
+    "source": "  Source        : {}",
+    "country": "  Country       : {} ({})",
+    "mode": "  Filter mode   : {}",
+    "where": "  Where         : {}",
+    "total": "  Total records : {}",
+    "matched": "  Matched       : {}",
+    "filtered_out": "  Filtered out  : {}",
+    "unchanged": "  Unchanged     : {}",
+    "diff_sets": {"added": "Added", "modified": "Modified", "removed": "Removed"},
+    "untracked": "  Untracked     : {} (no valid or repeated ip)",
+    "diff_state": "  Diff state    : {}",
+    "output_saved": "  Output saved  : {}",
+    "raw_feed": "  Raw feed      : {}",
+    "countries": "  Countries     : {}",
+    "ips_queried": "  IPs queried   : {}",
+    "ranges_queried": "  Ranges queried: {}",
+    "invalid_lines": "  Invalid lines : {}",
+    "ips_listed": "  IPs listed    : {}",
+    "not_listed": "  Not listed    : {}",
+    "records_saved": "  Records saved : {}",
+    "no_match": "\n  [!] No records matched. Try a different country or filter mode.",
+    "no_match_fan_out": "\n  [!] No records matched. Try different countries or filter mode.",
+    "no_match_lookup": "\n  [!] No feed records matched the lookup file.",
+    "metrics_columns": ("Stage", "Wall s", "CPU s", "Records", "Rec/s", "MiB", "Peak RSS MiB"),
+    "metrics_total": "total",
+    # Errors
+    "api_errors": {},  # by HTTP status; empty: ApiError's own (English) message
+    "api_error_status": "Unexpected HTTP {} from Kaspersky TIP API.",
+    "error": "Error: {}",
+    "unexpected_error": "An unexpected error occurred: {}",
+}
 
 
 # ---------------------------------------------------------------------------
-# Configuration (secrets from .env only — never from CLI args)
+# Disclaimer
 # ---------------------------------------------------------------------------
 
-def load_config():
-    load_dotenv()
-    token = os.environ.get("KASPERSKY_TIP_TOKEN", "").strip()
-    base_url = os.environ.get("KASPERSKY_TIP_BASE_URL", DEFAULT_BASE_URL).strip()
-    feed_endpoint = os.environ.get("KASPERSKY_TIP_FEED_ENDPOINT", DEFAULT_FEED_ENDPOINT).strip()
-    limit_str = os.environ.get("KASPERSKY_TIP_LIMIT", "0").strip()
-    try:
-        limit = int(limit_str)
-    except ValueError:
-        limit = 0
-    return {
-        "token": token,
-        "base_url": base_url,
-        "feed_endpoint": feed_endpoint,
-        "limit": limit,
-    }
-
-
-def validate_token_present(token):
-    if not token:
-        print("Error: KASPERSKY_TIP_TOKEN is not set.")
-        print("  1. Copy .env.example to .env")
-        print("  2. Set KASPERSKY_TIP_TOKEN to your API token")
-        print("  3. Obtain a token at: https://tip.kaspersky.com (Account Settings)")
-        sys.exit(1)
+def display_disclaimer(text=TEXT):
+    print(text["disclaimer"])
 
 
 # ---------------------------------------------------------------------------
-# HTTP client (API mode)
+# CLI arguments
 # ---------------------------------------------------------------------------
 
-def build_api_session(token):
-    session = requests.Session()
-    session.headers.update({
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-    })
-    session.verify = True  # SSL certificate verification always enabled
-    return session
-
-
-def build_feed_url(base_url, endpoint, limit):
-    if not base_url.startswith("https://"):
-        print("Error: KASPERSKY_TIP_BASE_URL must use HTTPS. Check your .env file.")
-        sys.exit(1)
-    url = f"{base_url.rstrip('/')}/{endpoint}"
-    if limit and limit > 0:
-        url += f"?limit={limit}"
-    return url
-
-
-def handle_api_error(response):
-    status = response.status_code
-    messages = {
-        401: (
-            "Authentication failed. Verify KASPERSKY_TIP_TOKEN in your .env file. "
-            "Tokens expire after 1 year — request a new one at https://tip.kaspersky.com."
-        ),
-        403: (
-            "Access denied. Your token may not have permission for this feed. "
-            "Check your Kaspersky TIP subscription."
-        ),
-        404: (
-            "Feed endpoint not found. Verify KASPERSKY_TIP_FEED_ENDPOINT in your .env file. "
-            "Consult the OpenAPI spec at https://tip.kaspersky.com/Help/api/?specId=tip-feeds-api"
-        ),
-        429: "Rate limit exceeded. Wait before retrying.",
-        500: "Kaspersky TIP API internal server error. Try again later.",
-        502: "Kaspersky TIP API is temporarily unavailable (502). Try again in a few minutes.",
-        503: "Kaspersky TIP API is temporarily unavailable (503). Try again in a few minutes.",
-        504: "Kaspersky TIP API gateway timeout (504). Try again in a few minutes.",
+def parse_arguments(text=TEXT):
+    parser = argparse.ArgumentParser(description=text["description"])
+    defaults = {
+        "fields": ", ".join(FILTER_FIELDS),
+        "prefetch_pages": DEFAULT_PREFETCH_PAGES,
+        "max_retries": DEFAULT_MAX_RETRIES,
+        "retry_budget": DEFAULT_RETRY_BUDGET,
+        "listen": DEFAULT_LISTEN,
+        "refresh_interval": DEFAULT_REFRESH_INTERVAL,
     }
-    msg = messages.get(status, f"Unexpected HTTP {status} from Kaspersky TIP API.")
-    print(f"Error: {msg}")
-    sys.exit(1)
 
-
-def resolve_download_redirect(session, download_url):
-    try:
-        response = session.get(download_url, timeout=(10, 300))
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError:
-        handle_api_error(response)
-    except requests.exceptions.SSLError as e:
-        print(f"Error: SSL certificate verification failed during download: {e}")
-        sys.exit(1)
-    except requests.exceptions.Timeout:
-        print("Error: Download timed out. The feed file may be very large. Try again.")
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as e:
-        print(f"Error: Could not connect to the download URL: {e}")
-        sys.exit(1)
-
-
-def fetch_feed(session, url):
-    try:
-        response = session.get(url, timeout=(10, 60))
-        response.raise_for_status()
-    except requests.exceptions.HTTPError:
-        handle_api_error(response)
-    except requests.exceptions.SSLError as e:
-        print(f"Error: SSL certificate verification failed: {e}")
-        sys.exit(1)
-    except requests.exceptions.Timeout:
-        print("Error: Request timed out. Check your network connection and try again.")
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as e:
-        print(f"Error: Could not reach Kaspersky TIP API: {e}")
-        sys.exit(1)
-
-    data = response.json()
-
-    if isinstance(data, list):
-        return data  # Option A: API returned records directly
-
-    if isinstance(data, dict):
-        # Option B: API returned a redirect object with a download URL
-        for key in ("download_url", "url", "link", "data_url"):
-            if key in data:
-                print("  Resolving download link from API response...")
-                return resolve_download_redirect(session, data[key])
-        raise ValueError(
-            f"Unexpected API response format. Keys in response: {list(data.keys())}"
-        )
-
-    raise ValueError(
-        f"Unexpected API response type: {type(data).__name__}. Expected a JSON array."
-    )
+    def add(option, **kwargs):
+        parser.add_argument(option, help=text["help"][option].format(**defaults), **kwargs)
+
+    add("--country", type=str, default="")
+    add("--countries", type=str, default="")
+    add("--all-countries", action="store_true")
+    add("--filter-mode", type=str, choices=list(FILTER_MODES), default="")
+    add("--where", type=str, default=None)
+    add("--since", type=str, default=None)
+    add("--until", type=str, default=None)
+    add("--output-file", type=str, default=None)
+    add("--output-format", type=str, choices=sorted(OUTPUT_EXTENSIONS), default="json")
+    add("--diff", action="store_true")
+    add("--state-file", type=str, default=None)
+    add("--compress", type=str, choices=sorted(COMPRESSION_EXTENSIONS), default=None)
+    add("--save-raw", action="store_true")
+    add("--input-file", type=str, default=None)
+    add("--no-cache", action="store_true")
+    add("--build-index", action="store_true")
+    add("--no-index", action="store_true")
+    add("--lookup-file", type=str, default=None)
+    add("--lookup-field", choices=("ip", "net_range"), default="ip")
+    add("--workers", type=int, default=1)
+    add("--columnar", action="store_true")
+    add("--limit", type=int, default=None)
+    add("--page-size", type=int, default=None)
+    add("--prefetch-pages", type=int, default=DEFAULT_PREFETCH_PAGES)
+    add("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    add("--retry-budget", type=int, default=DEFAULT_RETRY_BUDGET)
+    add("--feed-endpoint", type=str, default=None)
+    add("--serve", action="store_true")
+    add("--listen", type=str, default=DEFAULT_LISTEN)
+    add("--socket", type=str, default=None)
+    add("--refresh-interval", type=int, default=DEFAULT_REFRESH_INTERVAL)
+    add("--metrics-file", type=str, default=None)
+    add("--metrics-format", choices=METRICS_FORMATS, default="json")
+    return parser.parse_args()
 
 
 # ---------------------------------------------------------------------------
 # Country validation and interactive prompts
 # ---------------------------------------------------------------------------
 
-def validate_country_code(country_code):
-    if len(country_code) != 2 or not country_code.isalpha():
-        raise ValueError(
-            f"Invalid country code: '{country_code}'. "
-            "Must be a two-letter ISO 3166-1 alpha-2 code (e.g., ES, US, DE)."
-        )
-    if not pycountry.countries.get(alpha_2=country_code.upper()):
-        raise ValueError(
-            f"Country code '{country_code}' is not a valid ISO 3166-1 alpha-2 code."
-        )
-
-
 def normalize_country_code(country_code):
     return country_code.upper()
 
 
-def prompt_country_if_missing(country):
+def is_valid_country_code(country_code):
+    try:
+        validate_country_code(country_code)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_country_list(value, text=TEXT):
+    countries = []
+    for code in value.split(","):
+        code = code.strip()
+        if not code:
+            continue
+        validate_country_code(code, text["core"])
+        code = normalize_country_code(code)
+        if code not in countries:
+            countries.append(code)
+    if not countries:
+        raise ValueError(text["countries_required"])
+    return countries
+
+
+def prompt_country_if_missing(country, text=TEXT):
     if country:
         return country
     while True:
-        code = input("Enter country code (ISO 3166-1 alpha-2, e.g., ES): ").strip()
+        code = input(text["prompt_country"]).strip()
         try:
-            validate_country_code(code)
+            validate_country_code(code, text["core"])
             return code
         except ValueError as e:
             print(f"  {e}")
 
 
-def prompt_filter_mode_if_missing(mode):
+def prompt_filter_mode_if_missing(mode, text=TEXT):
     if mode:
         return mode
     while True:
-        value = input(
-            "Select filter mode [geo / admin / combined] (press Enter for combined): "
-        ).strip().lower()
+        value = input(text["prompt_mode"].format(modes=" / ".join(FILTER_MODES))).strip().lower()
         if not value:
             return "combined"
-        if value in ("geo", "admin", "combined"):
+        if value in FILTER_MODES:
             return value
-        print("  Invalid mode. Choose from: geo, admin, combined.")
+        print(text["invalid_mode"].format(modes=", ".join(FILTER_MODES)))
 
 
 # ---------------------------------------------------------------------------
-# Local file loading (fallback / backward-compatible mode)
+# Filtering (country modes are single-clause filter expressions, see feed_filter.py)
 # ---------------------------------------------------------------------------
 
-def load_input_file(input_file):
-    if not os.path.exists(input_file):
-        raise FileNotFoundError(f"Input file not found: {input_file}")
-    try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON format in input file: {e}")
-    except PermissionError as e:
-        raise PermissionError(f"Permission denied reading: {input_file}. Details: {e}")
-    if not data:
-        raise ValueError("Input file is empty or contains no records.")
-    return data
+def record_countries(entry, mode, sections=None):
+    # Country buckets a record belongs to under the given mode (uppercase codes)
+    sections = sections or mode_sections(mode)
+    codes = set()
+    if "geo" in sections:
+        codes.add(entry.get("ip_geo", "").upper())
+    if "admin" in sections:
+        codes.add((entry.get("ip_whois") or {}).get("country", "").upper())
+    if "victims" in sections:
+        codes.update(victim_countries(entry.get("users_geo")))
+    return codes
+
+
+def build_record_filter(args, country=None, mode="combined", text=TEXT):
+    """
+    Compile the country filter plus --where / --since / --until. Parsed up
+    front, so a bad expression or date fails before any download.
+    """
+    since = parse_time_bound(args.since) if args.since else None
+    until = parse_time_bound(args.until) if args.until else None
+    if since is not None and until is not None and since > until:
+        raise ValueError(text["since_after_until"])
+    return compile_filter(args.where, country, mode, since, until)
 
 
 # ---------------------------------------------------------------------------
-# Filtering (logic identical to filter_country_advanced.py)
+# Output
 # ---------------------------------------------------------------------------
 
-def filter_geo(data, country):
-    normalized = country.lower()
-    return [entry for entry in data if entry.get("ip_geo", "").lower() == normalized]
+def generate_output_filename(country, mode, compress=None, output_format="json"):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = OUTPUT_EXTENSIONS[output_format] + COMPRESSION_EXTENSIONS.get(compress, "")
+    return f"feeds/{FEED_NAME}_{country}_{mode}_{timestamp}{extension}"
 
 
-def filter_admin(data, country):
-    normalized = country.upper()
-    return [
-        entry for entry in data
-        if entry.get("ip_whois", {}).get("country", "").upper() == normalized
-    ]
+def generate_lookup_filename(compress=None, output_format="json"):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = OUTPUT_EXTENSIONS[output_format] + COMPRESSION_EXTENSIONS.get(compress, "")
+    return f"feeds/{FEED_NAME}_lookup_{timestamp}{extension}"
 
 
-def filter_combined(data, country):
-    geo = country.lower()
-    adm = country.upper()
-    return [
-        entry for entry in data
-        if entry.get("ip_geo", "").lower() == geo
-        or entry.get("ip_whois", {}).get("country", "").upper() == adm
-    ]
+def generate_raw_filename(compress=None):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = COMPRESSION_EXTENSIONS.get(compress, "")
+    return f"feeds/{FEED_NAME}_raw_{timestamp}.json{suffix}"
+
+
+def save_country_buckets(data, countries, mode, compress=None, output_format="json", messages=ENGLISH):
+    """
+    Route every record into per-country output files in a single pass.
+    countries=None writes a bucket for every valid country code found in the feed.
+    Returns {country: (output_file, matched)}.
+    """
+    sections = mode_sections(mode)
+    buckets = {}
+    skipped = set()
+
+    def open_bucket(code):
+        output_file = generate_output_filename(code, mode, compress, output_format)
+        ensure_output_directory(output_file, messages)
+        buckets[code] = (output_file, open_output_writer(output_file, output_format, messages))
+        return buckets[code]
 
+    try:
+        for code in countries or ():
+            open_bucket(code)
+        for entry in data:
+            for code in record_countries(entry, mode, sections):
+                bucket = buckets.get(code)
+                if bucket is None:
+                    if countries or code in skipped:
+                        continue
+                    if not is_valid_country_code(code):
+                        skipped.add(code)
+                        continue
+                    bucket = open_bucket(code)
+                bucket[1].write(entry)
+    finally:
+        for _, writer in buckets.values():
+            writer.close()
+
+    return {code: (output_file, writer.count) for code, (output_file, writer) in buckets.items()}
+
+
+def display_summary(
+    source, country, mode, total, matched, output_file, raw_file=None, metrics=None, where=None,
+    diff=None, text=TEXT,
+):
+    print(text["summary"])
+    print(text["source"].format(source))
+    print(text["country"].format(country, country_name(country) or country))
+    print(text["mode"].format(mode))
+    if where:
+        print(text["where"].format(where))
+    print(text["total"].format(total))
+    print(text["matched"].format(matched))
+    print(text["filtered_out"].format(total - matched))
+    if diff:
+        paths, changes, state_path = diff
+        print(text["unchanged"].format(changes["unchanged"]))
+        for name in DIFF_SETS:
+            print(f"  {text['diff_sets'][name]:<14}: {changes[name]:>8}  ->  {paths[name]}")
+        if changes["skipped"]:
+            print(text["untracked"].format(changes["skipped"]))
+        print(text["diff_state"].format(state_path))
+    else:
+        print(text["output_saved"].format(output_file))
+    if raw_file:
+        print(text["raw_feed"].format(raw_file))
+    if metrics:
+        display_metrics(metrics, text)
+    if matched == 0:
+        print(text["no_match"])
+    print()
 
-def apply_filter(data, country, mode):
-    if mode == "geo":
-        return filter_geo(data, country)
-    elif mode == "admin":
-        return filter_admin(data, country)
-    elif mode == "combined":
-        return filter_combined(data, country)
-    raise ValueError(f"Unknown filter mode: '{mode}'. Use geo, admin, or combined.")
 
+def display_metrics(metrics, text=TEXT):
+    def fmt(value, width, spec=""):
+        cell = format(value, spec) if value is not None else "-"
+        return f"{cell:>{width}}"
 
-# ---------------------------------------------------------------------------
-# Output
-# ---------------------------------------------------------------------------
+    name, wall, cpu, records, rate, mib, rss = text["metrics_columns"]
+    print(f"\n  {name:<10} {wall:>8} {cpu:>8} {records:>10} {rate:>8} {mib:>10} {rss:>14}")
+    for name, stage in metrics["stages"].items():
+        rss = stage["peak_rss_kb"] / 1024 if stage["peak_rss_kb"] is not None else None
+        print(
+            f"  {name:<10} {stage['wall_s']:>8.2f} {stage['cpu_s']:>8.2f} "
+            f"{stage['records']:>10} {fmt(stage['records_per_s'], 8)} "
+            f"{stage['bytes'] / 1048576:>10.1f} {fmt(rss, 14, '.1f')}"
+        )
+    rss = metrics["peak_rss_kb"] / 1024 if metrics["peak_rss_kb"] is not None else None
+    print(
+        f"  {text['metrics_total']:<10} {metrics['wall_s']:>8.2f} {metrics['cpu_s']:>8.2f} "
+        f"{'':>10} {'':>8} {'':>10} {fmt(rss, 14, '.1f')}"
+    )
 
-def ensure_output_directory(output_file):
-    output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
-        try:
-            os.makedirs(output_dir)
-        except PermissionError as e:
-            raise PermissionError(
-                f"Permission denied creating directory: {output_dir}. Details: {e}"
-            )
 
+def display_fan_out_summary(
+    source, mode, total, results, raw_file=None, metrics=None, where=None, text=TEXT
+):
+    print(text["summary"])
+    print(text["source"].format(source))
+    print(text["mode"].format(mode))
+    if where:
+        print(text["where"].format(where))
+    print(text["total"].format(total))
+    print(text["countries"].format(len(results)))
+    for code in sorted(results):
+        output_file, matched = results[code]
+        print(f"    {code} : {matched:>8}  ->  {output_file}")
+    if raw_file:
+        print(text["raw_feed"].format(raw_file))
+    if metrics:
+        display_metrics(metrics, text)
+    if not any(matched for _, matched in results.values()):
+        print(text["no_match_fan_out"])
+    print()
 
-def generate_output_filename(country, mode):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"feeds/{FEED_NAME}_{country}_{mode}_{timestamp}.json"
 
+def display_lookup_summary(
+    source, total, queried, ranges, invalid, listed, matched, output_file, metrics=None, text=TEXT
+):
+    print(text["summary"])
+    print(text["source"].format(source))
+    print(text["total"].format(total))
+    print(text["ips_queried"].format(queried))
+    if ranges:
+        print(text["ranges_queried"].format(ranges))
+    if invalid:
+        print(text["invalid_lines"].format(invalid))
+    if listed is not None:
+        print(text["ips_listed"].format(listed))
+        print(text["not_listed"].format(queried - listed))
+    print(text["records_saved"].format(matched))
+    print(text["output_saved"].format(output_file))
+    if metrics:
+        display_metrics(metrics, text)
+    if matched == 0:
+        print(text["no_match_lookup"])
+    print()
 
-def generate_raw_filename():
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"feeds/{FEED_NAME}_raw_{timestamp}.json"
 
+def diff_state_path(args, country, mode):
+    """
+    --state-file, or one default snapshot per country, mode and filter set.
+    """
+    if args.state_file:
+        return args.state_file
+    label = f"{FEED_NAME}_{country}_{mode}"
+    filters = "\n".join(value or "" for value in (args.where, args.since, args.until))
+    if filters.strip():
+        label += "_" + hashlib.sha256(filters.encode("utf-8")).hexdigest()[:8]
+    return default_state_path(label)
+
+
+def save_metrics(args, run_metrics, labels, text=TEXT):
+    if args.metrics_file:
+        write_metrics_file(args.metrics_file, run_metrics, args.metrics_format, labels)
+        print(text["metrics_saved"].format(args.metrics_file))
 
-def save_output_file(output_file, data):
-    try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except PermissionError as e:
-        raise PermissionError(f"Permission denied writing to: {output_file}. Details: {e}")
-
-
-def display_summary(source, country, mode, total, matched, output_file, raw_file=None):
-    country_obj = pycountry.countries.get(alpha_2=country)
-    country_name = country_obj.name if country_obj else country
-    print("\n--- Summary ---")
-    print(f"  Source        : {source}")
-    print(f"  Country       : {country} ({country_name})")
-    print(f"  Filter mode   : {mode}")
-    print(f"  Total records : {total}")
-    print(f"  Matched       : {matched}")
-    print(f"  Filtered out  : {total - matched}")
-    print(f"  Output saved  : {output_file}")
-    if raw_file:
-        print(f"  Raw feed      : {raw_file}")
-    if matched == 0:
-        print("\n  [!] No records matched. Try a different country or filter mode.")
-    print()
+
+def api_error_text(error, text=TEXT):
+    # ApiError's message, or its localized version when text has one
+    if error.status and text["api_errors"]:
+        return text["api_errors"].get(error.status, text["api_error_status"].format(error.status))
+    return str(error)
+
+
+# ---------------------------------------------------------------------------
+# IP lookup mode
+# ---------------------------------------------------------------------------
+
+def run_lookup(args, metrics, config=None, text=TEXT):
+    """
+    Save the feed records that match --lookup-file. Queried addresses are
+    indexed as sorted integers, prefixes and ranges as an interval index, and
+    the feed is streamed once against them.
+    """
+    messages = text["core"]
+    if not os.path.exists(args.lookup_file):
+        raise FileNotFoundError(text["lookup_not_found"].format(args.lookup_file))
+    keys, ranges, invalid = read_query_list(args.lookup_file)
+    if not keys and not ranges:
+        raise ValueError(text["lookup_empty"].format(args.lookup_file))
+    narrowed = args.where or args.since or args.until
+    record_filter = build_record_filter(args, text=text) if narrowed else None
+    print(text["looking_up"].format(
+        ips=len(keys), ranges=len(ranges), path=args.lookup_file, field=args.lookup_field
+    ))
+
+    pipeline = build_pipeline(args, config)
+    if args.input_file:
+        print(text["loading_local"].format(args.input_file))
+        data = pipeline.stream()
+        metrics.add_bytes("parse", os.path.getsize(args.input_file))
+    else:
+        print(text["downloading"])
+        data = pipeline.stream(metrics)
+    retry = pipeline.retry
+    source = describe_source(pipeline, text)
+
+    feed = RecordCounter(metrics.timed("parse", data))
+    records = record_filter.filter(feed) if record_filter else feed
+    matches = metrics.timed(
+        "filter", iter_listed_records(records, keys, ranges, args.lookup_field)
+    )
+    queried = set(keys)
+    listed = set()
+
+    def track_listed(records):
+        # Exact queried addresses that appear as a record ip
+        for entry in records:
+            key = ip_to_int(entry.get("ip", ""))
+            if key in queried:
+                listed.add(key)
+            yield entry
+
+    output_file = args.output_file or generate_lookup_filename(args.compress, args.output_format)
+    ensure_output_directory(output_file, messages)
+    with metrics.stage("write") as stage:
+        matched = save_output_file(output_file, track_listed(matches), args.output_format, messages)
+    stage.records = matched
+
+    run_metrics = metrics.finish()
+    by_ip = args.lookup_field == "ip"
+    run_metrics["counts"] = {
+        "records_total": feed.count,
+        "records_matched": matched,
+        "ips_queried": len(keys),
+        "ranges_queried": len(ranges),
+    }
+    if by_ip:
+        run_metrics["counts"]["ips_listed"] = len(listed)
+    if retry:
+        run_metrics["counts"]["api_retries"] = retry.retries
+    display_lookup_summary(
+        source, feed.count, len(keys), len(ranges), invalid,
+        len(listed) if by_ip else None, matched, output_file, run_metrics, text,
+    )
+    save_metrics(args, run_metrics, {"mode": "lookup", "field": args.lookup_field}, text)
+
+
+# ---------------------------------------------------------------------------
+# Serve mode
+# ---------------------------------------------------------------------------
+
+def build_pipeline(args, config=None):
+    """
+    FeedPipeline for --input-file, or for the API with `config` and the
+    --no-cache / --prefetch-pages / retry options.
+    """
+    if args.input_file:
+        return FeedPipeline(args.input_file)
+    retry = RetryScheduler(args.max_retries, args.retry_budget)
+    return FeedPipeline(None, config, args.no_cache, args.prefetch_pages, retry)
+
+
+def describe_source(pipeline, text=TEXT):
+    """
+    The feed source of `pipeline` as shown in the summaries: the local file,
+    or the API endpoint(s) it downloads.
+    """
+    if pipeline.input_file:
+        return text["source_local"].format(pipeline.input_file)
+    endpoints = parse_feed_endpoints(pipeline.config["feed_endpoint"])
+    return text["source_apis" if len(endpoints) > 1 else "source_api"].format(", ".join(endpoints))
+
+
+def run_server(args, config=None, text=TEXT):
+    from feed_server import FeedService, serve_forever
+
+    if args.refresh_interval < 0:
+        raise ValueError(text["refresh_interval"])
+    pipeline = build_pipeline(args, config)
+    print(text["loading_feed"].format(describe_source(pipeline, text)))
+    # A local file is reloaded only when its size or modification time changes;
+    # the API feed goes through the download cache (an unchanged feed is a 304)
+    service = FeedService(pipeline.read, pipeline.source, args.refresh_interval)
+    serve_forever(service, args.listen, args.socket)
 
 
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
-def main():
-    display_disclaimer()
-    args = parse_arguments()
+def main(text=TEXT):
+    """
+    Run the CLI with the messages of `text` (TEXT here, the Spanish TEXT in
+    kaspersky_tdf_es.py); options and behaviour are the same in both.
+    """
+    messages = text["core"]
+    display_disclaimer(text)
+    args = parse_arguments(text)
+    show_progress(messages)
+    metrics = PipelineMetrics()
 
     try:
         local_mode = bool(args.input_file)
@@ -397,55 +711,182 @@ def main():
         # API mode: load config and validate token before doing anything else
         if not local_mode:
             config = load_config()
-            validate_token_present(config["token"])
+            if not config["token"]:
+                raise ValueError(text["token_missing"])
+            if not config["base_url"].startswith("https://"):
+                raise ValueError(text["https_required"])
             # Apply per-run CLI overrides (endpoint and limit only — token stays in env)
             if args.feed_endpoint:
                 config["feed_endpoint"] = args.feed_endpoint
             if args.limit is not None:
                 config["limit"] = args.limit
-
-        # Resolve country and filter mode (from CLI args or interactive prompts)
-        country_input = prompt_country_if_missing(args.country)
-        validate_country_code(country_input)
-        country = normalize_country_code(country_input)
-        mode = prompt_filter_mode_if_missing(args.filter_mode)
-
-        # Fetch or load data
+            if args.page_size is not None:
+                config["page_size"] = args.page_size
+
+        if args.serve:
+            run_server(args, None if local_mode else config, text)
+            return
+        if args.lookup_file:
+            if args.countries or args.all_countries:
+                raise ValueError(text["lookup_with_fan_out"])
+            run_lookup(args, metrics, None if local_mode else config, text)
+            return
+
+        # Resolve country (or country list) and filter mode (from CLI args or prompts)
+        fan_out = bool(args.countries or args.all_countries)
+        if fan_out:
+            if args.output_file:
+                raise ValueError(text["output_with_fan_out"])
+            countries = None if args.all_countries else parse_country_list(args.countries, text)
+        else:
+            country_input = prompt_country_if_missing(args.country, text)
+            validate_country_code(country_input, messages)
+            country = normalize_country_code(country_input)
+        mode = prompt_filter_mode_if_missing(args.filter_mode, text)
+        narrowed = bool(args.where or args.since or args.until)
+        if fan_out:
+            record_filter = build_record_filter(args, text=text)
+        else:
+            record_filter = build_record_filter(args, country, mode, text)
+        if args.workers < 1:
+            raise ValueError(messages["workers"])
+        if args.workers > 1 and (fan_out or not local_mode):
+            raise ValueError(text["workers_scope"])
+        if args.columnar and (fan_out or not local_mode):
+            raise ValueError(text["columnar_scope"])
+        if args.diff and fan_out:
+            raise ValueError(text["diff_scope"])
+
+        # Fetch or load data (records are streamed, never held in memory at once)
         raw_file = None
+        raw_writer = None
+        engine = None  # yields only matching records, and .count the records in the feed
+        pipeline = build_pipeline(args, None if local_mode else config)
+        retry, source = pipeline.retry, describe_source(pipeline, text)
         if local_mode:
-            print(f"Loading local file: {args.input_file}")
-            data = load_input_file(args.input_file)
-            source = f"Local file: {args.input_file}"
+            print(text["loading_local"].format(args.input_file))
+            if not os.path.exists(args.input_file):
+                raise FileNotFoundError(messages["input_not_found"].format(path=args.input_file))
+            if args.build_index:
+                print(text["building_index"])
+                with metrics.stage("index"):
+                    index_path = build_country_index(args.input_file)
+                print(text["index_saved"].format(index_path))
+            if args.columnar:
+                from feed_columnar import load_columnar_feed
+
+                print(text["loading_columnar"])
+                with metrics.stage("load"):
+                    engine = load_columnar_feed(args.input_file)
+                data = engine.iter_records(record_filter.mask(engine))
+            elif not fan_out:
+                selected = select_engine(
+                    args.input_file, country, mode, args.workers, messages,
+                    record_filter=record_filter, use_index=not args.no_index,
+                )
+                if selected:
+                    data, engine = selected
+                    if isinstance(engine, CountryIndex):
+                        print(text["using_index"].format(args.input_file))
+                    else:
+                        print(text["using_workers"].format(args.workers))
+            if engine is None:
+                data = pipeline.stream()
+                metrics.add_bytes("parse", os.path.getsize(args.input_file))
         else:
-            url = build_feed_url(config["base_url"], config["feed_endpoint"], config["limit"])
-            print(f"Downloading feed from Kaspersky TIP API...")
-            session = build_api_session(config["token"])
-            data = fetch_feed(session, url)
-            source = f"API endpoint: {config['feed_endpoint']}"
-            print(f"  Downloaded {len(data)} records.")
+            print(text["downloading"])
+            data = pipeline.stream(metrics)
 
             if args.save_raw:
-                raw_file = generate_raw_filename()
-                ensure_output_directory(raw_file)
-                save_output_file(raw_file, data)
-                print(f"  Raw feed saved to: {raw_file}")
+                raw_file = generate_raw_filename(args.compress)
+                ensure_output_directory(raw_file, messages)
+                raw_writer = open_output_writer(raw_file, messages=messages)
 
-        # Filter
-        print(f"Filtering by country '{country}' using mode '{mode}'...")
-        filtered = apply_filter(data, country, mode)
+        # The country index cannot evaluate --where/--since/--until
+        prefiltered = engine and not (narrowed and isinstance(engine, CountryIndex))
+        feed = RecordCounter(metrics.timed("select" if engine else "parse", data))
+        records = metrics.timed("save_raw", tee_records(feed, raw_writer)) if raw_writer else feed
 
-        # Save output
-        output_file = args.output_file or generate_output_filename(country, mode)
-        ensure_output_directory(output_file)
-        save_output_file(output_file, filtered)
+        # Filter and save output in a single streaming pass
+        try:
+            if fan_out:
+                label = text["all_countries"] if countries is None else ", ".join(countries)
+                print(text["routing"].format(countries=label, mode=mode))
+                if narrowed:
+                    records = metrics.timed("filter", record_filter.filter(records))
+                with metrics.stage("route") as stage:
+                    results = save_country_buckets(
+                        records, countries, mode, args.compress, args.output_format, messages
+                    )
+                stage.records = sum(count for _, count in results.values())
+            else:
+                where = text["filtering_where"].format(record_filter.description) if narrowed else ""
+                print(text["filtering"].format(country=country, mode=mode, where=where))
+                output_file = args.output_file or generate_output_filename(
+                    country, mode, args.compress, args.output_format
+                )
+                ensure_output_directory(output_file, messages)
+                diff = None
+                with metrics.stage("write") as stage:
+                    if prefiltered:
+                        filtered = records
+                    else:
+                        filtered = metrics.timed("filter", record_filter.filter(records))
+                    if args.diff:
+                        state_path = diff_state_path(args, country, mode)
+                        paths, changes = write_diff(
+                            filtered, output_file, state_path, args.output_format, f"{country}_{mode}"
+                        )
+                        diff = (paths, changes, state_path)
+                        matched = sum(changes[name] for name in ("added", "modified", "unchanged"))
+                        written = list(paths.values())
+                    else:
+                        matched = save_output_file(output_file, filtered, args.output_format, messages)
+                        written = [output_file]
+                stage.records = matched
+                stage.bytes = sum(os.path.getsize(path) for path in written)
+        finally:
+            if raw_writer:
+                raw_writer.close()
 
-        display_summary(source, country, mode, len(data), len(filtered), output_file, raw_file)
+        if not local_mode:
+            print(text["downloaded"].format(feed.count))
+            if retry.retries:
+                print(text["recovered"].format(retry.retries))
+            for endpoint, count in getattr(data, "counts", {}).items():
+                print(f"    {endpoint}: {count}")
+            if raw_file:
+                print(text["raw_saved"].format(raw_file))
+
+        total = engine.count if engine else feed.count
+        run_metrics = metrics.finish()
+        if fan_out:
+            matched = metrics.stages["route"].records
+        run_metrics["counts"] = {"records_total": total, "records_matched": matched}
+        if retry:
+            run_metrics["counts"]["api_retries"] = retry.retries
+        if not fan_out and diff:
+            for name in DIFF_SETS:
+                run_metrics["counts"][f"records_{name}"] = diff[1][name]
+        if fan_out:
+            display_fan_out_summary(
+                source, mode, total, results, raw_file, run_metrics, record_filter.description, text
+            )
+        else:
+            display_summary(
+                source, country, mode, total, matched, output_file, raw_file, run_metrics,
+                record_filter.description, diff, text,
+            )
+        save_metrics(args, run_metrics, {"mode": mode, "country": "multi" if fan_out else country}, text)
 
-    except (FileNotFoundError, PermissionError, ValueError) as e:
-        print(f"Error: {e}")
+    except ApiError as e:
+        print(text["error"].format(api_error_text(e, text)))
+        sys.exit(1)
+    except (FileNotFoundError, PermissionError, ValueError, RetryExhausted) as e:
+        print(text["error"].format(e))
         sys.exit(1)
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        print(text["unexpected_error"].format(e))
         sys.exit(1)
 
 
@@ -6,153 +6,216 @@
 # conlleva garantías de funcionalidad o soporte.
 # Úselo bajo su propia responsabilidad y valide siempre los resultados en su entorno.
 
-import argparse
-import json
-import os
-import sys
-from datetime import datetime
-
-import pycountry
-import requests
-from dotenv import load_dotenv
-
-NOMBRE_FEED = "IP_Reputation"
-URL_BASE_DEFECTO = "https://tip.kaspersky.com/api/feeds/"
-ENDPOINT_DEFECTO = "ip_reputation"
-
-
-# ---------------------------------------------------------------------------
-# Aviso legal
-# ---------------------------------------------------------------------------
-
-def mostrar_aviso():
-    print(
+# Las opciones, la descarga, el filtrado y la escritura son los de
+# kaspersky_tdf.py (y de feed_core.py / feed_pipeline.py, que este usa): este
+# script solo aporta los mensajes en español.
+from feed_core import MESSAGES
+from kaspersky_tdf import main
+
+# Mismas claves que kaspersky_tdf.TEXT
+TEXTO = {
+    "core": MESSAGES["es"],
+    "disclaimer": (
         "\n*** AVISO LEGAL ***\n"
         "Este script se proporciona como Prueba de Concepto (PoC) únicamente con fines "
         "educativos y de demostración.\n"
         "No es una herramienta oficial de Kaspersky, ni conlleva garantías de "
         "funcionalidad o soporte.\n"
         "Úselo bajo su propia responsabilidad y valide siempre los resultados en su entorno.\n"
-    )
-
-
-# ---------------------------------------------------------------------------
-# Argumentos de línea de comandos
-# ---------------------------------------------------------------------------
-
-def parsear_argumentos():
-    parser = argparse.ArgumentParser(
-        description=(
-            "Kaspersky TDF ByCountry — pipeline completo: "
-            "descarga el feed de Reputación de IP, filtra por país y guarda el resultado."
-        )
-    )
-    parser.add_argument(
-        "--country",
-        type=str,
-        default="",
-        help="Código de país ISO 3166-1 alpha-2 (ej. ES). Se solicita de forma interactiva si se omite.",
-    )
-    parser.add_argument(
-        "--filter-mode",
-        type=str,
-        choices=["geo", "admin", "combined"],
-        default="",
-        help="Modo de filtrado: geo, admin o combined (por defecto: combined).",
-    )
-    parser.add_argument(
-        "--output-file",
-        type=str,
-        default=None,
-        help="Ruta del archivo de salida. Se genera automáticamente con marca de tiempo si se omite.",
-    )
-    parser.add_argument(
-        "--save-raw",
-        action="store_true",
-        help="Guarda también el feed sin filtrar en feeds/IP_Reputation_raw_TIMESTAMP.json.",
-    )
-    parser.add_argument(
-        "--input-file",
-        type=str,
-        default=None,
-        help=(
-            "MODO LOCAL: lee desde este archivo JSON local en lugar de llamar a la API. "
-            "Cuando se especifica, no se requiere token de API."
+    ),
+    "description": (
+        "Kaspersky TDF ByCountry — pipeline completo: "
+        "descarga el feed de Reputación de IP, filtra por país y guarda el resultado."
+    ),
+    "help": {
+        "--country": "Código de país ISO 3166-1 alpha-2 (ej. ES). Se solicita de forma interactiva si se omite.",
+        "--countries": (
+            "Lista de códigos de país separados por comas (ej. ES,PT,FR). Recorre el feed una "
+            "sola vez y escribe un archivo de salida por país."
         ),
-    )
-    parser.add_argument(
-        "--limit",
-        type=int,
-        default=None,
-        help="Sobreescribe KASPERSKY_TIP_LIMIT para esta ejecución (0 = sin límite).",
-    )
-    parser.add_argument(
-        "--feed-endpoint",
-        type=str,
-        default=None,
-        help="Sobreescribe KASPERSKY_TIP_FEED_ENDPOINT para esta ejecución.",
-    )
-    return parser.parse_args()
-
-
-# ---------------------------------------------------------------------------
-# Configuración (secretos desde .env únicamente — nunca desde argumentos CLI)
-# ---------------------------------------------------------------------------
-
-def cargar_configuracion():
-    load_dotenv()
-    token = os.environ.get("KASPERSKY_TIP_TOKEN", "").strip()
-    url_base = os.environ.get("KASPERSKY_TIP_BASE_URL", URL_BASE_DEFECTO).strip()
-    endpoint = os.environ.get("KASPERSKY_TIP_FEED_ENDPOINT", ENDPOINT_DEFECTO).strip()
-    limite_str = os.environ.get("KASPERSKY_TIP_LIMIT", "0").strip()
-    try:
-        limite = int(limite_str)
-    except ValueError:
-        limite = 0
-    return {
-        "token": token,
-        "base_url": url_base,
-        "feed_endpoint": endpoint,
-        "limit": limite,
-    }
-
-
-def validar_token_presente(token):
-    if not token:
-        print("Error: KASPERSKY_TIP_TOKEN no está configurado.")
-        print("  1. Copie .env.example a .env")
-        print("  2. Establezca KASPERSKY_TIP_TOKEN con su token de API")
-        print("  3. Obtenga un token en: https://tip.kaspersky.com (Configuración de cuenta)")
-        sys.exit(1)
-
-
-# ---------------------------------------------------------------------------
-# Cliente HTTP (modo API)
-# ---------------------------------------------------------------------------
-
-def crear_sesion_api(token):
-    sesion = requests.Session()
-    sesion.headers.update({
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-    })
-    sesion.verify = True  # Verificación de certificado SSL siempre activada
-    return sesion
-
-
-def construir_url_feed(url_base, endpoint, limite):
-    if not url_base.startswith("https://"):
-        print("Error: KASPERSKY_TIP_BASE_URL debe usar HTTPS. Revise su archivo .env.")
-        sys.exit(1)
-    url = f"{url_base.rstrip('/')}/{endpoint}"
-    if limite and limite > 0:
-        url += f"?limit={limite}"
-    return url
-
-
-def manejar_error_api(respuesta):
-    estado = respuesta.status_code
-    mensajes = {
+        "--all-countries": "Como --countries, pero escribe un archivo por cada país presente en el feed.",
+        "--filter-mode": (
+            "Modo de filtrado: geo (ubicación de la IP), admin (país del whois), combined (cualquiera), "
+            "victims (users_geo: amenazas vistas contra usuarios del país) o una combinación "
+            "'+victims' (por defecto: combined)."
+        ),
+        "--where": (
+            "Expresión de filtrado adicional aplicada en la misma pasada, ej. "
+            "\"threat_score >= 80 and category in (botnet_cnc, phishing) and last_seen within 30d\". "
+            "Campos: {fields}; operadores: == != < <= > >= in, not in, "
+            "within (s/m/h/d/w); se combinan con and, or, not y paréntesis."
+        ),
+        "--since": (
+            "Conserva solo los registros cuyo last_seen es igual o posterior a esta hora UTC "
+            "(AAAA-MM-DD[THH:MM] o DD.MM.AAAA[ HH:MM]) o está dentro de esta duración (ej. 30d, 12h)."
+        ),
+        "--until": (
+            "Conserva solo los registros cuyo last_seen es igual o anterior a esta hora UTC "
+            "(mismos formatos que --since)."
+        ),
+        "--output-file": (
+            "Ruta del archivo de salida. Se genera automáticamente con marca de tiempo si se omite. "
+            "Una extensión .json.gz o .json.zst escribe la salida comprimida."
+        ),
+        "--output-format": (
+            "Formato de salida: json (array indentado), ndjson (un registro por línea), csv, "
+            "iplist (solo las IP, una por línea) o cidr (las IP coincidentes agrupadas en la "
+            "lista mínima de prefijos CIDR). Por defecto: json."
+        ),
+        "--diff": (
+            "Escribe solo lo que cambió desde la anterior ejecución con --diff del mismo país, "
+            "modo y filtros: <salida>_added, <salida>_modified y <salida>_removed "
+            "(los eliminados solo llevan su ip). La primera ejecución lo da todo como añadido."
+        ),
+        "--state-file": (
+            "MODO DIFF: instantánea de la salida anterior (IP -> hash del registro). Por defecto: "
+            "feeds/.state/IP_Reputation_<país>_<modo>[_<hash de filtros>].state."
+        ),
+        "--compress": "Comprime los archivos de salida y sin filtrar generados automáticamente (.json.gz / .json.zst).",
+        "--save-raw": "Guarda también el feed sin filtrar en feeds/IP_Reputation_raw_TIMESTAMP.json.",
+        "--input-file": (
+            "MODO LOCAL: lee desde este archivo JSON local (.json, .json.gz o .json.zst) "
+            "en lugar de llamar a la API. Cuando se especifica, no se requiere token de API."
+        ),
+        "--no-cache": (
+            "Descarga siempre el feed completo. Por defecto la última descarga se guarda en "
+            "feeds/.cache/ y se reutiliza cuando el servidor indica que no ha cambiado."
+        ),
+        "--build-index": (
+            "MODO LOCAL: (re)construye el índice de países (<input-file>.idx) para que las "
+            "siguientes consultas sobre el mismo archivo lean solo los registros coincidentes."
+        ),
+        "--no-index": "MODO LOCAL: ignora el índice de países y recorre el archivo completo.",
+        "--lookup-file": (
+            "Comprueba las IP, prefijos CIDR o rangos 'primera - última' de este archivo (uno por "
+            "línea) contra el feed y guarda los registros coincidentes en lugar de filtrar por país."
+        ),
+        "--lookup-field": (
+            "Compara --lookup-file con la ip de cada registro (por defecto) o con su "
+            "ip_whois.net_range (registros cuyo rango whois cubre una dirección consultada)."
+        ),
+        "--workers": (
+            "MODO LOCAL: filtra un archivo JSON/NDJSON grande sin comprimir con N procesos "
+            "en paralelo (por defecto: 1)."
+        ),
+        "--columnar": (
+            "MODO LOCAL: carga el archivo sin comprimir en columnas NumPy y filtra con "
+            "máscaras vectorizadas (requiere numpy)."
+        ),
+        "--limit": "Sobreescribe KASPERSKY_TIP_LIMIT para esta ejecución (0 = sin límite).",
+        "--page-size": (
+            "Sobreescribe KASPERSKY_TIP_PAGE_SIZE para esta ejecución: descarga el feed en páginas "
+            "de N registros (paginación por offset o cursor) en lugar de una sola respuesta; "
+            "0 = una sola petición."
+        ),
+        "--prefetch-pages": (
+            "PAGINACIÓN: páginas descargadas por delante del filtrado por endpoint "
+            "(por defecto: {prefetch_pages})."
+        ),
+        "--max-retries": (
+            "Reintentos de una petición tras un 429, 5xx, tiempo de espera agotado o conexión "
+            "cortada, con espera exponencial aleatorizada o el Retry-After del servidor; las "
+            "descargas interrumpidas continúan donde se detuvieron (por defecto: {max_retries})."
+        ),
+        "--retry-budget": (
+            "Reintentos totales permitidos entre todas las peticiones de una ejecución "
+            "(por defecto: {retry_budget})."
+        ),
+        "--feed-endpoint": (
+            "Sobreescribe KASPERSKY_TIP_FEED_ENDPOINT para esta ejecución. Una lista separada "
+            "por comas (ej. ip_reputation,dangerous_ips) descarga los feeds a la vez y filtra "
+            "sus registros como un solo flujo."
+        ),
+        "--serve": (
+            "Mantiene el feed cargado y responde a consultas por país / IP por HTTP local "
+            "(ver --listen, --socket y --refresh-interval)."
+        ),
+        "--listen": "MODO SERVIDOR: HOST:PUERTO o [IPv6]:PUERTO de escucha (por defecto: {listen}).",
+        "--socket": "MODO SERVIDOR: escucha en esta ruta de socket Unix en lugar de TCP.",
+        "--refresh-interval": (
+            "MODO SERVIDOR: segundos entre actualizaciones del feed en segundo plano, 0 para "
+            "desactivarlas (por defecto: {refresh_interval})."
+        ),
+        "--metrics-file": "Escribe en este archivo los tiempos, el rendimiento y el RSS máximo de cada etapa.",
+        "--metrics-format": (
+            "Formato de --metrics-file: json o prometheus (textfile collector) (por defecto: json)."
+        ),
+    },
+    # Preguntas interactivas
+    "prompt_country": "Introduzca el código de país (ISO 3166-1 alpha-2, ej. ES): ",
+    "prompt_mode": "Seleccione el modo de filtrado [{modes}] (pulse Intro para combined): ",
+    "invalid_mode": "  Modo no válido. Elija entre: {modes}.",
+    # Errores de opciones
+    "https_required": "KASPERSKY_TIP_BASE_URL debe usar HTTPS. Revise su archivo .env.",
+    "token_missing": (
+        "KASPERSKY_TIP_TOKEN no está configurado.\n"
+        "  1. Copie .env.example a .env\n"
+        "  2. Establezca KASPERSKY_TIP_TOKEN con su token de API\n"
+        "  3. Obtenga un token en: https://tip.kaspersky.com (Configuración de cuenta)"
+    ),
+    "countries_required": "--countries requiere al menos un código de país (ej. ES,PT).",
+    "since_after_until": "--since debe ser anterior a --until.",
+    "lookup_with_fan_out": "--lookup-file no se puede combinar con --countries/--all-countries.",
+    "output_with_fan_out": (
+        "--output-file no se puede combinar con --countries/--all-countries; "
+        "se genera un archivo por país."
+    ),
+    "workers_scope": "--workers solo se aplica al filtrado de un único país de un --input-file.",
+    "columnar_scope": "--columnar solo se aplica al filtrado de un único país de un --input-file.",
+    "diff_scope": "--diff solo se aplica al filtrado de un único país.",
+    "refresh_interval": "--refresh-interval debe ser 0 o más segundos.",
+    "lookup_not_found": "Archivo de consulta no encontrado: {}",
+    "lookup_empty": "No se encontraron direcciones IP ni rangos válidos en: {}",
+    # Progreso
+    "loading_local": "Cargando archivo local: {}",
+    "downloading": "Descargando feed desde Kaspersky TIP API...",
+    "building_index": "  Construyendo el índice de países...",
+    "index_saved": "  Índice guardado en: {}",
+    "loading_columnar": "  Cargando la representación en columnas...",
+    "using_index": "  Usando el índice de países: {}.idx",
+    "using_workers": "  Filtrando con {} procesos en paralelo...",
+    "looking_up": "Consultando {ips} direcciones IP y {ranges} rangos de {path} (comparando {field})...",
+    "all_countries": "todos los países",
+    "routing": "Repartiendo los registros por país ({countries}) con modo '{mode}'...",
+    "filtering": "Filtrando por país '{country}' con modo '{mode}'{where}...",
+    "filtering_where": " donde {}",
+    "downloaded": "  Descargados {} registros.",
+    "recovered": "  Recuperadas {} peticiones fallidas reintentándolas.",
+    "raw_saved": "  Feed sin filtrar guardado en: {}",
+    "loading_feed": "Cargando feed ({})...",
+    "source_local": "Archivo local: {}",
+    "source_api": "Endpoint API: {}",
+    "source_apis": "Endpoints API: {}",
+    "metrics_saved": "Métricas guardadas en: {}",
+    # Resúmenes
+    "summary": "\n--- Resumen ---",
+    "source": "  Origen          : {}",
+    "country": "  País            : {} ({})",
+    "mode": "  Modo de filtrado: {}",
+    "where": "  Condición       : {}",
+    "total": "  Registros totales: {}",
+    "matched": "  Coincidencias   : {}",
+    "filtered_out": "  Filtrados       : {}",
+    "unchanged": "  Sin cambios     : {}",
+    "diff_sets": {"added": "Añadidos", "modified": "Modificados", "removed": "Eliminados"},
+    "untracked": "  Sin seguimiento : {} (ip no válida o repetida)",
+    "diff_state": "  Estado del diff : {}",
+    "output_saved": "  Resultado en    : {}",
+    "raw_feed": "  Feed sin filtrar: {}",
+    "countries": "  Países          : {}",
+    "ips_queried": "  IP consultadas  : {}",
+    "ranges_queried": "  Rangos consultados: {}",
+    "invalid_lines": "  Líneas no válidas: {}",
+    "ips_listed": "  IP en el feed   : {}",
+    "not_listed": "  IP fuera del feed: {}",
+    "records_saved": "  Registros guardados: {}",
+    "no_match": "\n  [!] Ningún registro coincide. Pruebe con otro país o modo de filtrado.",
+    "no_match_fan_out": "\n  [!] Ningún registro coincide. Pruebe con otros países o modo de filtrado.",
+    "no_match_lookup": "\n  [!] Ningún registro del feed coincide con el archivo de consulta.",
+    "metrics_columns": ("Etapa", "Real s", "CPU s", "Registros", "Reg/s", "MiB", "RSS máx. MiB"),
+    "metrics_total": "total",
+    # Errores
+    "api_errors": {
         401: (
             "Autenticación fallida. Verifique KASPERSKY_TIP_TOKEN en su archivo .env. "
             "Los tokens expiran tras 1 año — solicite uno nuevo en https://tip.kaspersky.com."
@@ -170,284 +233,12 @@ def manejar_error_api(respuesta):
         502: "Kaspersky TIP API temporalmente no disponible (502). Inténtelo en unos minutos.",
         503: "Kaspersky TIP API temporalmente no disponible (503). Inténtelo en unos minutos.",
         504: "Tiempo de espera en la puerta de enlace de Kaspersky TIP API (504). Inténtelo en unos minutos.",
-    }
-    msg = mensajes.get(estado, f"Error HTTP inesperado {estado} desde Kaspersky TIP API.")
-    print(f"Error: {msg}")
-    sys.exit(1)
-
-
-def resolver_redireccion_descarga(sesion, url_descarga):
-    try:
-        respuesta = sesion.get(url_descarga, timeout=(10, 300))
-        respuesta.raise_for_status()
-        return respuesta.json()
-    except requests.exceptions.HTTPError:
-        manejar_error_api(respuesta)
-    except requests.exceptions.SSLError as e:
-        print(f"Error: Verificación de certificado SSL fallida durante la descarga: {e}")
-        sys.exit(1)
-    except requests.exceptions.Timeout:
-        print("Error: Tiempo de espera agotado en la descarga. El archivo puede ser muy grande. Inténtelo de nuevo.")
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as e:
-        print(f"Error: No se pudo conectar a la URL de descarga: {e}")
-        sys.exit(1)
-
-
-def obtener_feed(sesion, url):
-    try:
-        respuesta = sesion.get(url, timeout=(10, 60))
-        respuesta.raise_for_status()
-    except requests.exceptions.HTTPError:
-        manejar_error_api(respuesta)
-    except requests.exceptions.SSLError as e:
-        print(f"Error: Verificación de certificado SSL fallida: {e}")
-        sys.exit(1)
-    except requests.exceptions.Timeout:
-        print("Error: Tiempo de espera agotado. Compruebe su conexión de red e inténtelo de nuevo.")
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as e:
-        print(f"Error: No se pudo conectar a Kaspersky TIP API: {e}")
-        sys.exit(1)
-
-    datos = respuesta.json()
-
-    if isinstance(datos, list):
-        return datos  # Opción A: la API devolvió los registros directamente
-
-    if isinstance(datos, dict):
-        # Opción B: la API devolvió un objeto con URL de descarga
-        for clave in ("download_url", "url", "link", "data_url"):
-            if clave in datos:
-                print("  Resolviendo enlace de descarga desde la respuesta de la API...")
-                return resolver_redireccion_descarga(sesion, datos[clave])
-        raise ValueError(
-            f"Formato de respuesta inesperado. Claves en la respuesta: {list(datos.keys())}"
-        )
-
-    raise ValueError(
-        f"Tipo de respuesta inesperado: {type(datos).__name__}. Se esperaba un array JSON."
-    )
-
-
-# ---------------------------------------------------------------------------
-# Validación del código de país y prompts interactivos
-# ---------------------------------------------------------------------------
-
-def validar_codigo_pais(codigo_pais):
-    if len(codigo_pais) != 2 or not codigo_pais.isalpha():
-        raise ValueError(
-            f"Código de país inválido: '{codigo_pais}'. "
-            "Debe ser un código de dos letras ISO 3166-1 alpha-2 (ej. ES, US, DE)."
-        )
-    if not pycountry.countries.get(alpha_2=codigo_pais.upper()):
-        raise ValueError(
-            f"El código '{codigo_pais}' no es un código ISO 3166-1 alpha-2 válido."
-        )
-
-
-def normalizar_codigo_pais(codigo_pais):
-    return codigo_pais.upper()
-
-
-def solicitar_pais_si_falta(pais):
-    if pais:
-        return pais
-    while True:
-        codigo = input("Introduzca el código de país (ISO 3166-1 alpha-2, ej. ES): ").strip()
-        try:
-            validar_codigo_pais(codigo)
-            return codigo
-        except ValueError as e:
-            print(f"  {e}")
-
-
-def solicitar_modo_si_falta(modo):
-    if modo:
-        return modo
-    while True:
-        valor = input(
-            "Seleccione el modo de filtrado [geo / admin / combined] (pulse Intro para combined): "
-        ).strip().lower()
-        if not valor:
-            return "combined"
-        if valor in ("geo", "admin", "combined"):
-            return valor
-        print("  Modo no válido. Elija entre: geo, admin, combined.")
-
-
-# ---------------------------------------------------------------------------
-# Carga de archivo local (modo alternativo / compatibilidad hacia atrás)
-# ---------------------------------------------------------------------------
-
-def cargar_archivo_entrada(archivo_entrada):
-    if not os.path.exists(archivo_entrada):
-        raise FileNotFoundError(f"Archivo de entrada no encontrado: {archivo_entrada}")
-    try:
-        with open(archivo_entrada, "r", encoding="utf-8") as f:
-            datos = json.load(f)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Formato JSON inválido en el archivo de entrada: {e}")
-    except PermissionError as e:
-        raise PermissionError(f"Permiso denegado al leer: {archivo_entrada}. Detalles: {e}")
-    if not datos:
-        raise ValueError("El archivo de entrada está vacío o no contiene registros.")
-    return datos
-
-
-# ---------------------------------------------------------------------------
-# Filtrado (lógica idéntica a filtrado_pais_avanzado.py)
-# ---------------------------------------------------------------------------
-
-def filtrar_geo(datos, pais):
-    normalizado = pais.lower()
-    return [entrada for entrada in datos if entrada.get("ip_geo", "").lower() == normalizado]
-
-
-def filtrar_admin(datos, pais):
-    normalizado = pais.upper()
-    return [
-        entrada for entrada in datos
-        if entrada.get("ip_whois", {}).get("country", "").upper() == normalizado
-    ]
-
-
-def filtrar_combinado(datos, pais):
-    geo = pais.lower()
-    adm = pais.upper()
-    return [
-        entrada for entrada in datos
-        if entrada.get("ip_geo", "").lower() == geo
-        or entrada.get("ip_whois", {}).get("country", "").upper() == adm
-    ]
-
-
-def aplicar_filtro(datos, pais, modo):
-    if modo == "geo":
-        return filtrar_geo(datos, pais)
-    elif modo == "admin":
-        return filtrar_admin(datos, pais)
-    elif modo == "combined":
-        return filtrar_combinado(datos, pais)
-    raise ValueError(f"Modo de filtrado desconocido: '{modo}'. Use geo, admin o combined.")
-
-
-# ---------------------------------------------------------------------------
-# Salida
-# ---------------------------------------------------------------------------
-
-def asegurar_directorio_salida(archivo_salida):
-    directorio = os.path.dirname(archivo_salida)
-    if directorio and not os.path.exists(directorio):
-        try:
-            os.makedirs(directorio)
-        except PermissionError as e:
-            raise PermissionError(
-                f"Permiso denegado al crear el directorio: {directorio}. Detalles: {e}"
-            )
-
-
-def generar_nombre_archivo_salida(pais, modo):
-    marca_tiempo = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"feeds/{NOMBRE_FEED}_{pais}_{modo}_{marca_tiempo}.json"
-
-
-def generar_nombre_archivo_raw():
-    marca_tiempo = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"feeds/{NOMBRE_FEED}_raw_{marca_tiempo}.json"
-
-
-def guardar_archivo_salida(archivo_salida, datos):
-    try:
-        with open(archivo_salida, "w", encoding="utf-8") as f:
-            json.dump(datos, f, indent=4, ensure_ascii=False)
-    except PermissionError as e:
-        raise PermissionError(f"Permiso denegado al escribir en: {archivo_salida}. Detalles: {e}")
-
-
-def mostrar_resumen(origen, pais, modo, total, coincidencias, archivo_salida, archivo_raw=None):
-    objeto_pais = pycountry.countries.get(alpha_2=pais)
-    nombre_pais = objeto_pais.name if objeto_pais else pais
-    print("\n--- Resumen ---")
-    print(f"  Origen          : {origen}")
-    print(f"  País            : {pais} ({nombre_pais})")
-    print(f"  Modo de filtrado: {modo}")
-    print(f"  Registros totales: {total}")
-    print(f"  Coincidencias   : {coincidencias}")
-    print(f"  Filtrados       : {total - coincidencias}")
-    print(f"  Resultado en    : {archivo_salida}")
-    if archivo_raw:
-        print(f"  Feed sin filtrar: {archivo_raw}")
-    if coincidencias == 0:
-        print("\n  [!] Ningún registro coincide. Pruebe con otro país o modo de filtrado.")
-    print()
-
-
-# ---------------------------------------------------------------------------
-# Punto de entrada
-# ---------------------------------------------------------------------------
-
-def main():
-    mostrar_aviso()
-    args = parsear_argumentos()
-
-    try:
-        modo_local = bool(args.input_file)
-
-        # Modo API: cargar configuración y validar token antes de cualquier otra acción
-        if not modo_local:
-            config = cargar_configuracion()
-            validar_token_presente(config["token"])
-            # Aplicar sobreescrituras de la línea de comandos (solo endpoint y límite)
-            if args.feed_endpoint:
-                config["feed_endpoint"] = args.feed_endpoint
-            if args.limit is not None:
-                config["limit"] = args.limit
-
-        # Resolver país y modo de filtrado (desde argumentos CLI o prompts interactivos)
-        entrada_pais = solicitar_pais_si_falta(args.country)
-        validar_codigo_pais(entrada_pais)
-        pais = normalizar_codigo_pais(entrada_pais)
-        modo = solicitar_modo_si_falta(args.filter_mode)
-
-        # Obtener o cargar datos
-        archivo_raw = None
-        if modo_local:
-            print(f"Cargando archivo local: {args.input_file}")
-            datos = cargar_archivo_entrada(args.input_file)
-            origen = f"Archivo local: {args.input_file}"
-        else:
-            url = construir_url_feed(config["base_url"], config["feed_endpoint"], config["limit"])
-            print("Descargando feed desde Kaspersky TIP API...")
-            sesion = crear_sesion_api(config["token"])
-            datos = obtener_feed(sesion, url)
-            origen = f"Endpoint API: {config['feed_endpoint']}"
-            print(f"  Descargados {len(datos)} registros.")
-
-            if args.save_raw:
-                archivo_raw = generar_nombre_archivo_raw()
-                asegurar_directorio_salida(archivo_raw)
-                guardar_archivo_salida(archivo_raw, datos)
-                print(f"  Feed sin filtrar guardado en: {archivo_raw}")
-
-        # Filtrar
-        print(f"Filtrando por país '{pais}' con modo '{modo}'...")
-        filtrados = aplicar_filtro(datos, pais, modo)
-
-        # Guardar resultado
-        archivo_salida = args.output_file or generar_nombre_archivo_salida(pais, modo)
-        asegurar_directorio_salida(archivo_salida)
-        guardar_archivo_salida(archivo_salida, filtrados)
-
-        mostrar_resumen(origen, pais, modo, len(datos), len(filtrados), archivo_salida, archivo_raw)
-
-    except (FileNotFoundError, PermissionError, ValueError) as e:
-        print(f"Error: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Se produjo un error inesperado: {e}")
-        sys.exit(1)
+    },
+    "api_error_status": "Error HTTP inesperado {} desde Kaspersky TIP API.",
+    "error": "Error: {}",
+    "unexpected_error": "Se produjo un error inesperado: {}",
+}
 
 
 if __name__ == "__main__":
-    main()
+    main(TEXTO)
@@ -0,0 +1,111 @@
+# Test setup: the feed_* modules live next to the scripts rather than in a
+# package, so make scripts/Python importable from the tests. Also holds the
+# fixtures shared by the test modules: synthetic feed records, feed files
+# and a stand-in for the requests session of the API client.
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def make_records():
+    """
+    Factory for `count` feed records with distinct IPs and threat_score == id:
+    every third one is located in ES (ip_geo), the rest in US, and all are
+    registered in FR (ip_whois.country).
+    """
+    def make(count):
+        return [
+            {
+                "id": i,
+                "ip": f"10.0.{i // 256}.{i % 256}",
+                "ip_geo": "es" if i % 3 == 0 else "us",
+                "threat_score": i,
+                # strings and nested objects that look like record boundaries
+                "ip_whois": {"descr": "net, {block}", "country": "FR"},
+                "category": "botnet_cnc",
+            }
+            for i in range(count)
+        ]
+
+    return make
+
+
+@pytest.fixture
+def write_feed(tmp_path):
+    """
+    Factory writing records to tmp_path/name, as one record per line for a
+    .ndjson name and as a JSON array (indented by `indent`) otherwise.
+    Returns the path as a string.
+    """
+    def write(records, name="feed.json", indent=None):
+        path = tmp_path / name
+        if name.endswith(".ndjson"):
+            path.write_text("".join(json.dumps(r) + "\n" for r in records))
+        else:
+            path.write_text(json.dumps(records, indent=indent))
+        return str(path)
+
+    return write
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.body)
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """
+    Serve queued results for GET requests: a FakeResponse, or an exception
+    raised as requests would when the connection drops. Requested URLs and
+    headers are kept in .requests.
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.requests = []
+
+    @property
+    def urls(self):
+        return [url for url, _ in self.requests]
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def fake_response():
+    """
+    Factory for an API response with a JSON `body` (records are dumped).
+    """
+    def make(body, status_code=200, headers=None):
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        return FakeResponse(body, status_code, headers)
+
+    return make
+
+
+@pytest.fixture
+def fake_session():
+    """
+    Factory for a session answering GETs with the given responses in order.
+    """
+    return FakeSession
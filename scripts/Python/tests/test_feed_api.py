@@ -0,0 +1,45 @@
+import pytest
+import requests
+
+from feed_api import iter_feed_pages
+from feed_retry import RetryScheduler
+
+
+def no_wait():
+    return RetryScheduler(max_retries=2, base_delay=0, sleep=lambda delay: None)
+
+
+@pytest.mark.parametrize("drop", [
+    requests.exceptions.ChunkedEncodingError("dropped"),
+    requests.exceptions.ContentDecodingError("dropped"),
+    '[{"id": 2}, {"id"',  # body cut off mid-record
+])
+def test_dropped_page_body_is_fetched_again(fake_session, fake_response, drop):
+    if isinstance(drop, str):
+        drop = fake_response(drop)
+    session = fake_session(
+        fake_response([{"id": 0}, {"id": 1}]), drop, fake_response([{"id": 2}, {"id": 3}]), fake_response([])
+    )
+    retry = no_wait()
+    records = list(iter_feed_pages(session, "https://tip.example/api/feed", 2, retry=retry))
+    assert [r["id"] for r in records] == [0, 1, 2, 3]
+    assert session.urls[1] == session.urls[2]  # the dropped page, requested again
+    assert retry.retries == 1
+
+
+def test_offset_paging_stops_when_the_endpoint_ignores_offset(fake_session, fake_response):
+    same = [{"id": 0}, {"id": 1}]
+    session = fake_session(fake_response(same), fake_response(same), fake_response(same))
+    records = iter_feed_pages(session, "https://tip.example/api/feed", 2, retry=no_wait())
+    with pytest.raises(ValueError, match="ignores"):
+        list(records)
+    assert len(session.urls) == 2
+
+
+def test_offset_paging_walks_until_a_short_page(fake_session, fake_response):
+    session = fake_session(
+        fake_response([{"id": 0}, {"id": 1}]), fake_response([{"id": 2}, {"id": 3}]), fake_response([{"id": 4}])
+    )
+    records = list(iter_feed_pages(session, "https://tip.example/api/feed", 2, retry=no_wait()))
+    assert [r["id"] for r in records] == [0, 1, 2, 3, 4]
+    assert session.urls[1].endswith("limit=2&offset=2")
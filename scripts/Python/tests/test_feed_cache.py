@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+from feed_api import fetch_feed
+from feed_cache import FeedCache
+
+URL = "https://tip.example/api/feed"
+VALIDATORS = {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def cache_feed(cache_dir, records):
+    body = json.dumps(records).encode()
+    chunks = FeedCache(URL, cache_dir).store([body[:10], body[10:]], api=VALIDATORS, download=None)
+    assert b"".join(chunks) == body  # passed through unchanged
+
+
+def test_stored_feed_is_revalidated_on_the_next_run(tmp_path, make_records):
+    records = make_records(3)
+    cache_feed(str(tmp_path), records)
+    cache = FeedCache(URL, str(tmp_path))
+    assert cache.conditional_headers("api") == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert cache.conditional_headers("download") == {}
+    assert list(cache.iter_records()) == records
+
+
+def test_not_modified_reuses_the_cached_feed(tmp_path, make_records, fake_session, fake_response):
+    records = make_records(3)
+    cache_feed(str(tmp_path), records)
+    session = fake_session(fake_response("", 304))
+    assert list(fetch_feed(session, URL, FeedCache(URL, str(tmp_path)))) == records
+    assert session.requests[0][1]["If-None-Match"] == '"v1"'
+
+
+def test_interrupted_download_keeps_the_previous_copy(tmp_path, make_records):
+    records = make_records(3)
+    cache_feed(str(tmp_path), records)
+
+    def dropped():
+        yield b'[{"id": 7'
+        raise ConnectionError("dropped")
+
+    with pytest.raises(ConnectionError):
+        list(FeedCache(URL, str(tmp_path)).store(dropped(), api={"etag": '"v2"'}, download=None))
+    cache = FeedCache(URL, str(tmp_path))
+    assert cache.conditional_headers("api")["If-None-Match"] == '"v1"'
+    assert list(cache.iter_records()) == records
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_no_conditional_request_without_a_cached_body(tmp_path, make_records):
+    cache_feed(str(tmp_path), make_records(3))
+    os.remove(FeedCache(URL, str(tmp_path)).body_path)
+    assert FeedCache(URL, str(tmp_path)).conditional_headers("api") == {}
+    assert FeedCache("https://tip.example/api/other", str(tmp_path)).conditional_headers("api") == {}
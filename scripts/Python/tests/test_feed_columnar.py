@@ -0,0 +1,38 @@
+import pytest
+
+from feed_filter import compile_filter
+
+np = pytest.importorskip("numpy")
+from feed_columnar import load_columnar_feed  # noqa: E402
+
+SCORES = [(-1, 0), (200, 1), (None, 2), ("90", 3), (True, 300), (50, -5), (1000, 40000), (-40000, 7)]
+
+
+def scored_records(scores):
+    return [
+        {"ip": f"10.0.0.{i}", "ip_geo": "es", "threat_score": score, "popularity": popularity}
+        for i, (score, popularity) in enumerate(scores)
+    ]
+
+
+@pytest.mark.parametrize("where", [
+    "threat_score >= 100",
+    "threat_score < 0",
+    "threat_score == -1",
+    "threat_score == 1",
+    "threat_score != 50",
+    "not threat_score > 10",
+    "popularity > 5",
+    "popularity <= 1",
+])
+def test_columnar_and_streaming_select_the_same_records(write_feed, where):
+    records = scored_records(SCORES)
+    feed = load_columnar_feed(write_feed(records, indent=4))
+    record_filter = compile_filter(where=where)
+    assert list(feed.iter_records(record_filter.mask(feed))) == list(record_filter.filter(records))
+
+
+def test_scores_are_stored_as_int16_when_they_fit(write_feed):
+    feed = load_columnar_feed(write_feed(scored_records([(-1, 0), (100, None), (None, 5)]), indent=4))
+    assert feed.columns["threat_score"].dtype == np.int16
+    assert list(feed.iter_records(compile_filter(where="threat_score == -1").mask(feed)))
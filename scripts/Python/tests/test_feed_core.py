@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from feed_core import filter_file, select_country, select_engine
+from feed_filter import compile_filter
+from feed_index import build_country_index
+
+
+def geo_es(records):
+    return [r for r in records if r["ip_geo"] == "es"]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_select_country_engines_agree(make_records, write_feed, workers):
+    records = make_records(90)
+    path = write_feed(records)
+    matched, counter = select_country(path, "ES", "geo", workers)
+    assert list(matched) == geo_es(records)
+    assert counter.count == 90
+
+
+def test_select_engine_prefers_a_fresh_index(make_records, write_feed):
+    records = make_records(30)
+    path = write_feed(records)
+    assert select_engine(path, "ES", "geo") is None
+    build_country_index(path)
+    matched, index = select_engine(path, "ES", "geo")
+    assert list(matched) == geo_es(records)
+    assert index.count == 30
+    assert select_engine(path, "ES", "geo", use_index=False) is None
+
+
+def test_select_engine_workers_apply_the_record_filter(make_records, write_feed):
+    records = make_records(60)
+    path = write_feed(records)
+    record_filter = compile_filter(country="ES", mode="geo", where="threat_score >= 30")
+    matched, parallel = select_engine(path, "ES", "geo", workers=2, record_filter=record_filter)
+    assert list(matched) == [r for r in geo_es(records) if r["threat_score"] >= 30]
+    assert parallel.count == 60
+
+
+def test_select_engine_rejects_bad_input(tmp_path, write_feed):
+    with pytest.raises(ValueError, match="--workers"):
+        select_engine(write_feed([]), "ES", workers=0)
+    with pytest.raises(FileNotFoundError):
+        select_engine(str(tmp_path / "missing.json"), "ES")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_empty_feed(tmp_path, write_feed, workers):
+    path = write_feed([])
+    output = tmp_path / "out.json"
+    with pytest.raises(ValueError, match="empty"):
+        filter_file(path, str(output), "ES", workers=workers)
+    assert filter_file(path, str(output), "ES", workers=workers, allow_empty=True) == (0, 0)
+    assert json.loads(output.read_text()) == []
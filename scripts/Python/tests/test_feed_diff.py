@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from feed_diff import diff_output_paths, load_state, record_hash, save_state, write_diff
+from feed_lookup import ip_to_int
+
+
+def test_state_round_trip(tmp_path):
+    hashes = {
+        ip_to_int("10.0.0.1"): 1,
+        ip_to_int("2001:db8::1"): (1 << 64) - 1,  # 128-bit key, full 64-bit hash
+        ip_to_int("192.0.2.7"): record_hash({"ip": "192.0.2.7"}),
+    }
+    path = str(tmp_path / "state" / "ES_combined.state")
+    save_state(path, hashes, "ES_combined")
+    state = load_state(path)
+    assert state.count == 3
+    assert {key: state.find(key) for key in hashes} == {key: [value] for key, value in hashes.items()}
+
+
+def test_missing_state_is_a_first_run_and_a_corrupt_one_is_an_error(tmp_path):
+    assert load_state(str(tmp_path / "missing.state")) is None
+    path = tmp_path / "broken.state"
+    path.write_bytes(b'{"version": 1, "byteorder": "little", "count": 5}\n\x00\x01')
+    with pytest.raises(ValueError, match="delete it"):
+        load_state(str(path))
+
+
+def test_record_hash_ignores_key_order():
+    assert record_hash({"ip": "10.0.0.1", "threat_score": 90}) == record_hash({"threat_score": 90, "ip": "10.0.0.1"})
+    assert record_hash({"ip": "10.0.0.1", "threat_score": 90}) != record_hash({"ip": "10.0.0.1", "threat_score": 91})
+
+
+def read_sets(paths):
+    return {name: json.loads(open(path).read()) for name, path in paths.items()}
+
+
+def test_second_run_writes_only_the_changes(tmp_path, make_records):
+    records = make_records(5)
+    output = str(tmp_path / "out.json")
+    state = str(tmp_path / "out.state")
+
+    paths, counts = write_diff(records, output, state)
+    assert read_sets(paths) == {"added": records, "modified": [], "removed": []}
+    assert counts["added"] == 5
+
+    changed = dict(records[1], threat_score=99)
+    new = dict(records[0], id=5, ip="10.0.0.5")
+    paths, counts = write_diff([records[0], changed, records[3], records[4], new, {"id": 6}], output, state)
+    assert read_sets(paths) == {"added": [new], "modified": [changed], "removed": [{"ip": "10.0.0.2"}]}
+    assert counts == {"added": 1, "modified": 1, "removed": 1, "unchanged": 3, "skipped": 1}
+
+
+@pytest.mark.parametrize("output, added", [
+    ("feeds/ES.json", "feeds/ES_added.json"),
+    ("feeds/ES.cidr.txt.gz", "feeds/ES_added.cidr.txt.gz"),
+    ("feeds/ES.list", "feeds/ES_added.list"),
+])
+def test_diff_output_paths_keep_the_full_extension(output, added):
+    assert diff_output_paths(output)["added"] == added
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from feed_fetch import ConcurrentStreams
+
+
+def numbered(label, count):
+    return lambda: ({"feed": label, "n": i} for i in range(count))
+
+
+def test_streams_are_merged_in_order_within_each_source():
+    sources = {"a": numbered("a", 2500), "b": numbered("b", 10), "c": numbered("c", 0)}
+    streams = ConcurrentStreams(sources, batch_size=100)
+    records = list(streams)
+    assert [r["n"] for r in records if r["feed"] == "a"] == list(range(2500))
+    assert [r["n"] for r in records if r["feed"] == "b"] == list(range(10))
+    assert streams.counts == {"a": 2500, "b": 10, "c": 0}
+    assert streams.count == 2510
+
+
+def test_a_failing_source_fails_the_stream():
+    def broken():
+        yield {"n": 0}
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError, match="bad page"):
+        list(ConcurrentStreams({"ok": numbered("ok", 5), "broken": broken}))
+
+
+def test_sources_stop_when_the_consumer_does():
+    produced = []
+    stopped = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                produced.append(None)
+                yield {"n": len(produced)}
+        finally:
+            stopped.set()
+
+    streams = iter(ConcurrentStreams({"endless": endless}, batch_size=10, queue_batches=2))
+    assert next(streams) == {"n": 1}
+    streams.close()
+    assert stopped.wait(5)
+    assert len(produced) < 100
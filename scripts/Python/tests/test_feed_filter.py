@@ -0,0 +1,91 @@
+import pytest
+
+from feed_filter import compile_filter, parse_filter, within_clause
+from feed_time import parse_feed_time
+
+RECORDS = [
+    {"ip": "1.0.0.1", "ip_geo": "es", "threat_score": 90, "category": "Botnet_CnC",
+     "last_seen": "01.06.2024 10:00", "users_geo": "fr, de"},
+    {"ip": "1.0.0.2", "ip_geo": "us", "threat_score": 60, "category": "phishing",
+     "last_seen": "01.01.2023 00:00", "ip_whois": {"country": "ES"}},
+    {"ip": "1.0.0.3", "ip_geo": "de", "threat_score": 85, "category": "malware"},
+    {"ip": "1.0.0.4", "ip_geo": "fr", "popularity": 3, "category": "botnet_cnc",
+     "users_geo": "es"},
+]
+
+
+def selected(where=None, **kwargs):
+    return [r["ip"][-1] for r in compile_filter(where, **kwargs).filter(RECORDS)]
+
+
+def test_and_binds_tighter_than_or():
+    tree = parse_filter("geo == ES or geo == US and threat_score > 70")
+    assert tree[0] == "or"
+    assert tree[2][0] == "and"
+    assert selected("geo == ES or geo == US and threat_score > 70") == ["1"]
+    assert selected("(geo == ES or geo == US) and threat_score > 70") == ["1"]
+    assert selected("(geo == ES or geo == US) and threat_score > 50") == ["1", "2"]
+
+
+def test_comparison_operators_and_missing_numbers():
+    assert selected("threat_score >= 85") == ["1", "3"]
+    assert selected("threat_score = 60") == ["2"]
+    assert selected("threat_score != 60") == ["1", "3"]  # missing never matches
+    assert selected("not threat_score != 60") == ["2", "4"]
+    assert selected("popularity < 5") == ["4"]
+
+
+def test_sets_are_case_insensitive_and_quoted_values_work():
+    assert selected("category in (botnet_cnc, 'phishing')") == ["1", "2", "4"]
+    assert selected('category == "BOTNET_CNC"') == ["1", "4"]
+    assert selected("category not in (botnet_cnc)") == ["2", "3"]
+    assert selected("geo in (es, de)") == ["1", "3"]
+
+
+def test_country_fields():
+    assert selected("admin == ES") == ["2"]
+    assert selected("country == ES") == ["1", "2"]
+    assert selected("victims in (ES, DE)") == ["1", "4"]
+    assert selected(country="ES", mode="combined+victims") == ["1", "2", "4"]
+    assert selected(country="es", mode="geo") == ["1"]
+
+
+def test_time_comparisons_and_windows():
+    assert selected("last_seen >= 2024-01-01") == ["1"]
+    assert selected("last_seen < 2024-01-01") == ["2"]  # missing never matches
+    since = parse_feed_time("01.01.2024 00:00")
+    assert selected(since=since) == ["1"]
+    assert selected(until=since) == ["2"]
+    now = parse_feed_time("02.06.2024 10:00")
+    assert within_clause("last_seen", "7d", now=now) == ("cmp", "last_seen", ">=", now - 7 * 86400)
+
+
+def test_where_combines_with_country():
+    assert selected("threat_score > 70", country="ES", mode="combined") == ["1"]
+    assert compile_filter().tree == ("all",)
+    assert selected() == ["1", "2", "3", "4"]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "severity > 5",
+    "threat_score > high",
+    "category > botnet",
+    "geo in (ESP)",
+    "threat_score in (1, 2)",
+    "threat_score within 30d",
+    "(geo == ES",
+    "geo == ES)",
+    "geo == ES and",
+    "geo == ES geo == US",
+    "threat_score not > 5",
+    "geo == ES && geo == US",
+])
+def test_invalid_expressions_raise_value_error(text):
+    with pytest.raises(ValueError):
+        parse_filter(text)
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        compile_filter(country="ES", mode="everything")
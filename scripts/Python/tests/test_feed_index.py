@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from feed_index import build_country_index, index_path_for, load_country_index
+
+
+@pytest.fixture
+def feed(make_records, write_feed):
+    records = make_records(30)
+    records[1]["users_geo"] = "es, pt"
+    return records, write_feed(records, indent=4)
+
+
+def test_index_reads_only_the_matching_records(feed):
+    records, path = feed
+    assert load_country_index(path) is None
+    assert build_country_index(path) == index_path_for(path)
+    index = load_country_index(path)
+    assert index.count == 30
+    assert index.countries("geo") == ["ES", "US"]
+    assert list(index.iter_records("es", "geo")) == [r for r in records if r["ip_geo"] == "es"]
+    assert list(index.iter_records("ES", "victims")) == [records[1]]
+    assert list(index.iter_records("ES", "geo+victims")) == [r for r in records if r["id"] % 3 == 0 or r["id"] == 1]
+    assert list(index.iter_records("FR", "admin")) == records
+    assert list(index.iter_records("DE", "combined")) == []
+
+
+def test_index_is_ignored_once_the_feed_changes(feed, write_feed):
+    records, path = feed
+    build_country_index(path)
+    write_feed(records[:10], indent=4)
+    assert load_country_index(path) is None
+
+
+def test_unreadable_index_is_ignored(feed):
+    _, path = feed
+    with open(index_path_for(path), "wb") as f:
+        f.write(b"\x00not a header\n")
+    assert load_country_index(path) is None
+
+
+def test_compressed_feeds_cannot_be_indexed(tmp_path):
+    path = str(tmp_path / "feed.json.gz")
+    with pytest.raises(ValueError, match="uncompressed"):
+        build_country_index(path)
+    assert not os.path.exists(index_path_for(path))
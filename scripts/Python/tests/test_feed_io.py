@@ -0,0 +1,108 @@
+import gzip
+import json
+
+import pytest
+
+from feed_io import iter_file_records, iter_json_records, iter_json_spans
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+RECORDS = [{"ip": "1.1.1.1", "ip_geo": "es"}, {"ip": "2.2.2.2", "ip_geo": "us"}, {"ip": "3.3.3.3"}]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_array_across_chunk_sizes(size):
+    text = json.dumps(RECORDS, indent=4)
+    assert list(iter_json_records(chunked(text, size))) == RECORDS
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_ndjson_across_chunk_sizes(size):
+    text = "".join(json.dumps(r) + "\n" for r in RECORDS)
+    assert list(iter_json_records(chunked(text, size))) == RECORDS
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4])
+def test_number_split_across_chunks_is_read_whole(size):
+    assert list(iter_json_records(chunked("123 456", size))) == [123, 456]
+    assert list(iter_json_records(chunked("[12, 3.5e2, -7]", size))) == [12, 350.0, -7]
+
+
+def test_spans_are_absolute_positions():
+    text = '  [ {"a": 1},\n{"b": [2, 3]} ]'
+    spans = list(iter_json_spans(chunked(text, 4)))
+    assert [text[start:end] for start, end, _ in spans] == ['{"a": 1}', '{"b": [2, 3]}']
+    assert [record for _, _, record in spans] == [{"a": 1}, {"b": [2, 3]}]
+
+
+def test_offset_shifts_positions():
+    spans = list(iter_json_spans(['[{"a": 1}]'], offset=10))
+    assert spans[0][:2] == (11, 19)
+
+
+@pytest.mark.parametrize("text", ["[]", "  [ ]  ", "", "   \n"])
+def test_empty_inputs(text):
+    assert list(iter_json_records([text])) == []
+
+
+@pytest.mark.parametrize("text", [
+    "[1,,2]",
+    "[,1]",
+    "[1,]",
+    "[1 2]",
+    "[1, 2",
+    "[1]x",
+    '{"a": 1},{"b": 2}',
+    "1 ]",
+    '[{"a": tru}]',
+])
+def test_malformed_input_raises(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records(chunked(text, 2)))
+
+
+def iter_json_records_slice(text):
+    return (record for _, _, record in iter_json_spans(chunked(text, 3), array_slice=True))
+
+
+def test_array_slice_allows_one_trailing_comma():
+    text = '{"a": 1},\n  {"b": 2},\n  '
+    assert list(iter_json_records_slice(text)) == [{"a": 1}, {"b": 2}]
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records_slice('{"a": 1},,'))
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records_slice('{"a": 1} {"b": 2}'))
+
+
+def test_malformed_record_fails_without_reading_the_rest():
+    consumed = []
+
+    def chunks():
+        yield '[{"ip": "1.1.1.1"}, {"ip": broken}, '
+        for i in range(1000):
+            consumed.append(i)
+            yield '{"ip": "2.2.2.2", "pad": "' + "x" * 100 + '"}, '
+        yield "]"
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_spans(chunks(), max_record_size=1024))
+    assert len(consumed) < 20
+
+
+def test_record_within_limit_spanning_chunks():
+    record = {"pad": "x" * 5000}
+    text = json.dumps([record, record])
+    assert list(iter_json_spans(chunked(text, 100), max_record_size=6000))[1][2] == record
+
+
+def test_file_records_gzip_and_bom(tmp_path):
+    plain = tmp_path / "feed.json"
+    plain.write_bytes(b"\xef\xbb\xbf" + json.dumps(RECORDS).encode())
+    assert list(iter_file_records(str(plain))) == RECORDS
+    packed = tmp_path / "feed.ndjson.gz"
+    with gzip.open(packed, "wt") as f:
+        f.writelines(json.dumps(r) + "\n" for r in RECORDS)
+    assert list(iter_file_records(str(packed))) == RECORDS
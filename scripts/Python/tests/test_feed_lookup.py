@@ -0,0 +1,53 @@
+import pytest
+
+import feed_lookup
+from feed_lookup import IpIndex, int_to_ip, ip_to_int
+
+IPS = ["10.0.0.1", "10.0.0.1", "192.0.2.7", "2001:db8::1", "::ffff:198.51.100.9", "not an ip"]
+
+
+@pytest.mark.parametrize("ip, back", [
+    ("10.0.0.1", "10.0.0.1"),
+    ("2001:db8::1", "2001:db8::1"),
+    ("::ffff:198.51.100.9", "198.51.100.9"),  # IPv4-mapped IPv6 is the same key as the IPv4 address
+])
+def test_ip_keys_round_trip(ip, back):
+    assert int_to_ip(ip_to_int(ip)) == back
+
+
+@pytest.mark.parametrize("value", ["", "10.0.0.256", "10.0.0", "host.example", None])
+def test_invalid_addresses_have_no_key(value):
+    assert ip_to_int(value) is None
+
+
+def build_index():
+    return IpIndex((ip_to_int(ip), position) for position, ip in enumerate(IPS))
+
+
+def test_find_keeps_every_position_of_a_repeated_ip():
+    index = build_index()
+    assert index.count == 5  # the invalid address is not indexed
+    assert index.find(ip_to_int("10.0.0.1")) == [0, 1]
+    assert index.find(ip_to_int("198.51.100.9")) == [4]
+    assert index.find(ip_to_int("10.0.0.2")) == []
+    assert ip_to_int("2001:db8::1") in index
+    assert ip_to_int("2001:db8::2") not in index
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_find_many_with_and_without_numpy(monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(feed_lookup, "_numpy", lambda: None)
+    queries = sorted(ip_to_int(ip) for ip in ["10.0.0.1", "10.0.0.9", "192.0.2.7", "2001:db8::1", "2001:db8::9"])
+    found = {int_to_ip(key): positions for key, positions in build_index().find_many(queries)}
+    assert found == {"10.0.0.1": [0, 1], "192.0.2.7": [2], "2001:db8::1": [3]}
+
+
+def test_find_range_spans_both_address_families():
+    index = build_index()
+    v4 = [position for _, position in index.find_range(ip_to_int("10.0.0.0"), ip_to_int("192.0.2.255"))]
+    assert v4 == [0, 1, 2]
+    everything = [position for _, position in index.find_range(0, (1 << 128) - 1)]
+    assert everything == [0, 1, 2, 4, 3]  # key order: IPv4 (mapped) keys sort before IPv6 ones
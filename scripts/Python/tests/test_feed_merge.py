@@ -0,0 +1,50 @@
+import pytest
+
+from feed_merge import FeedMerger
+
+
+def overlapping_records():
+    records = []
+    for i in range(200):
+        if i % 5 == 0:
+            records.append({"id": i})  # no IP: kept as it is, in input order
+        else:
+            records.append({"id": i, "ip": f"10.0.0.{i % 40}", "threat_score": i % 17})
+    return records
+
+
+def merge(records, max_records, resolution="max_threat_score"):
+    merger = FeedMerger(resolution, max_records)
+    for entry in records:
+        merger.add(entry)
+    return merger, list(merger.results())
+
+
+@pytest.mark.parametrize("resolution", ["max_threat_score", "latest_last_seen", "first", "last"])
+def test_spilling_does_not_change_the_result(resolution):
+    records = overlapping_records()
+    _, in_memory = merge(records, 10_000, resolution)
+    merger, spilled = merge(records, 7, resolution)
+    assert merger.spills > 1
+    assert spilled == in_memory
+
+
+def test_records_without_ip_are_spilled_in_order():
+    records = [{"id": i} for i in range(50)]
+    merger = FeedMerger(max_records=4)
+    for entry in records:
+        merger.add(entry)
+        assert len(merger._unkeyed) <= 4
+    assert merger.unkeyed == 50
+    assert list(merger.results()) == records
+
+
+def test_keeps_highest_threat_score_per_ip():
+    records = [
+        {"ip": "10.0.0.1", "threat_score": 50, "id": 1},
+        {"ip": "10.0.0.1", "threat_score": 90, "id": 2},
+        {"ip": "10.0.0.1", "threat_score": 90, "id": 3},
+        {"ip": "10.0.0.2", "threat_score": 10, "id": 4},
+    ]
+    _, merged = merge(records, 1)
+    assert [r["id"] for r in merged] == [3, 4]  # ties go to the later record
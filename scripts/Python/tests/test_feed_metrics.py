@@ -0,0 +1,53 @@
+import json
+import time
+
+import pytest
+
+from feed_metrics import PipelineMetrics, format_prometheus, write_metrics_file
+
+
+def slow_records(count, delay):
+    for i in range(count):
+        time.sleep(delay)
+        yield {"id": i}
+
+
+def run_pipeline():
+    metrics = PipelineMetrics()
+    with metrics.stage("api"):
+        pass
+    parsed = metrics.timed("parse", slow_records(3, 0.02))
+    matched = metrics.timed("filter", (r for r in parsed if r["id"] != 1))
+    written = list(metrics.timed("write", matched))
+    metrics.add_bytes("write", 42)
+    return written, metrics.finish()
+
+
+def test_nested_stages_are_charged_only_their_own_time():
+    written, metrics = run_pipeline()
+    stages = metrics["stages"]
+    assert [r["id"] for r in written] == [0, 2]
+    assert [stages[name]["records"] for name in ("parse", "filter", "write")] == [3, 2, 2]
+    assert stages["write"]["bytes"] == 42
+    assert stages["parse"]["wall_s"] >= 0.06
+    assert stages["filter"]["wall_s"] < 0.03 and stages["write"]["wall_s"] < 0.03
+    assert metrics["wall_s"] >= stages["parse"]["wall_s"]
+
+
+def test_prometheus_series_carry_the_run_labels():
+    _, metrics = run_pipeline()
+    metrics["counts"] = {"matched": 2}
+    text = format_prometheus(metrics, {"country": "ES"})
+    assert '# TYPE kaspersky_tdf_stage_records gauge' in text
+    assert 'kaspersky_tdf_stage_records{country="ES",stage="parse"} 3' in text
+    assert 'kaspersky_tdf_matched{country="ES"} 2' in text
+    assert text.endswith("\n")
+
+
+def test_metrics_files(tmp_path):
+    _, metrics = run_pipeline()
+    path = str(tmp_path / "metrics" / "run.json")
+    write_metrics_file(path, metrics, labels={"mode": "geo"})
+    assert json.loads(open(path).read())["labels"] == {"mode": "geo"}
+    with pytest.raises(ValueError, match="Unknown metrics format"):
+        write_metrics_file(path, metrics, "xml")
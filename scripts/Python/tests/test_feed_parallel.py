@@ -0,0 +1,70 @@
+import pytest
+
+from feed_filter import compile_filter, filter_records
+from feed_io import iter_json_spans, iter_text_chunks
+from feed_parallel import ParallelFilter, _read_range, split_record_ranges
+
+
+def parse_ranges(path, in_array, ranges):
+    records = []
+    for start, end in ranges:
+        chunks = iter_text_chunks(_read_range(path, start, end))
+        records.extend(r for _, _, r in iter_json_spans(chunks, in_array=False, array_slice=in_array))
+    return records
+
+
+@pytest.mark.parametrize("indent", [None, 0, 4])
+@pytest.mark.parametrize("parts", [1, 2, 7, 64])
+def test_array_ranges_cover_every_record_once(make_records, write_feed, indent, parts):
+    records = make_records(300)
+    path = write_feed(records, indent=indent)
+    in_array, ranges = split_record_ranges(path, parts)
+    assert in_array
+    assert 1 <= len(ranges) <= parts
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))  # contiguous
+    data = open(path, "rb").read()
+    assert all(data[start:start + 1] == b"{" for start, _ in ranges[1:])
+    assert parse_ranges(path, in_array, ranges) == records
+
+
+@pytest.mark.parametrize("parts", [1, 3, 50])
+def test_ndjson_ranges_start_on_lines(make_records, write_feed, parts):
+    records = make_records(200)
+    path = write_feed(records, "feed.ndjson")
+    in_array, ranges = split_record_ranges(path, parts)
+    assert not in_array
+    data = open(path, "rb").read()
+    assert all(data[start - 1:start] == b"\n" for start, _ in ranges[1:])
+    assert parse_ranges(path, in_array, ranges) == records
+
+
+def test_more_parts_than_records(make_records, write_feed):
+    records = make_records(2)
+    path = write_feed(records, indent=4)
+    in_array, ranges = split_record_ranges(path, 16)
+    assert len(ranges) <= 2
+    assert parse_ranges(path, in_array, ranges) == records
+
+
+def test_compressed_input_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        split_record_ranges(str(tmp_path / "feed.json.gz"), 2)
+
+
+@pytest.mark.parametrize("layout", ["json", "ndjson"])
+def test_parallel_filter_matches_streaming(make_records, write_feed, layout):
+    records = make_records(500)
+    path = write_feed(records, f"feed.{layout}", indent=4)
+    record_filter = compile_filter(country="ES", mode="geo")
+    parallel = ParallelFilter(path, 3, filter_records, record_filter.tree)
+    assert list(parallel) == list(record_filter.filter(records))
+    assert parallel.count == len(records)
+
+
+@pytest.mark.parametrize("text", ["", "   \n", "[]", "[\n  ]\n", "\n\n"])
+def test_parallel_filter_rejects_empty_feeds(tmp_path, text):
+    path = tmp_path / "feed.json"
+    path.write_text(text)
+    tree = compile_filter(country="ES").tree
+    with pytest.raises(ValueError, match="empty"):
+        ParallelFilter(str(path), 2, filter_records, tree)
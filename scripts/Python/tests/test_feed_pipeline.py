@@ -0,0 +1,56 @@
+import pytest
+
+from feed_pipeline import FeedPipeline
+
+
+@pytest.fixture
+def records(make_records):
+    records = make_records(12)
+    records[4]["ip_whois"] = {"country": "ES", "net_range": "10.0.0.0 - 10.0.0.127"}
+    records[5]["ip"] = "2001:db8::5"
+    return records
+
+
+@pytest.fixture
+def pipeline(records, write_feed):
+    return FeedPipeline(write_feed(records))
+
+
+def test_filter_by_country_mode_and_expression(pipeline, records):
+    assert list(pipeline.filter("es", "geo")) == [r for r in records if r["ip_geo"] == "es"]
+    assert list(pipeline.filter("ES", "admin")) == [records[4]]
+    assert list(pipeline.filter("ES", "combined", where="threat_score > 5")) == [records[6], records[9]]
+    assert pipeline.current().count == 12
+
+
+@pytest.mark.parametrize("call, args", [
+    ("filter", ("ESP",)),
+    ("filter", ("ES", "nearby")),
+    ("filter", ("ES", "geo", "nosuch > 1")),
+    ("lookup", ("10.0.0.300",)),
+    ("covering", ("",)),
+    ("within", ("10.0.0.0/40",)),
+])
+def test_bad_arguments_raise_before_iterating(pipeline, call, args):
+    with pytest.raises(ValueError):
+        getattr(pipeline, call)(*args)
+
+
+def test_ip_queries(pipeline, records):
+    assert pipeline.lookup("10.0.0.7") == [records[7]]
+    assert pipeline.lookup("2001:db8::5") == [records[5]]
+    assert pipeline.lookup("192.0.2.1") == []
+    assert pipeline.covering("10.0.0.100") == [records[4]]
+    assert pipeline.within("10.0.0.2 - 10.0.0.4") == records[2:5]
+
+
+def test_load_keeps_an_unchanged_snapshot(pipeline, records, write_feed):
+    first = pipeline.load()
+    assert pipeline.load() is first
+    write_feed(records[:3])
+    assert pipeline.load().count == 3
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FeedPipeline(str(tmp_path / "missing.json")).load()
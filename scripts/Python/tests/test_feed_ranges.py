@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from feed_lookup import ip_to_int
+from feed_ranges import RangeIndex, collapse_cidrs, parse_ip_range
+
+
+def brute_force(intervals, start, end):
+    hits = sorted((s, e, v) for s, e, v in intervals if s <= end and e >= start)
+    return [v for _, _, v in hits]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    intervals = []
+    for value in range(400):
+        start = rng.randrange(10_000)
+        intervals.append((start, start + rng.choice([0, 1, 10, 100, 3000]), value))
+    index = RangeIndex(intervals)
+    for _ in range(300):
+        start = rng.randrange(-10, 13_500)
+        end = start + rng.choice([0, 0, 5, 500])
+        expected = brute_force(intervals, start, end)
+        assert index.overlapping(start, end) == expected
+        assert index.overlaps(start, end) == bool(expected)
+        assert (start in index) == bool(brute_force(intervals, start, start))
+
+
+def test_large_allocation_does_not_add_work():
+    # One allocation covering many sub-assignments: two levels, not a scan
+    sub = [(i * 10, i * 10 + 9, i) for i in range(10_000)]
+    index = RangeIndex([(0, 10 ** 6, "alloc")] + sub)
+    assert len(index._levels) == 2
+    assert index.covering(55_555) == ["alloc", 5555]
+    assert index.covering(200_000) == ["alloc"]
+
+
+def test_nested_and_identical_ranges():
+    index = RangeIndex([(0, 100, "a"), (10, 20, "b"), (10, 20, "c"), (12, 15, "d"), (50, 60, "e")])
+    assert index.covering(13) == ["a", "b", "c", "d"]
+    assert index.overlapping(16, 55) == ["a", "b", "c", "e"]
+    assert index.covering(101) == []
+    assert RangeIndex([]).covering(1) == []
+
+
+def test_parse_ip_range_forms():
+    assert parse_ip_range("10.0.0.0/30") == (ip_to_int("10.0.0.0"), ip_to_int("10.0.0.3"))
+    assert parse_ip_range("10.0.0.1 - 10.0.0.9") == (ip_to_int("10.0.0.1"), ip_to_int("10.0.0.9"))
+    assert parse_ip_range("2001:db8::1") == (ip_to_int("2001:db8::1"),) * 2
+    assert parse_ip_range("10.0.0.9 - 10.0.0.1") is None
+    assert parse_ip_range("10.0.0.1 - 2001:db8::1") is None
+    assert parse_ip_range(None) is None
+
+
+def test_collapse_cidrs():
+    keys = [ip_to_int(f"10.0.0.{i}") for i in range(4)] + [ip_to_int("2001:db8::")]
+    assert collapse_cidrs(keys) == ["10.0.0.0/30", "2001:db8::/128"]
@@ -0,0 +1,55 @@
+import logging
+
+import pytest
+
+from feed_api import api_error_message
+from feed_core import MESSAGES, ProgressFormatter
+from feed_retry import RetryExhausted, RetryScheduler, TransientError
+
+UNAVAILABLE = api_error_message(503)
+
+
+def flaky(failures):
+    calls = []
+
+    def request():
+        calls.append(None)
+        if len(calls) <= failures:
+            raise TransientError(UNAVAILABLE)
+        return "ok"
+
+    return request
+
+
+def test_retries_are_logged_not_printed(capsys, caplog):
+    retry = RetryScheduler(max_retries=3, base_delay=0, sleep=lambda delay: None)
+    with caplog.at_level(logging.INFO, logger="feed_retry"):
+        assert retry.call(flaky(2), "download") == "ok"
+    assert capsys.readouterr().out == ""
+    assert [r.getMessage() for r in caplog.records] == [
+        f"{UNAVAILABLE} Retrying download in 0.0s (retry 1/3)...",
+        f"{UNAVAILABLE} Retrying download in 0.0s (retry 2/3)...",
+    ]
+
+
+def test_retries_give_up_after_max_retries():
+    retry = RetryScheduler(max_retries=1, base_delay=0, sleep=lambda delay: None)
+    with pytest.raises(RetryExhausted, match="gave up after 1 retries"):
+        retry.call(flaky(5))
+
+
+def progress_line(messages, msg, *args):
+    record = logging.LogRecord("feed_retry", logging.INFO, __file__, 0, msg, args, None)
+    return ProgressFormatter(messages).format(record)
+
+
+def test_progress_lines_are_indented_and_translated():
+    template = "%s Retrying %s in %.1fs (retry %d/%d)..."
+    assert progress_line(MESSAGES["en"], template, UNAVAILABLE, "download", 1.5, 1, 5) == (
+        f"  {UNAVAILABLE} Retrying download in 1.5s (retry 1/5)..."
+    )
+    assert progress_line(MESSAGES["es"], template, UNAVAILABLE, "download", 1.5, 1, 5) == (
+        "  Kaspersky TIP API temporalmente no disponible (503). Inténtelo en unos minutos. "
+        "Reintentando la descarga en 1.5s (reintento 1/5)..."
+    )
+    assert progress_line(MESSAGES["es"], "Feed refreshed: %d records.", 7) == "  Feed actualizado: 7 registros."
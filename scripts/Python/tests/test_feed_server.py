@@ -0,0 +1,106 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from feed_server import MAX_LOOKUP_BODY, FeedService, create_server
+
+
+@pytest.fixture(scope="module")
+def records(make_records):
+    return make_records(9)  # ES: 10.0.0.0, 10.0.0.3, 10.0.0.6
+
+
+@pytest.fixture(scope="module")
+def server(records):
+    service = FeedService(lambda: records, "test feed", refresh_interval=0)
+    service.refresh()
+    server = create_server(service, "127.0.0.1:0")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.putrequest(method, path)
+        for name, value in (headers or {}).items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_records_of_a_country(server, records):
+    status, result = request(server, "GET", "/records?country=es&mode=geo&where=threat_score+>=+3")
+    assert status == 200
+    assert result == [records[3], records[6]]
+
+
+@pytest.mark.parametrize("path, error", [
+    ("/records", "two-letter"),
+    ("/records?country=ESP", "two-letter"),
+    ("/records?country=XX", "not a valid"),
+    ("/records?country=ES&mode=nearby", "mode must be one of"),
+    ("/records?country=ES&format=xml", "format must be one of"),
+    ("/records?country=ES&where=score+%3E%3D+1", "Unknown filter field"),
+    ("/records?country=ES&since=yesterday", "Invalid time"),
+    ("/ip?ip=10.0.0.256", "Invalid IP address"),
+    ("/covering?ip=", "Invalid IP address"),
+    ("/within?prefix=10.0.0.0/33", "Invalid prefix or range"),
+])
+def test_bad_query_parameters_are_a_400(server, path, error):
+    status, result = request(server, "GET", path)
+    assert status == 400
+    assert error in result["error"]
+
+
+@pytest.mark.parametrize("method, path", [("GET", "/nowhere"), ("POST", "/records")])
+def test_unknown_paths_are_a_404(server, method, path):
+    status, result = request(server, method, path, b"", {"Content-Length": "0"})
+    assert status == 404
+    assert path in result["error"]
+
+
+def test_lookup_finds_listed_ips(server):
+    body = b"10.0.0.1\n198.51.100.7\nnot an ip\n"
+    status, result = request(server, "POST", "/lookup?records=0", body, {"Content-Length": str(len(body))})
+    assert status == 200
+    assert result == {"queried": 2, "ranges": 0, "invalid": 1, "listed": ["10.0.0.1"]}
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_lookup_rejects_a_bad_content_length(server, length):
+    status, result = request(server, "POST", "/lookup", None, {"Content-Length": length})
+    assert status == 400
+    assert "Content-Length" in result["error"]
+
+
+def test_lookup_rejects_an_oversized_body(server):
+    status, result = request(server, "POST", "/lookup", None, {"Content-Length": str(MAX_LOOKUP_BODY + 1)})
+    assert status == 413
+    assert "error" in result
+
+
+def test_failed_refresh_keeps_serving_the_previous_snapshot(records):
+    loads = iter([records, RuntimeError("feed unavailable")])
+
+    def loader():
+        result = next(loads)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    service = FeedService(loader, "test feed", refresh_interval=0)
+    service.refresh()
+    service.refresh()
+    status = service.status()
+    assert status["records"] == 9
+    assert status["last_error"] == "feed unavailable"
+    assert status["refreshes"] == 2
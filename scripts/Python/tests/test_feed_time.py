@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from feed_time import MISSING_TIME, FEED_TIME_FORMAT, format_epoch, parse_feed_time, parse_time_bound
+
+
+def strptime_epoch(value):
+    return int(datetime.strptime(value, FEED_TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize("value", [
+    "01.01.1970 00:00",
+    "21.01.2015 00:00",
+    "29.02.2024 23:59",
+    "31.12.1999 12:30",
+    "1.2.2020 3:04",  # not zero-padded: the strptime fallback
+])
+def test_feed_times_match_strptime(value):
+    assert parse_feed_time(value) == strptime_epoch(value)
+
+
+@pytest.mark.parametrize("value", [
+    "29.02.2023 00:00", "31.04.2024 00:00", "00.01.2024 00:00", "01.13.2024 00:00",
+    "01.01.2024 24:00", "01.01.2024 00:60", "2024-01-01 00:00", "", None, 1700000000,
+])
+def test_malformed_feed_times_are_missing(value):
+    assert parse_feed_time(value) == MISSING_TIME
+
+
+def test_time_bounds():
+    now = strptime_epoch("31.01.2024 12:00")
+    assert parse_time_bound("30d", now) == now - 30 * 86400
+    assert parse_time_bound(" 12H ", now) == now - 12 * 3600
+    assert parse_time_bound("2024-01-31T12:00") == now
+    assert parse_time_bound("31.01.2024 12:00") == now
+    assert parse_time_bound("2024-01-31") == now - 12 * 3600
+    assert format_epoch(now) == "2024-01-31 12:00 UTC"
+
+
+@pytest.mark.parametrize("value", ["yesterday", "30x", "2024-02-30", "-5d"])
+def test_invalid_time_bounds(value):
+    with pytest.raises(ValueError, match="Invalid time"):
+        parse_time_bound(value)
@@ -0,0 +1,30 @@
+import string
+
+import pytest
+
+import kaspersky_tdf
+import kaspersky_tdf_es
+
+
+def fields(value):
+    return [name for _, name, _, _ in string.Formatter().parse(value) if name is not None]
+
+
+@pytest.mark.parametrize("section", [None, "help"])
+def test_spanish_text_has_every_english_key_and_placeholder(section):
+    english = kaspersky_tdf.TEXT if section is None else kaspersky_tdf.TEXT[section]
+    spanish = kaspersky_tdf_es.TEXTO if section is None else kaspersky_tdf_es.TEXTO[section]
+    assert spanish.keys() == english.keys()
+    for key, value in english.items():
+        if isinstance(value, str):
+            assert fields(spanish[key]) == fields(value), key
+
+
+def test_both_clis_take_the_same_options(monkeypatch):
+    options = []
+    for text in (kaspersky_tdf.TEXT, kaspersky_tdf_es.TEXTO):
+        monkeypatch.setattr("sys.argv", ["kaspersky_tdf", "--country", "es", "--output-format", "ndjson"])
+        args = kaspersky_tdf.parse_arguments(text)
+        options.append(vars(args))
+    assert options[0] == options[1]
+    assert options[1]["country"] == "es" and options[1]["output_format"] == "ndjson"